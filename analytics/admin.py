@@ -98,13 +98,9 @@ class PaymentAdmin(ModelAdmin):
             self.message_user(request, "У вас нет прав для этой операции", messages.ERROR)
             return 
         
-        processed_count = 0
-        for payment in queryset:
-            if not payment.is_confirmed:
-                BillingService.confirm_payment(payment, request.user)
-                processed_count += 1
+        confirmed = BillingService.confirm_payments(queryset.values_list('pk', flat=True), request.user)
         
-        self.message_user(request, f"Успешно подтверждено: {processed_count}. Бонусы начислены.", messages.SUCCESS)
+        self.message_user(request, f"Успешно подтверждено: {len(confirmed)}. Бонусы начислены.", messages.SUCCESS)
 
     @display(description="Сумма")
     def display_amount(self, obj):
@@ -157,7 +153,7 @@ class FinancialPeriodAdmin(ModelAdmin):
         ("Финансы (Снапшот)", {
             "fields": (("total_revenue", "total_expenses"), "net_profit"),
             "classes": ("tab-tabular", "!bg-gray-50"),
-            "description": "Данные обновляются кнопкой 'Пересчитать' или при закрытии периода."
+            "description": "Итоги открытого периода обновляются автоматически при изменении платежей и расходов. Закрытый период — кнопкой 'Пересчитать'."
         }),
     )
     readonly_fields = ("total_revenue", "total_expenses", "net_profit")
@@ -176,7 +172,7 @@ class FinancialPeriodAdmin(ModelAdmin):
             from clients.models import Client
             from timetracking.models import WorkShift
             
-            stats = obj.calculate_stats() 
+            stats = obj.get_stats()
             stats['total_new_clients'] = Client.objects.filter(created_at__date__range=(obj.start_date, obj.end_date)).count()
             
             leaderboard = []
@@ -239,6 +235,7 @@ class FinancialPeriodAdmin(ModelAdmin):
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
 from unfold.admin import ModelAdmin
 from unfold.decorators import display
+from students_life.pagination import EstimatedCountPaginator
 from .models import AuditLog 
 
 @admin.register(AuditLog)
@@ -247,7 +244,11 @@ class AuditLogAdmin(ModelAdmin):
     list_filter = ("action_flag", "content_type", "user")
     search_fields = ("object_repr", "change_message")
     date_hierarchy = "action_time"
-    ordering = ("-action_time",)
+    ordering = ("-action_time", "-id")
+    list_select_related = ("user", "content_type")
+    # Журнал растёт постоянно: без точного COUNT(*) на каждой странице
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def has_add_permission(self, request): return False
     def has_change_permission(self, request, obj=None): return False
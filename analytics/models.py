@@ -227,6 +227,9 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Платёж'
         verbose_name_plural = 'Платежи'
+        indexes = [
+            models.Index(fields=['payment_date', 'id'], name='payment_date_keyset_idx'),
+        ]
 
 
 class TransactionHistory(models.Model):
@@ -348,33 +351,28 @@ class FinancialPeriod(models.Model):
             start_date=start,
             defaults={'end_date': end},
         )
+        if created:
+            # В новый период могли попасть уже внесённые платежи и расходы
+            obj.calculate_stats()
         return obj
 
     def calculate_stats(self):
-        all_confirmed_payments = Payment.objects.filter(
-            payment_date__range=(self.start_date, self.end_date),
-            is_confirmed=True,
-        )
-
-        from django.db.models import Sum
-
-        calc_revenue = all_confirmed_payments.aggregate(Sum('amount_usd'))['amount_usd__sum'] or 0
-        calc_net_income = all_confirmed_payments.aggregate(Sum('net_income_usd'))['net_income_usd__sum'] or 0
-        calc_expenses = Expense.objects.filter(
-            date__range=(self.start_date, self.end_date)
-        ).aggregate(Sum('amount_usd'))['amount_usd__sum'] or 0
-
-        final_profit = calc_net_income - calc_expenses
-
-        self.total_revenue = float(calc_revenue)
-        self.total_expenses = float(calc_expenses)
-        self.net_profit = float(final_profit)
-        self.save()
-
+        """
+        Пересчитывает итоги периода одним запросом. Открытые периоды
+        поддерживаются в актуальном виде сигналами (analytics/periods.py),
+        явный вызов нужен для закрытых периодов и сверки.
+        """
+        from .periods import refresh_periods
+
+        refresh_periods(FinancialPeriod.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['total_revenue', 'total_expenses', 'net_profit', 'updated_at'])
+        return self.get_stats()
+
+    def get_stats(self):
         return {
-            'calc_revenue': float(calc_revenue),
-            'calc_expenses': float(calc_expenses),
-            'final_profit': float(final_profit),
+            'calc_revenue': float(self.total_revenue),
+            'calc_expenses': float(self.total_expenses),
+            'final_profit': float(self.net_profit),
         }
 
     class Meta:
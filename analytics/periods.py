@@ -0,0 +1,94 @@
+# analytics/periods.py
+"""
+Итоги финансовых периодов (выручка, расходы, чистая прибыль).
+
+Итоги хранятся в самом FinancialPeriod и читаются без пересчёта. Сигналы
+Payment/Expense (analytics/signals.py) запоминают даты изменённых записей,
+а после коммита открытые периоды с этими датами пересчитываются одним UPDATE
+с подзапросами-агрегатами. Несколько изменений в одной транзакции (массовое
+подтверждение платежей, импорт расходов) схлопываются в один пересчёт.
+Закрытые периоды не трогаются — их итоги меняет только явный пересчёт.
+"""
+import datetime
+import logging
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import DecimalField, F, Func, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils import timezone
+
+from students_life.deferred import CommitBatch
+
+logger = logging.getLogger(__name__)
+
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+def _sum_subquery(queryset, field: str):
+    total = (
+        queryset
+        .order_by()
+        .annotate(total=Func(F(field), function='SUM'))
+        .values('total')
+    )
+    return Coalesce(Subquery(total, output_field=DecimalField(max_digits=15, decimal_places=2)), ZERO)
+
+
+def period_totals_expressions() -> dict:
+    """Выражения итогов периода, коррелированные с FinancialPeriod по start_date/end_date."""
+    from .models import Expense, Payment
+
+    payments = Payment.objects.filter(
+        is_confirmed=True,
+        payment_date__gte=OuterRef('start_date'),
+        payment_date__lte=OuterRef('end_date'),
+    )
+    expenses = Expense.objects.filter(
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date'),
+    )
+
+    expenses_total = _sum_subquery(expenses, 'amount_usd')
+    return {
+        'total_revenue': _sum_subquery(payments, 'amount_usd'),
+        'total_expenses': expenses_total,
+        'net_profit': _sum_subquery(payments, 'net_income_usd') - expenses_total,
+    }
+
+
+def refresh_periods(queryset) -> int:
+    """Пересчитывает итоги периодов queryset одним UPDATE."""
+    return queryset.update(updated_at=timezone.now(), **period_totals_expressions())
+
+
+def _normalize_date(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _flush_pending(dates):
+    from .models import FinancialPeriod
+
+    condition = Q()
+    for value in dates:
+        condition |= Q(start_date__lte=value, end_date__gte=value)
+
+    try:
+        refresh_periods(FinancialPeriod.objects.filter(condition, is_closed=False))
+    except (ProgrammingError, OperationalError):
+        logger.warning('Financial period stats refresh failed', exc_info=True)
+
+
+_batch = CommitBatch(_flush_pending, factory=set)
+
+
+def schedule_period_refresh(dates: Iterable) -> None:
+    """Откладывает пересчёт периодов, в которые попадают dates, до коммита транзакции."""
+    dates = {_normalize_date(value) for value in dates if value}
+    if not dates:
+        return
+
+    _batch.add(lambda pending: pending.update(dates))
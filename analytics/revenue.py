@@ -0,0 +1,158 @@
+# analytics/revenue.py
+"""
+Оплата сделок и выручка менеджеров за месяц.
+
+Сигналы Payment (analytics/signals.py) запоминают сделки и менеджеров
+изменённых платежей (и прежние — если платёж перенесли), а после коммита
+транзакции пересчитывают их одним UPDATE по сделкам и одним по кошелькам
+ManagerSalary — с подзапросами-агрегатами по платежам. Подтверждение, правка
+или импорт сотни платежей одной сделки в одной транзакции — это один пересчёт,
+а не сотня.
+
+Массовые операции в обход сигналов (bulk_create, queryset.update) вызывают
+schedule_payments_refresh; bulk_revenue_refresh() объединяет поштучные
+сохранения (импорт, действия админки) в одну транзакцию и один пересчёт.
+"""
+import datetime
+import logging
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, F, OuterRef, Value, When
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils import timezone
+
+from students_life.deferred import CommitBatch
+
+from .periods import _sum_subquery
+
+logger = logging.getLogger(__name__)
+
+PAID_FULL_TOLERANCE = Decimal('0.01')
+
+
+def month_bounds(day: datetime.date):
+    start = day.replace(day=1)
+    next_start = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, next_start
+
+
+def refresh_deals(deal_ids: Iterable) -> int:
+    """Оплачено и статус оплаты сделок — одним UPDATE."""
+    from .models import Deal, Payment
+
+    deal_ids = {pk for pk in deal_ids if pk}
+    if not deal_ids:
+        return 0
+
+    payments = Payment.objects.filter(deal_id=OuterRef('pk'))
+    confirmed = _sum_subquery(payments.filter(is_confirmed=True), 'amount_usd')
+    has_pending = Exists(payments.filter(is_confirmed=False))
+
+    return Deal.objects.filter(pk__in=deal_ids).update(
+        paid_amount_usd=confirmed,
+        payment_status=Case(
+            When(
+                LessThanOrEqual(confirmed, Value(Decimal('0.00'))),
+                then=Case(When(has_pending, then=Value('waiting_payment')), default=Value('new')),
+            ),
+            When(
+                GreaterThanOrEqual(confirmed, F('total_to_pay_usd') - Value(PAID_FULL_TOLERANCE)),
+                then=Value('paid_full'),
+            ),
+            default=Value('paid_partial'),
+            output_field=CharField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_manager_revenue(manager_ids: Iterable, day: datetime.date = None) -> int:
+    """Выручка менеджеров за месяц day (по умолчанию — текущий) — одним UPDATE кошельков."""
+    from users.models import ManagerSalary
+
+    from .models import Payment
+
+    manager_ids = {pk for pk in manager_ids if pk}
+    if not manager_ids:
+        return 0
+
+    start, next_start = month_bounds(day or timezone.localdate())
+    revenue = _sum_subquery(
+        Payment.objects.filter(
+            manager_id=OuterRef('manager_id'),
+            is_confirmed=True,
+            payment_date__gte=start,
+            payment_date__lt=next_start,
+        ),
+        'amount_usd',
+    )
+    return ManagerSalary.objects.filter(manager_id__in=manager_ids).update(current_month_revenue=revenue)
+
+
+def _after_refresh(manager_ids):
+    # Кошельки обновлены в обход save(): сигналы лидерборда и дашборда не сработали
+    from gamification.leaderboard import schedule_user_refresh
+    from students_life.dashboard_metrics import invalidate_manager_metrics
+
+    for manager_id in manager_ids:
+        schedule_user_refresh(manager_id)
+        invalidate_manager_metrics(manager_id)
+
+
+def _flush_pending(pending):
+    deal_ids = pending['deal_ids']
+    manager_ids = pending['manager_ids']
+
+    try:
+        with transaction.atomic():
+            refresh_deals(deal_ids)
+            refresh_manager_revenue(manager_ids)
+    except (ProgrammingError, OperationalError):
+        logger.warning('Deal / manager revenue refresh failed', exc_info=True)
+        return
+
+    _after_refresh(manager_ids)
+
+
+_batch = CommitBatch(_flush_pending, factory=lambda: {'deal_ids': set(), 'manager_ids': set()})
+
+
+def schedule_revenue_refresh(deal_ids: Iterable = (), manager_ids: Iterable = ()) -> None:
+    """Откладывает пересчёт сделок и выручки менеджеров до коммита транзакции."""
+    deal_ids = {pk for pk in deal_ids if pk}
+    manager_ids = {pk for pk in manager_ids if pk}
+    if not deal_ids and not manager_ids:
+        return
+
+    def _update(pending):
+        pending['deal_ids'].update(deal_ids)
+        pending['manager_ids'].update(manager_ids)
+
+    _batch.add(_update)
+
+
+def schedule_payments_refresh(payments) -> None:
+    """Для изменений платежей в обход сигналов: payments — queryset или список Payment."""
+    if hasattr(payments, 'values_list'):
+        rows = list(payments.order_by().values_list('deal_id', 'manager_id').distinct())
+    else:
+        rows = [(payment.deal_id, payment.manager_id) for payment in payments]
+
+    schedule_revenue_refresh(
+        deal_ids={deal_id for deal_id, _ in rows},
+        manager_ids={manager_id for _, manager_id in rows},
+    )
+
+
+@contextmanager
+def bulk_revenue_refresh():
+    """
+    Массовая обработка платежей: всё внутри — одна транзакция, сделки
+    и выручка пересчитываются один раз после её коммита.
+    """
+    with transaction.atomic():
+        yield
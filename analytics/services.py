@@ -1,10 +1,46 @@
 # analytics/services.py
 from decimal import Decimal
+from typing import Iterable, List
+
 from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
 from django.utils import timezone
 
 from users.models import ManagerSalary
 from .models import Payment, TransactionHistory
+from .periods import schedule_period_refresh
+from .revenue import schedule_payments_refresh
+
+MONEY_STEP = Decimal('0.01')
+
+
+def commission_amount(payment: Payment, commission_percent) -> Decimal:
+    """Комиссия менеджера с платежа: процент от чистого дохода (или от суммы, если дохода нет)."""
+    base_amount = (
+        payment.net_income_usd
+        if payment.net_income_usd and payment.net_income_usd > 0
+        else payment.amount_usd
+    )
+    return ((base_amount * commission_percent) / Decimal('100.00')).quantize(MONEY_STEP)
+
+
+def schedule_payments_changed(payments) -> None:
+    """
+    То же, что делают сигналы Payment при save(), — для изменений в обход
+    сигналов (queryset.update): пересчёт сделок и выручки менеджеров,
+    финансовых периодов и строк рейтинга за даты платежей.
+
+    Платежи не входят в журнал синхронизации (sync/registry.py) и не
+    кэшируются в ответах API (students_life.response_cache), поэтому записей
+    журнала и сброса кэша ответов здесь нет; если появятся — добавлять сюда.
+    """
+    from gamification.leaderboard import schedule_user_refresh
+
+    payments = list(payments)
+    schedule_payments_refresh(payments)
+    schedule_period_refresh(payment.payment_date for payment in payments)
+    for payment in payments:
+        schedule_user_refresh(payment.manager_id, payment.payment_date)
 
 
 class BillingService:
@@ -16,58 +52,106 @@ class BillingService:
         - защита от двойного подтверждения
         - защита от двойного начисления бонуса
         """
+        BillingService.confirm_payments([payment.pk], admin_user)
+        return (
+            Payment.objects
+            .select_related('deal', 'deal__client', 'manager')
+            .get(pk=payment.pk)
+        )
+
+    @staticmethod
+    def confirm_payments(payment_ids: Iterable, admin_user) -> List[Payment]:
+        """
+        Подтверждение пачки платежей в одной транзакции.
+
+        Блокировки берутся в одном порядке — платежи по pk, затем кошельки
+        по manager_id, — поэтому параллельные подтверждения пересекающихся
+        пачек ждут друг друга, а не взаимоблокируются. Уже подтверждённые
+        платежи пропускаются, комиссия не начисляется повторно, если по платежу
+        уже есть запись в истории. Записи истории создаются одним INSERT,
+        балансы кошельков — одним UPDATE.
+
+        Возвращает подтверждённые этим вызовом платежи.
+        """
+        payment_ids = {int(pk) for pk in payment_ids if pk is not None}
+        if not payment_ids:
+            return []
+
         with transaction.atomic():
-            locked_payment = (
+            payments = list(
                 Payment.objects
                 .select_for_update()
-                .select_related('deal', 'deal__client', 'manager')
-                .get(pk=payment.pk)
+                .filter(pk__in=payment_ids, is_confirmed=False)
+                .order_by('pk')
             )
+            if not payments:
+                return []
+
+            now = timezone.now()
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(
+                is_confirmed=True,
+                confirmed_by=admin_user,
+                confirmed_at=now,
+                updated_at=now,
+            )
+            for payment in payments:
+                payment.is_confirmed = True
+                payment.confirmed_by = admin_user
+                payment.confirmed_at = now
+                payment.updated_at = now
+
+            # update() не вызывает сигналы Payment: их работу планируем явно
+            schedule_payments_changed(payments)
 
-            if locked_payment.is_confirmed:
-                return locked_payment
-
-            locked_payment.is_confirmed = True
-            locked_payment.confirmed_by = admin_user
-            locked_payment.confirmed_at = timezone.now()
-            locked_payment.save(update_fields=[
-                'is_confirmed',
-                'confirmed_by',
-                'confirmed_at',
-                'updated_at',
-            ])
-
-            manager = locked_payment.manager
-            if not hasattr(manager, 'managersalary'):
-                return locked_payment
-
-            salary_profile = ManagerSalary.objects.select_for_update().get(manager=manager)
-
-            already_exists = TransactionHistory.objects.filter(
-                reference_payment=locked_payment
-            ).exists()
-
-            if not already_exists:
-                base_amount = (
-                    locked_payment.net_income_usd
-                    if locked_payment.net_income_usd and locked_payment.net_income_usd > 0
-                    else locked_payment.amount_usd
+            salaries = {
+                salary.manager_id: salary
+                for salary in (
+                    ManagerSalary.objects
+                    .select_for_update()
+                    .filter(manager_id__in={payment.manager_id for payment in payments})
+                    .order_by('manager_id')
                 )
-                bonus = (base_amount * salary_profile.commission_percent) / Decimal('100.00')
-
-                if bonus > 0:
-                    TransactionHistory.objects.create(
-                        manager=manager,
-                        amount=bonus,
-                        reference_payment=locked_payment,
-                        description=(
-                            f"Комиссия {salary_profile.commission_percent}% "
-                            f"за подтверждённый платёж #{locked_payment.id} "
-                            f"(Сделка #{locked_payment.deal_id})"
-                        )
+            }
+            if not salaries:
+                return payments
+
+            already_paid = set(
+                TransactionHistory.objects
+                .filter(reference_payment_id__in=[payment.pk for payment in payments])
+                .values_list('reference_payment_id', flat=True)
+            )
+
+            history = []
+            deltas = {}
+            for payment in payments:
+                salary_profile = salaries.get(payment.manager_id)
+                if salary_profile is None or payment.pk in already_paid:
+                    continue
+
+                bonus = commission_amount(payment, salary_profile.commission_percent)
+                if bonus <= 0:
+                    continue
+
+                history.append(TransactionHistory(
+                    manager_id=payment.manager_id,
+                    amount=bonus,
+                    reference_payment=payment,
+                    description=(
+                        f"Комиссия {salary_profile.commission_percent}% "
+                        f"за подтверждённый платёж #{payment.id} "
+                        f"(Сделка #{payment.deal_id})"
                     )
+                ))
+                deltas[payment.manager_id] = deltas.get(payment.manager_id, Decimal('0.00')) + bonus
 
-                    salary_profile.current_balance += bonus
-                    salary_profile.save(update_fields=['current_balance'])
+            if history:
+                TransactionHistory.objects.bulk_create(history)
+                ManagerSalary.objects.filter(manager_id__in=deltas).update(
+                    current_balance=F('current_balance') + Case(
+                        *[When(manager_id=manager_id, then=Value(delta)) for manager_id, delta in deltas.items()],
+                        default=Value(Decimal('0.00')),
+                        output_field=DecimalField(max_digits=10, decimal_places=2),
+                    ),
+                )
 
-            return locked_payment
\ No newline at end of file
+            return payments
@@ -1,58 +1,71 @@
 # analytics/signals.py
-from decimal import Decimal
-
-from django.db.models import Sum
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
-from .models import Payment
+from .models import Expense, Payment
+from .periods import schedule_period_refresh
+from .revenue import schedule_revenue_refresh
 
+# Модель -> поле даты, по которой запись попадает в финансовый период
+PERIOD_DATE_FIELDS = {
+    Payment: 'payment_date',
+    Expense: 'date',
+}
 
-def recalculate_deal_and_manager(payment: Payment):
-    deal = payment.deal
 
-    confirmed_total = (
-        deal.payments.filter(is_confirmed=True)
-        .aggregate(total=Sum('amount_usd'))
-        .get('total') or Decimal('0.00')
-    )
+def _remember_revenue_keys(sender, instance, **kwargs):
+    # Сделка и менеджер при загрузке: если платёж перенесут, пересчитать нужно и прежних
+    instance._loaded_deal_id = instance.__dict__.get('deal_id')
+    instance._loaded_manager_id = instance.__dict__.get('manager_id')
 
-    has_pending = deal.payments.filter(is_confirmed=False).exists()
 
-    deal.paid_amount_usd = confirmed_total
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def schedule_deal_and_manager_refresh(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
 
-    total_to_pay = deal.total_to_pay_usd or Decimal('0.00')
-    if confirmed_total <= 0:
-        deal.payment_status = 'waiting_payment' if has_pending else 'new'
-    elif confirmed_total >= (total_to_pay - Decimal('0.01')):
-        deal.payment_status = 'paid_full'
-    else:
-        deal.payment_status = 'paid_partial'
+    schedule_revenue_refresh(
+        deal_ids=[getattr(instance, '_loaded_deal_id', None), instance.deal_id],
+        manager_ids=[getattr(instance, '_loaded_manager_id', None), instance.manager_id],
+    )
+    instance._loaded_deal_id = instance.deal_id
+    instance._loaded_manager_id = instance.manager_id
 
-    deal.save(update_fields=['paid_amount_usd', 'payment_status', 'updated_at'])
 
-    manager = payment.manager
-    if hasattr(manager, 'managersalary'):
-        month_revenue = (
-            Payment.objects.filter(
-                manager=manager,
-                is_confirmed=True,
-                payment_date__year=payment.payment_date.year,
-                payment_date__month=payment.payment_date.month,
-            )
-            .aggregate(total=Sum('amount_usd'))
-            .get('total') or Decimal('0.00')
-        )
+post_init.connect(_remember_revenue_keys, sender=Payment, dispatch_uid='revenue_keys_init_payment')
 
-        manager.managersalary.current_month_revenue = month_revenue
-        manager.managersalary.save(update_fields=['current_month_revenue'])
 
+def _remember_period_date(sender, instance, **kwargs):
+    # Дата при загрузке: если её поменяют, пересчитать нужно и прежний период.
+    # Отложенное поле не читаем, чтобы не делать запрос на каждый экземпляр.
+    field = PERIOD_DATE_FIELDS[sender]
+    instance._loaded_period_date = instance.__dict__.get(field)
 
-@receiver(post_save, sender=Payment)
-def sync_after_payment_save(sender, instance, **kwargs):
-    recalculate_deal_and_manager(instance)
 
+def _refresh_financial_periods(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
 
-@receiver(post_delete, sender=Payment)
-def sync_after_payment_delete(sender, instance, **kwargs):
-    recalculate_deal_and_manager(instance)
\ No newline at end of file
+    field = PERIOD_DATE_FIELDS[sender]
+    current = instance.__dict__.get(field)
+    schedule_period_refresh([getattr(instance, '_loaded_period_date', None), current])
+    instance._loaded_period_date = current
+
+
+for _model in PERIOD_DATE_FIELDS:
+    post_init.connect(
+        _remember_period_date,
+        sender=_model,
+        dispatch_uid=f'period_date_init_{_model._meta.label_lower}',
+    )
+    post_save.connect(
+        _refresh_financial_periods,
+        sender=_model,
+        dispatch_uid=f'period_refresh_save_{_model._meta.label_lower}',
+    )
+    post_delete.connect(
+        _refresh_financial_periods,
+        sender=_model,
+        dispatch_uid=f'period_refresh_delete_{_model._meta.label_lower}',
+    )
@@ -1,3 +1,264 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Currency
+from clients.models import Client
+from gamification.leaderboard import get_snapshot
+from gamification.models import LeaderboardEntry
+from users.models import ManagerSalary, User
+
+from .models import Deal, Expense, FinancialPeriod, Payment, TransactionHistory
+from .revenue import bulk_revenue_refresh, schedule_payments_refresh
+from .services import BillingService
+
+
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='Доллар', rate=Decimal('1'))
+        self.manager = User.objects.create_user(email='manager@example.com', password='x')
+        self.other = User.objects.create_user(email='other@example.com', password='x')
+        self.client_obj = Client.objects.create(
+            full_name='Клиент',
+            phone='+99365000000',
+            city='Ашхабад',
+            manager=self.manager,
+        )
+        self.deal = self._create_deal(self.manager)
+
+    def _create_deal(self, manager):
+        # Доход сделки — 30% от суммы к оплате
+        return Deal.objects.create(
+            client=self.client_obj,
+            manager=manager,
+            currency=self.usd,
+            price_client=Decimal('100'),
+            total_to_pay_usd=Decimal('100'),
+            expected_revenue_usd=Decimal('30'),
+        )
+
+    def _create_payment(self, manager, amount='10', deal=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Payment.objects.create(
+                deal=deal or self.deal,
+                manager=manager,
+                amount=Decimal(amount),
+                currency=self.usd,
+                method='cash',
+                **kwargs,
+            )
+
+    def _balance(self, manager):
+        return ManagerSalary.objects.get(manager=manager).current_balance
+
+
+def _updates_of(queries, table):
+    return [query for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+
+
+class FinancialPeriodTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.period = FinancialPeriod.ensure_current_period()
+
+    def _create_expense(self, amount, date=None):
+        return Expense.objects.create(
+            title='Расход',
+            amount=Decimal(amount),
+            currency=self.usd,
+            manager=self.manager,
+            date=date or self.period.start_date,
+        )
+
+    def test_changes_in_one_transaction_refresh_period_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(5):
+                    self._create_expense('10')
+                payment = Payment.objects.create(
+                    deal=self.deal,
+                    manager=self.manager,
+                    amount=Decimal('50'),
+                    currency=self.usd,
+                    method='cash',
+                    payment_date=self.period.start_date,
+                    is_confirmed=True,
+                )
+
+        self.assertEqual(len(_updates_of(queries.captured_queries, 'analytics_financialperiod')), 1)
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.total_expenses, Decimal('50.00'))
+        self.assertEqual(self.period.total_revenue, payment.amount_usd)
+
+    def test_moved_expense_leaves_previous_period(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            expense = self._create_expense('10')
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.total_expenses, Decimal('10.00'))
+
+        expense = Expense.objects.get(pk=expense.pk)
+        expense.date = self.period.start_date - datetime.timedelta(days=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.save()
+
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.total_expenses, Decimal('0.00'))
+
+    def test_closed_period_is_not_recalculated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_expense('10')
+        FinancialPeriod.objects.filter(pk=self.period.pk).update(is_closed=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_expense('5')
+
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.total_expenses, Decimal('10.00'))
+
+
+class RevenueRefreshTests(AnalyticsTestCase):
+    def _revenue(self, manager):
+        return ManagerSalary.objects.get(manager=manager).current_month_revenue
+
+    def test_bulk_saves_refresh_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with bulk_revenue_refresh():
+                    for _ in range(10):
+                        Payment.objects.create(
+                            deal=self.deal,
+                            manager=self.manager,
+                            amount=Decimal('3'),
+                            currency=self.usd,
+                            method='cash',
+                            is_confirmed=True,
+                        )
+
+        self.assertEqual(len(_updates_of(queries.captured_queries, 'analytics_deal')), 1)
+        self.assertEqual(len(_updates_of(queries.captured_queries, 'users_managersalary')), 1)
+        self.deal.refresh_from_db()
+        self.assertEqual(self.deal.paid_amount_usd, Decimal('30.00'))
+        self.assertEqual(self.deal.payment_status, 'paid_partial')
+        self.assertEqual(self._revenue(self.manager), Decimal('30.00'))
+
+    def test_payment_status_follows_confirmation(self):
+        payment = self._create_payment(self.manager, '100')
+        self.deal.refresh_from_db()
+        self.assertEqual(self.deal.payment_status, 'waiting_payment')
+
+        payment.is_confirmed = True
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+
+        self.deal.refresh_from_db()
+        self.assertEqual(self.deal.payment_status, 'paid_full')
+
+    def test_moved_payment_refreshes_previous_deal_and_manager(self):
+        other_deal = self._create_deal(self.other)
+        payment = self._create_payment(self.manager, '40', is_confirmed=True)
+
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.deal = other_deal
+        payment.manager = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+
+        self.deal.refresh_from_db()
+        other_deal.refresh_from_db()
+        self.assertEqual((self.deal.paid_amount_usd, self.deal.payment_status), (Decimal('0.00'), 'new'))
+        self.assertEqual(other_deal.paid_amount_usd, Decimal('40.00'))
+        self.assertEqual(self._revenue(self.manager), Decimal('0.00'))
+        self.assertEqual(self._revenue(self.other), Decimal('40.00'))
+
+    def test_queryset_update_with_explicit_refresh(self):
+        self._create_payment(self.manager, '40', is_confirmed=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.filter(deal=self.deal).update(is_confirmed=False)
+            schedule_payments_refresh(Payment.objects.filter(deal=self.deal))
+
+        self.deal.refresh_from_db()
+        self.assertEqual(self.deal.payment_status, 'waiting_payment')
+        self.assertEqual(self._revenue(self.manager), Decimal('0.00'))
+
+
+class BatchConfirmTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+
+    def _confirm(self, payments):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BillingService.confirm_payments([payment.pk for payment in payments], self.admin)
+
+    def test_balances_summed_per_manager(self):
+        payments = [self._create_payment(self.manager, '10') for _ in range(3)]
+        payments += [self._create_payment(self.other, '20') for _ in range(2)]
+
+        confirmed = self._confirm(payments)
+
+        self.assertEqual(len(confirmed), 5)
+        # 5% с чистого дохода (30% суммы платежа)
+        self.assertEqual(self._balance(self.manager), Decimal('0.45'))
+        self.assertEqual(self._balance(self.other), Decimal('0.60'))
+        self.assertEqual(TransactionHistory.objects.count(), 5)
+        self.assertFalse(Payment.objects.filter(is_confirmed=False).exists())
+
+    def test_second_call_is_noop(self):
+        payments = [self._create_payment(self.manager), self._create_payment(self.other)]
+        self._confirm(payments)
+
+        self.assertEqual(self._confirm(payments), [])
+
+        self.assertEqual(self._balance(self.manager), Decimal('0.15'))
+        self.assertEqual(self._balance(self.other), Decimal('0.15'))
+        self.assertEqual(TransactionHistory.objects.count(), 2)
+
+    def test_existing_commission_is_not_paid_twice(self):
+        paid, fresh = self._create_payment(self.manager), self._create_payment(self.manager)
+        TransactionHistory.objects.create(
+            manager=self.manager,
+            amount=Decimal('0.15'),
+            reference_payment=paid,
+            description='Начислено ранее',
+        )
+
+        self.assertEqual(len(self._confirm([paid, fresh])), 2)
+
+        self.assertEqual(self._balance(self.manager), Decimal('0.15'))
+        self.assertEqual(TransactionHistory.objects.filter(reference_payment=fresh).count(), 1)
+
+    def test_refreshes_what_payment_signals_would(self):
+        snapshot = get_snapshot(timezone.localdate().replace(day=1))
+        payment = self._create_payment(self.manager, '40')
+
+        self._confirm([payment])
+
+        self.deal.refresh_from_db()
+        self.assertEqual(self.deal.payment_status, 'paid_partial')
+        self.assertEqual(self.deal.paid_amount_usd, Decimal('40.00'))
+        self.assertEqual(ManagerSalary.objects.get(manager=self.manager).current_month_revenue, Decimal('40.00'))
+        entry = LeaderboardEntry.objects.get(snapshot=snapshot, user=self.manager)
+        self.assertEqual(entry.metrics['payment_amount_usd'], 40.0)
+
+    def test_batch_endpoint(self):
+        payments = [self._create_payment(self.manager), self._create_payment(self.other)]
+        api = APIClient()
+        api.force_authenticate(self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api.post(
+                '/api/analytics/payments/confirm-batch/',
+                {'ids': [payment.pk for payment in payments]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+        api.force_authenticate(self.manager)
+        response = api.post('/api/analytics/payments/confirm-batch/', {'ids': [payments[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 403)
@@ -14,6 +14,8 @@ from .serializers import (
 )
 from .services import BillingService
 
+CONFIRM_BATCH_MAX_SIZE = 500
+
 
 def is_admin_user(user):
     return bool(
@@ -79,6 +81,7 @@ class DealViewSet(viewsets.ModelViewSet):
 class PaymentViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-payment_date', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -169,6 +172,31 @@ class PaymentViewSet(viewsets.ModelViewSet):
             'payment': self.get_serializer(payment).data
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='confirm-batch')
+    def confirm_batch(self, request):
+        if not is_admin_user(request.user):
+            raise PermissionDenied('Только администратор может подтверждать платежи.')
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Передайте непустой список id платежей.'})
+        if len(ids) > CONFIRM_BATCH_MAX_SIZE:
+            raise ValidationError({'ids': f'Не больше {CONFIRM_BATCH_MAX_SIZE} платежей за раз.'})
+        try:
+            ids = {int(pk) for pk in ids}
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'id платежей должны быть целыми числами.'})
+
+        visible_ids = set(self.get_queryset().filter(pk__in=ids).values_list('pk', flat=True))
+        confirmed = BillingService.confirm_payments(visible_ids, request.user)
+        confirmed_ids = sorted(payment.pk for payment in confirmed)
+
+        return Response({
+            'detail': f'Подтверждено платежей: {len(confirmed_ids)}.',
+            'confirmed': confirmed_ids,
+            'skipped': sorted(ids - set(confirmed_ids)),
+        }, status=status.HTTP_200_OK)
+
 
 class ExpenseViewSet(viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
@@ -232,7 +260,6 @@ class FinancialPeriodViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], url_path='current')
     def current_period(self, request):
         period = FinancialPeriod.ensure_current_period()
-        period.calculate_stats()
         return Response(self.get_serializer(period).data)
 
     @action(detail=True, methods=['post'], url_path='recalculate')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search import rebuild_catalog_search_index
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс вузов и программ.'
+
+    def handle(self, *args, **options):
+        universities, programs = rebuild_catalog_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс каталога перестроен: вузов {universities}, программ {programs}.'
+        ))
@@ -0,0 +1,92 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from catalog.search import normalize_text, tokenize
+
+    University = apps.get_model('catalog', 'University')
+    Program = apps.get_model('catalog', 'Program')
+    CatalogSearchDocument = apps.get_model('catalog', 'CatalogSearchDocument')
+    CatalogSearchTerm = apps.get_model('catalog', 'CatalogSearchTerm')
+
+    def add(kind, obj, parts):
+        text = normalize_text(' '.join(filter(None, parts)))
+        document = CatalogSearchDocument.objects.create(kind=kind, text=text, **{kind: obj})
+        CatalogSearchTerm.objects.bulk_create([
+            CatalogSearchTerm(document=document, kind=kind, term=term)
+            for term in dict.fromkeys(word[:100] for word in tokenize(text))
+        ])
+
+    for university in University.objects.iterator():
+        add('university', university, [
+            university.name,
+            university.country,
+            university.city,
+            university.description,
+            university.required_docs,
+        ])
+
+    for program in Program.objects.select_related('university').iterator():
+        university = program.university
+        add('program', program, [
+            program.name,
+            program.degree,
+            program.get_degree_display(),
+            university.name,
+            university.country,
+            university.city,
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_currency_updated_at_program_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('university', 'Университет'), ('program', 'Программа')], max_length=20)),
+                ('text', models.TextField(blank=True, default='', verbose_name='Нормализованный текст')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('program', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='catalog.program')),
+                ('university', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='catalog.university')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ каталога',
+                'verbose_name_plural': 'Поисковый индекс каталога',
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('term', models.CharField(max_length=100)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='catalog.catalogsearchdocument')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса каталога',
+                'verbose_name_plural': 'Слова поискового индекса каталога',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='catalogsearchdocument',
+            index=models.Index(fields=['kind', 'indexed_at'], name='catalog_search_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogsearchterm',
+            index=models.Index(fields=['kind', 'term'], name='catalog_search_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogsearchterm',
+            constraint=models.UniqueConstraint(fields=('document', 'term'), name='catalog_search_term_unique'),
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -73,4 +73,6 @@ class Program(models.Model):
     class Meta:
         verbose_name = "Программа обучения"
         verbose_name_plural = "Программы обучения"
-        ordering = ['university__name', 'name']
\ No newline at end of file
+        ordering = ['university__name', 'name']
+
+from .search_models import CatalogSearchDocument, CatalogSearchTerm  # noqa: F401,E402
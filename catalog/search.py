@@ -2,6 +2,13 @@ import re
 import unicodedata
 from difflib import SequenceMatcher
 
+from django.db import transaction
+from django.db.models import Count, Max
+
+from students_life.fuzzy import TrigramIndex, max_possible_ratio
+
+from .models import CatalogSearchDocument, CatalogSearchTerm, Program, University
+
 
 WORD_RE = re.compile(r'[\w\d]+', flags=re.UNICODE)
 
@@ -19,6 +26,44 @@ def tokenize(value):
     return WORD_RE.findall(normalize_text(value))
 
 
+FIRST_LETTER_BONUS = 0.05
+# Слова, у которых с токеном запроса почти нет общего (ratio < порога),
+# в оценку не попадают — их вклад всё равно ниже min_score.
+CANDIDATE_RATIO = 0.4
+
+
+def _token_candidates(query_tokens, vocabulary):
+    result = []
+
+    for q in query_tokens:
+        scores = {}
+        for word, ratio in vocabulary.similar(q, CANDIDATE_RATIO).items():
+            if word[:1] == q[:1]:
+                ratio += FIRST_LETTER_BONUS
+            scores[word] = ratio
+        result.append(scores)
+
+    return result
+
+
+def _combine_scores(query, text, text_tokens, candidates):
+    if not candidates:
+        return SequenceMatcher(None, query, text).ratio()
+
+    token_scores = [
+        max((scores.get(t, 0.0) for t in text_tokens), default=0.0)
+        for scores in candidates
+    ]
+    avg_token = sum(token_scores) / len(token_scores)
+
+    # Сравнение целиком дорогое на длинных описаниях: считаем его, только если оно может победить.
+    if max_possible_ratio(query, text) * 0.85 <= avg_token:
+        return avg_token
+
+    whole_ratio = SequenceMatcher(None, query, text).ratio()
+    return max(avg_token, whole_ratio * 0.85)
+
+
 def score_similarity(query, text):
     query = normalize_text(query)
     text = normalize_text(text)
@@ -28,34 +73,190 @@ def score_similarity(query, text):
     if query in text:
         return 1.0
 
-    query_tokens = tokenize(query)
     text_tokens = tokenize(text)
-    token_scores = []
+    candidates = _token_candidates(tokenize(query), TrigramIndex(text_tokens))
+    return _combine_scores(query, text, text_tokens, candidates)
 
-    for q in query_tokens:
-        best = 0.0
-        for t in text_tokens:
-            ratio = SequenceMatcher(None, q, t).ratio()
-            if q and t and (q.startswith(t[:1]) or t.startswith(q[:1])):
-                ratio += 0.05
-            best = max(best, ratio)
-        token_scores.append(best)
-
-    if not token_scores:
-        return SequenceMatcher(None, query, text).ratio()
 
-    whole_ratio = SequenceMatcher(None, query, text).ratio()
-    avg_token = sum(token_scores) / len(token_scores)
-    return max(avg_token, whole_ratio * 0.85)
+def rank_queryset_by_search(queryset, search, value_getter, min_score=0.45):
+    query = normalize_text(search)
+    if not query:
+        return []
 
+    documents = []
+    for obj in queryset:
+        text = normalize_text(value_getter(obj))
+        if text:
+            documents.append((obj.id, text, tokenize(text)))
+
+    # Один словарь на всю выборку: fuzzy-кандидаты ищутся по триграммам один раз на токен запроса.
+    vocabulary = TrigramIndex(word for _, _, tokens in documents for word in tokens)
+    candidates = _token_candidates(tokenize(query), vocabulary)
 
-def rank_queryset_by_search(queryset, search, value_getter, min_score=0.45):
     ranked = []
-    for obj in queryset:
-        haystack = value_getter(obj)
-        score = score_similarity(search, haystack)
+    for obj_id, text, text_tokens in documents:
+        if query in text:
+            score = 1.0
+        else:
+            score = _combine_scores(query, text, text_tokens, candidates)
+
+        if score >= min_score:
+            ranked.append((score, obj_id))
+
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return [obj_id for _, obj_id in ranked]
+
+
+# --- Поисковый индекс каталога ------------------------------------------------
+# Нормализованный текст вуза/программы и его слова хранятся в CatalogSearchDocument /
+# CatalogSearchTerm и обновляются сигналами (catalog/signals.py). Запрос затрагивает
+# только документы, в которых есть слова, похожие на слова запроса, поэтому
+# поиск охватывает весь каталог без загрузки всех строк в Python.
+
+MAX_TERM_LENGTH = 100
+
+_vocabulary_cache = {}
+
+
+def university_search_text(university):
+    return ' '.join(
+        filter(
+            None,
+            [
+                university.name,
+                university.country,
+                university.city,
+                university.description,
+                university.required_docs,
+            ],
+        )
+    )
+
+
+def program_search_text(program):
+    university = program.university
+    return ' '.join(
+        filter(
+            None,
+            [
+                program.name,
+                program.degree,
+                program.get_degree_display(),
+                getattr(university, 'name', ''),
+                getattr(university, 'country', ''),
+                getattr(university, 'city', ''),
+            ],
+        )
+    )
+
+
+def _index_object(kind, obj, text):
+    text = normalize_text(text)
+    document, _ = CatalogSearchDocument.objects.update_or_create(
+        **{kind: obj},
+        defaults={'kind': kind, 'text': text},
+    )
+
+    document.terms.all().delete()
+    CatalogSearchTerm.objects.bulk_create([
+        CatalogSearchTerm(document=document, kind=kind, term=term)
+        for term in dict.fromkeys(word[:MAX_TERM_LENGTH] for word in tokenize(text))
+    ])
+    return document
+
+
+@transaction.atomic
+def index_university(university, with_programs=True):
+    _index_object('university', university, university_search_text(university))
+
+    if with_programs:
+        # Название, страна и город вуза входят в текст каждой его программы.
+        for program in university.programs.select_related('university'):
+            index_program(program)
+
+
+@transaction.atomic
+def index_program(program):
+    _index_object('program', program, program_search_text(program))
+
+
+def rebuild_catalog_search_index():
+    with transaction.atomic():
+        CatalogSearchDocument.objects.all().delete()
+
+        universities = 0
+        for university in University.objects.iterator():
+            index_university(university, with_programs=False)
+            universities += 1
+
+        programs = 0
+        for program in Program.objects.select_related('university').iterator():
+            index_program(program)
+            programs += 1
+
+    return universities, programs
+
+
+def _get_vocabulary(kind, stamp):
+    cached = _vocabulary_cache.get(kind)
+    if cached is None or cached[0] != stamp:
+        vocabulary = TrigramIndex(
+            CatalogSearchTerm.objects.filter(kind=kind)
+            .order_by()
+            .values_list('term', flat=True)
+            .distinct()
+        )
+        cached = (stamp, vocabulary)
+        _vocabulary_cache[kind] = cached
+
+    return cached[1]
+
+
+def search_catalog_ids(kind, search, min_score=0.45):
+    """
+    Ранжированные ID вузов/программ по поисковому индексу.
+    Возвращает None, если индекс ещё не построен.
+    """
+    query = normalize_text(search)
+    if not query:
+        return []
+
+    stamp = CatalogSearchDocument.objects.filter(kind=kind).aggregate(
+        total=Count('id'),
+        last_indexed_at=Max('indexed_at'),
+    )
+    if not stamp['total']:
+        return None
+
+    vocabulary = _get_vocabulary(kind, (stamp['total'], stamp['last_indexed_at']))
+    query_tokens = tokenize(query)
+    candidates = _token_candidates(query_tokens, vocabulary)
+
+    terms = set()
+    for scores in candidates:
+        terms.update(scores)
+    for token in query_tokens:
+        terms.update(vocabulary.containing(token))
+
+    if not terms:
+        return []
+
+    rows = (
+        CatalogSearchDocument.objects
+        .filter(kind=kind, terms__kind=kind, terms__term__in=terms)
+        .distinct()
+        .values_list(f'{kind}_id', 'text')
+    )
+
+    ranked = []
+    for obj_id, text in rows:
+        if query in text:
+            score = 1.0
+        else:
+            score = _combine_scores(query, text, tokenize(text), candidates)
+
         if score >= min_score:
-            ranked.append((score, obj.id))
+            ranked.append((score, obj_id))
 
     ranked.sort(key=lambda item: (-item[0], item[1]))
-    return [obj_id for _, obj_id in ranked]
\ No newline at end of file
+    return [obj_id for _, obj_id in ranked]
@@ -0,0 +1,63 @@
+from django.db import models
+
+
+class CatalogSearchDocument(models.Model):
+    KIND_CHOICES = (
+        ('university', 'Университет'),
+        ('program', 'Программа'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    university = models.OneToOneField(
+        'catalog.University',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_document',
+    )
+    program = models.OneToOneField(
+        'catalog.Program',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_document',
+    )
+    text = models.TextField('Нормализованный текст', blank=True, default='')
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Поисковый документ каталога'
+        verbose_name_plural = 'Поисковый индекс каталога'
+        indexes = [
+            models.Index(fields=['kind', 'indexed_at'], name='catalog_search_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.university_id or self.program_id}'
+
+    @property
+    def object_id(self):
+        return self.university_id if self.kind == 'university' else self.program_id
+
+
+class CatalogSearchTerm(models.Model):
+    document = models.ForeignKey(
+        CatalogSearchDocument,
+        on_delete=models.CASCADE,
+        related_name='terms',
+    )
+    kind = models.CharField(max_length=20)
+    term = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса каталога'
+        verbose_name_plural = 'Слова поискового индекса каталога'
+        indexes = [
+            models.Index(fields=['kind', 'term'], name='catalog_search_term_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'term'], name='catalog_search_term_unique'),
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,42 @@
+# catalog/signals.py
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.db.utils import OperationalError, ProgrammingError
+from django.dispatch import receiver
+
+from students_life.response_cache import invalidate_on_change
+
+from .models import Currency, Program, University
+from .search import index_program, index_university
+
+logger = logging.getLogger(__name__)
+
+# Кэш ответов API каталога: вузы показывают валюту и число программ, программы — вуз и валюту
+invalidate_on_change(('catalog.currency', 'catalog.university', 'catalog.program'), Currency)
+invalidate_on_change(('catalog.university', 'catalog.program'), University, Program)
+
+
+def _run_index_update(func, *args):
+    def _update():
+        try:
+            func(*args)
+        except (ProgrammingError, OperationalError):
+            logger.warning('Catalog search index is unavailable, skipping update', exc_info=True)
+
+    transaction.on_commit(_update)
+
+
+@receiver(post_save, sender=University)
+def reindex_university_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _run_index_update(index_university, instance)
+
+
+@receiver(post_save, sender=Program)
+def reindex_program_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _run_index_update(index_program, instance)
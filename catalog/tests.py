@@ -1,3 +1,64 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from .models import CatalogSearchDocument, Program, University
+
+
+class CatalogSearchTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, country in (('Пекинский университет', 'Китай'), ('Московский институт', 'Россия')):
+                university = University.objects.create(
+                    name=name,
+                    country=country,
+                    city='Город',
+                    description='Описание',
+                    intake_period='Сентябрь',
+                    required_docs='Паспорт',
+                    contacts='-',
+                )
+                Program.objects.create(
+                    university=university,
+                    name='Computer Science',
+                    degree='bachelor',
+                    tuition_fee=Decimal('1000'),
+                    duration='4',
+                )
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user(email='user@example.com', password='x'))
+
+    def _names(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_search_uses_index(self):
+        self.assertEqual(CatalogSearchDocument.objects.count(), 4)
+        self.assertEqual(self._names('/api/catalog/universities/?search=пекинскии')[0], 'Пекинский университет')
+
+    def test_search_falls_back_to_text_builder_without_index(self):
+        CatalogSearchDocument.objects.all().delete()
+
+        with self.assertLogs('catalog.views', level='WARNING'):
+            self.assertEqual(self._names('/api/catalog/universities/?search=пекинскии')[0], 'Пекинский университет')
+        with self.assertLogs('catalog.views', level='WARNING'):
+            self.assertEqual(len(self._names('/api/catalog/programs/?search=computer&country=Китай')), 1)
+
+
+class CatalogResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user(email='user@example.com', password='x'))
+
+    def test_http_and_https_are_cached_separately(self):
+        self.assertEqual(self.api.get('/api/catalog/currencies/')['X-Cache'], 'MISS')
+        self.assertEqual(self.api.get('/api/catalog/currencies/')['X-Cache'], 'HIT')
 
-# Create your tests here.
+        self.assertEqual(self.api.get('/api/catalog/currencies/', secure=True)['X-Cache'], 'MISS')
+        self.assertEqual(self.api.get('/api/catalog/currencies/', secure=True)['X-Cache'], 'HIT')
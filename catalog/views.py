@@ -1,10 +1,20 @@
-from django.db.models import Case, Count, IntegerField, Q, When
+import logging
+
+from django.db.models import Count, Q
 from django.utils.dateparse import parse_datetime
 from rest_framework import permissions, viewsets
+from rest_framework.response import Response
+
+from students_life.response_cache import CachedResponseMixin
 
 from .models import Currency, University, Program
 from .pagination import ProgramPagination, UniversityPagination
-from .search import rank_queryset_by_search
+from .search import (
+    program_search_text,
+    rank_queryset_by_search,
+    search_catalog_ids,
+    university_search_text,
+)
 from .serializers import (
     CurrencySerializer,
     ProgramSerializer,
@@ -12,10 +22,67 @@ from .serializers import (
     UniversityListSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+
+class SearchIndexListMixin:
+    """
+    ?search= отвечает поисковый индекс каталога: ранжируются все подходящие записи,
+    а из базы загружается только текущая страница.
+
+    search_text_builder — функция объект -> текст для поиска; нужна, пока индекс
+    не построен и поиск идёт перебором.
+    """
+    search_kind = None
+    search_text_builder = None
+    search_min_score = 0.45
+    search_fallback_limit = 500
+
+    def get_ranked_ids(self, queryset, search):
+        ranked_ids = search_catalog_ids(self.search_kind, search, self.search_min_score)
+        if ranked_ids is None:
+            # Индекс ещё не построен (нет миграции / rebuild_catalog_search_index) — старый перебор.
+            logger.warning('Catalog search index is empty, falling back to in-memory ranking')
+            return rank_queryset_by_search(
+                list(queryset[:self.search_fallback_limit]),
+                search,
+                self.search_text_builder,
+                min_score=self.search_min_score,
+            )
+
+        if not ranked_ids:
+            return []
+
+        allowed = set(queryset.filter(id__in=ranked_ids).values_list('id', flat=True))
+        return [pk for pk in ranked_ids if pk in allowed]
+
+    def list(self, request, *args, **kwargs):
+        search = (request.query_params.get('search') or '').strip()
+        if not search:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ranked_ids = self.get_ranked_ids(queryset, search)
+        if not ranked_ids:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(ranked_ids)
+        page_ids = page if page is not None else ranked_ids
+        objects = queryset.in_bulk(page_ids)
+        serializer = self.get_serializer(
+            [objects[pk] for pk in page_ids if pk in objects],
+            many=True,
+        )
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 
-class CurrencyViewSet(viewsets.ReadOnlyModelViewSet):
+class CurrencyViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CurrencySerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_scope = 'catalog.currency'
 
     def get_queryset(self):
         qs = Currency.objects.all()
@@ -27,9 +94,13 @@ class CurrencyViewSet(viewsets.ReadOnlyModelViewSet):
         return qs.order_by('-updated_at')
 
 
-class UniversityViewSet(viewsets.ReadOnlyModelViewSet):
+class UniversityViewSet(CachedResponseMixin, SearchIndexListMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    cache_scope = 'catalog.university'
     pagination_class = UniversityPagination
+    search_kind = 'university'
+    search_text_builder = staticmethod(university_search_text)
+    search_min_score = 0.43
 
     def get_queryset(self):
         qs = (
@@ -54,32 +125,6 @@ class UniversityViewSet(viewsets.ReadOnlyModelViewSet):
         if country and country != 'all':
             qs = qs.filter(country=country)
 
-        search = (self.request.query_params.get('search') or '').strip()
-        if search:
-            ranked_ids = rank_queryset_by_search(
-                list(qs[:500]),
-                search,
-                lambda obj: ' '.join(
-                    filter(
-                        None,
-                        [
-                            obj.name,
-                            obj.country,
-                            obj.city,
-                            getattr(obj, 'description', ''),
-                            getattr(obj, 'required_docs', ''),
-                        ],
-                    )
-                ),
-                min_score=0.43,
-            )
-            if ranked_ids:
-                preserved = Case(
-                    *[When(id=pk, then=pos) for pos, pk in enumerate(ranked_ids)],
-                    output_field=IntegerField(),
-                )
-                return qs.filter(id__in=ranked_ids).order_by(preserved)
-
         return qs.order_by('name')
 
     def get_serializer_class(self):
@@ -88,10 +133,15 @@ class UniversityViewSet(viewsets.ReadOnlyModelViewSet):
         return UniversityListSerializer
 
 
-class ProgramViewSet(viewsets.ReadOnlyModelViewSet):
+class ProgramViewSet(CachedResponseMixin, SearchIndexListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ProgramSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_scope = 'catalog.program'
     pagination_class = ProgramPagination
+    search_kind = 'program'
+    search_text_builder = staticmethod(program_search_text)
+    search_min_score = 0.42
+    search_fallback_limit = 1000
 
     def get_queryset(self):
         qs = (
@@ -125,36 +175,9 @@ class ProgramViewSet(viewsets.ReadOnlyModelViewSet):
             except Exception:
                 pass
 
-        search = (self.request.query_params.get('search') or '').strip()
-        if search:
-            ranked_ids = rank_queryset_by_search(
-                list(qs[:1000]),
-                search,
-                lambda obj: ' '.join(
-                    filter(
-                        None,
-                        [
-                            obj.name,
-                            obj.degree,
-                            getattr(obj.university, 'name', ''),
-                            getattr(obj.university, 'country', ''),
-                            getattr(obj.university, 'city', ''),
-                        ],
-                    )
-                ),
-                min_score=0.42,
-            )
-            if ranked_ids:
-                preserved = Case(
-                    *[When(id=pk, then=pos) for pos, pk in enumerate(ranked_ids)],
-                    output_field=IntegerField(),
-                )
-                qs = qs.filter(id__in=ranked_ids).order_by(preserved)
-                return qs
-
         sort = self.request.query_params.get('sort')
         if sort == 'price_asc':
             return qs.order_by('tuition_fee', 'name')
         if sort == 'price_desc':
             return qs.order_by('-tuition_fee', 'name')
-        return qs.order_by('name')
\ No newline at end of file
+        return qs.order_by('name')
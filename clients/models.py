@@ -59,6 +59,9 @@ class Client(models.Model):
     class Meta:
         verbose_name = "Клиент"
         verbose_name_plural = "Клиенты"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='client_updated_keyset_idx'),
+        ]
 
 
 class ClientRelative(models.Model):
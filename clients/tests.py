@@ -1,3 +1,51 @@
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.models import User
+
+from .models import Client
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@example.com', password='x')
+        self.api = APIClient()
+        self.api.force_authenticate(self.manager)
+        for index in range(7):
+            Client.objects.create(full_name=f'Клиент {index}', phone='+99365000000', city='Ашхабад', manager=self.manager)
+        # Все клиенты с одним updated_at: порядок держится только на id
+        Client.objects.update(updated_at=timezone.now())
+        self.expected = list(Client.objects.order_by('-id').values_list('id', flat=True))
+
+    def _page(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_pages_at_ties(self):
+        seen = []
+        url = '/api/clients/?pagination=cursor&limit=3'
+        while url:
+            data = self._page(url)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_page_at_ties(self):
+        first = self._page('/api/clients/?pagination=cursor&limit=3')
+        second = self._page(first['next'])
+        third = self._page(second['next'])
+        self.assertIsNone(third['next'])
+
+        back = self._page(third['previous'])
+        self.assertEqual([item['id'] for item in back['results']], self.expected[3:6])
+        self.assertIsNotNone(back['next'])
+
+        back = self._page(back['previous'])
+        self.assertEqual([item['id'] for item in back['results']], self.expected[:3])
+        self.assertIsNone(back['previous'])
+
+    def test_broken_cursor_is_rejected(self):
+        self.assertEqual(self.api.get('/api/clients/?cursor=broken').status_code, 404)
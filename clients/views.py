@@ -6,6 +6,8 @@ from rest_framework import permissions, status, viewsets, parsers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from search.index import search_queryset
+
 from .models import Client
 from .serializers import ClientSerializer
 
@@ -16,6 +18,8 @@ class ClientViewSet(viewsets.ModelViewSet):
     serializer_class = ClientSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
+    # ?pagination=cursor: лента по дате изменения (архивные клиенты не уходят в конец)
+    keyset_ordering = ('-updated_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -53,6 +57,11 @@ class ClientViewSet(viewsets.ModelViewSet):
 
         search = self.request.query_params.get('search')
         if search:
+            ranked = search_queryset(qs, 'clients', search)
+            if ranked is not None:
+                self.search_ranked = True
+                return ranked
+
             qs = qs.filter(
                 Q(full_name__icontains=search) |
                 Q(phone__icontains=search) |
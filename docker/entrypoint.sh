@@ -10,6 +10,11 @@ echo "✅ PostgreSQL is up"
 
 echo "⏳ Running migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
+# Документы поиска для записей, созданных до появления индекса (если индекс актуален — быстро)
+python manage.py rebuild_search_index --missing
+# Индекс базы знаний невелик — перестраивается целиком (после миграции таблицы индекса пусты)
+python manage.py rebuild_knowledge_index
 
 echo "📦 Collecting static..."
 python manage.py collectstatic --noinput --clear
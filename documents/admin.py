@@ -9,6 +9,7 @@ from unfold.admin import ModelAdmin, TabularInline
 from unfold.decorators import action, display
 
 from .models import (
+    DocumentConversionJob,
     DocumentReview,
     DocumentTemplate,
     GeneratedDocument,
@@ -601,4 +602,33 @@ class GeneratedDocumentAdmin(ModelAdmin):
                 '⏳ Ожидает одобрения',
             )
 
-        return '—'
\ No newline at end of file
+        return '—'
+
+
+@admin.register(DocumentConversionJob)
+class DocumentConversionJobAdmin(ModelAdmin):
+    list_display = (
+        'id',
+        'document',
+        'status',
+        'attempts',
+        'worker',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('document__title',)
+    readonly_fields = (
+        'document',
+        'requested_by',
+        'status',
+        'error',
+        'attempts',
+        'worker',
+        'created_at',
+        'started_at',
+        'finished_at',
+    )
+
+    def has_add_permission(self, request):
+        return False
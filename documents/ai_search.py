@@ -4,9 +4,15 @@ import re
 import time
 import urllib.parse
 from difflib import SequenceMatcher
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
-from documents.models import InfoSnippet, KnowledgeSection
+from django.conf import settings
+from django.db.models import Q
+from django.db.utils import OperationalError, ProgrammingError
+
+from documents.models import InfoSnippet, KnowledgeIndexDocument, KnowledgeSection
+from students_life.fuzzy import TrigramIndex, get_index
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +20,7 @@ logger = logging.getLogger(__name__)
 # Внешний ИИ полностью отключён: никаких Yandex GPT / OpenAI / Gemini API.
 # Ответы строятся только локально: приветствия, команды, fuzzy-поиск, база знаний.
 
-THINKING_DELAY_SECONDS = 2
+DEFAULT_THINKING_DELAY_SECONDS = 2
 
 MAX_SNIPPETS_FOR_OVERVIEW = 25
 MAX_SNIPPETS_FOR_ANSWER = 8
@@ -228,9 +234,53 @@ STOP_WORDS = {
 }
 
 
+def get_thinking_delay_seconds() -> float:
+    """
+    Сколько длится «думание» ассистента. Клиент получает это значение
+    и сам показывает анимацию, не занимая воркер сервера.
+    """
+    value = getattr(settings, "AI_ASSISTANT_THINKING_DELAY_SECONDS", DEFAULT_THINKING_DELAY_SECONDS)
+
+    try:
+        return max(float(value or 0), 0.0)
+    except (TypeError, ValueError):
+        return float(DEFAULT_THINKING_DELAY_SECONDS)
+
+
 def _apply_thinking_delay():
-    if THINKING_DELAY_SECONDS and THINKING_DELAY_SECONDS > 0:
-        time.sleep(THINKING_DELAY_SECONDS)
+    # Блокирующая пауза внутри sync-воркера gunicorn — только если явно включена.
+    if not getattr(settings, "AI_ASSISTANT_SERVER_THINKING_DELAY", False):
+        return
+
+    delay = get_thinking_delay_seconds()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def split_answer_chunks(answer: str) -> List[str]:
+    """
+    Делит готовый ответ на абзацы для потоковой отдачи клиенту.
+    Блоки ``` для копирования не разрываются.
+    """
+    chunks = []
+    current = []
+    in_fence = False
+
+    for line in str(answer or "").split("\n"):
+        if line.strip().startswith(COPY_FENCE):
+            in_fence = not in_fence
+
+        if not line.strip() and not in_fence and current:
+            chunks.append("\n".join(current) + "\n\n")
+            current = []
+            continue
+
+        current.append(line)
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
 
 
 def _normalize_text(value: str) -> str:
@@ -267,31 +317,45 @@ def _similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a, b).ratio()
 
 
-def _token_fuzzy_match(token: str, words: List[str], threshold: float = 0.82) -> bool:
+def _fuzzy_index(words: List[str]) -> TrigramIndex:
+    # Слова длиной <= 3 символов в fuzzy-сравнении не участвуют.
+    return TrigramIndex(word for word in words if len(word) > 3)
+
+
+def _token_fuzzy_match(token: str, index: TrigramIndex, threshold: float = 0.82) -> bool:
     if not token or len(token) <= 3:
         return False
 
-    for word in words:
-        if len(word) <= 3:
-            continue
+    if index.containing(token) or index.contained_in(token, min_length=4):
+        return True
 
-        if token in word or word in token:
-            return True
+    return bool(index.similar(token, threshold))
 
-        if SequenceMatcher(None, token, word).ratio() >= threshold:
-            return True
 
-    return False
+_synonym_keys: Dict[str, List[str]] = {}
+
+
+def _synonym_index() -> TrigramIndex:
+    if not _synonym_keys:
+        for key in SYNONYMS:
+            _synonym_keys.setdefault(_normalize_text(key), []).append(key)
+
+    return get_index(tuple(_synonym_keys))
 
 
 def _expand_query_tokens(query: str) -> List[str]:
     base_tokens = _tokens(query)
     expanded = list(base_tokens)
+    index = _synonym_index()
 
     for token in base_tokens:
-        for key, values in SYNONYMS.items():
-            if token == key or _similarity(token, key) >= 0.84:
-                expanded.extend(_tokens(" ".join(values)))
+        matched_keys = set(SYNONYMS) & {token}
+        for normalized_key in index.similar(_normalize_text(token), 0.84):
+            matched_keys.update(_synonym_keys[normalized_key])
+
+        for key in SYNONYMS:
+            if key in matched_keys:
+                expanded.extend(_tokens(" ".join(SYNONYMS[key])))
 
     seen = set()
     clean = []
@@ -304,6 +368,16 @@ def _expand_query_tokens(query: str) -> List[str]:
     return clean
 
 
+@lru_cache(maxsize=64)
+def _phrase_index(phrases: Tuple[str, ...]) -> TrigramIndex:
+    phrase_tokens = []
+
+    for phrase in phrases:
+        phrase_tokens.extend(_tokens(phrase))
+
+    return _fuzzy_index(phrase_tokens)
+
+
 def _matches_phrase_or_fuzzy(query: str, phrases: List[str], threshold: float = 0.76) -> bool:
     normalized_query = _normalize_text(query)
 
@@ -320,18 +394,15 @@ def _matches_phrase_or_fuzzy(query: str, phrases: List[str], threshold: float =
             return True
 
     query_tokens = _tokens(normalized_query)
-    phrase_tokens = []
-
-    for phrase in phrases:
-        phrase_tokens.extend(_tokens(phrase))
+    phrase_index = _phrase_index(tuple(phrases))
 
-    if not query_tokens or not phrase_tokens:
+    if not query_tokens or not phrase_index.words:
         return False
 
     matched = 0
 
     for token in query_tokens:
-        if _token_fuzzy_match(token, phrase_tokens, threshold=0.78):
+        if _token_fuzzy_match(token, phrase_index, threshold=0.78):
             matched += 1
 
     return matched >= max(1, min(2, len(query_tokens)))
@@ -441,7 +512,7 @@ def _load_knowledge():
     return snippets, sections
 
 
-def _score_snippet(query: str, snippet, query_tokens: List[str]) -> float:
+def _score_snippet(query: str, snippet, query_tokens: List[str], topic_token_groups: List[List[str]]) -> float:
     title = getattr(snippet, "title", "") or ""
     content = getattr(snippet, "content", "") or ""
     category = getattr(snippet, "category", "") or ""
@@ -453,10 +524,10 @@ def _score_snippet(query: str, snippet, query_tokens: List[str]) -> float:
     section_norm = _normalize_text(section_path)
     category_norm = _normalize_text(_get_category_label(category))
 
-    title_words = _tokens(title_norm)
-    content_words = _tokens(content_norm[:6000])
-    section_words = _tokens(section_norm)
-    category_words = _tokens(category_norm)
+    title_words = _fuzzy_index(_tokens(title_norm))
+    content_words = _fuzzy_index(_tokens(content_norm[:6000])[:400])
+    section_words = _fuzzy_index(_tokens(section_norm))
+    category_words = _fuzzy_index(_tokens(category_norm))
 
     score = 0.0
     normalized_query = _normalize_text(query)
@@ -492,26 +563,24 @@ def _score_snippet(query: str, snippet, query_tokens: List[str]) -> float:
         if _token_fuzzy_match(token, category_words, threshold=0.80):
             score += 3
 
-        if _token_fuzzy_match(token, content_words[:400], threshold=0.84):
+        if _token_fuzzy_match(token, content_words, threshold=0.84):
             score += 1
 
-    for topic in BROWSE_TOPICS.values():
-        if _matches_phrase_or_fuzzy(query, topic["aliases"], threshold=0.78):
-            topic_tokens = _tokens(" ".join(topic["aliases"]))
-            haystack = f"{title_norm} {section_norm} {category_norm}"
-
-            if any(token in haystack for token in topic_tokens):
-                score += 5
+    haystack = f"{title_norm} {section_norm} {category_norm}"
+    for topic_tokens in topic_token_groups:
+        if any(token in haystack for token in topic_tokens):
+            score += 5
 
     return score
 
 
 def _rank_snippets(query: str, snippets: List) -> List[Tuple[float, object]]:
     query_tokens = _expand_query_tokens(query)
+    topic_token_groups = _matched_topic_tokens(query)
     ranked = []
 
     for snippet in snippets:
-        score = _score_snippet(query, snippet, query_tokens)
+        score = _score_snippet(query, snippet, query_tokens, topic_token_groups)
         ranked.append((score, snippet))
 
     ranked.sort(
@@ -568,7 +637,7 @@ def _find_matching_sections(query: str, sections: List) -> List:
         path = _get_section_path(section)
         title = getattr(section, "title", "") or ""
         haystack = f"{title} {path}"
-        hay_tokens = _tokens(haystack)
+        hay_tokens = _fuzzy_index(_tokens(haystack))
 
         score = 0.0
         normalized_query = _normalize_text(query)
@@ -592,6 +661,228 @@ def _find_matching_sections(query: str, sections: List) -> List:
     return [item[1] for item in ranked[:10]]
 
 
+INDEX_FIELD_WEIGHTS = {
+    # поле индекса: (вхождение слова, fuzzy-совпадение, порог fuzzy)
+    "title": (7, 4, 0.80),
+    "section": (6, 4, 0.80),
+    "category": (5, 3, 0.80),
+    "content": (2, 1, 0.84),
+}
+
+SECTION_INDEX_WEIGHTS = (4, 2, 0.80)
+
+
+def _match_vocabulary(token: str, vocabulary: TrigramIndex) -> Dict[str, Tuple[bool, float]]:
+    """
+    Слова индекса, подходящие под токен запроса:
+    term -> (токен входит в слово, fuzzy-оценка в духе _token_fuzzy_match).
+    """
+    matches = {term: (True, 0.0) for term in vocabulary.containing(token)}
+
+    if len(token) <= 3:
+        return matches
+
+    for term in matches:
+        if len(term) > 3:
+            matches[term] = (True, 1.0)
+
+    for term in vocabulary.contained_in(token, min_length=4):
+        matches[term] = (token in term, 1.0)
+
+    for term, ratio in vocabulary.similar(token, 0.80).items():
+        if len(term) > 3 and term not in matches:
+            matches[term] = (False, ratio)
+
+    return matches
+
+
+def _matched_topic_tokens(query: str) -> List[List[str]]:
+    topic_tokens = []
+
+    for topic in BROWSE_TOPICS.values():
+        if _matches_phrase_or_fuzzy(query, topic["aliases"], threshold=0.78):
+            topic_tokens.append(_tokens(" ".join(topic["aliases"])))
+
+    return topic_tokens
+
+
+def _search_index(query: str, with_sections: bool):
+    """
+    Поиск по инвертированному индексу (documents/knowledge_index.py).
+    Затрагивает только слова запроса, а не всю базу знаний.
+    Возвращает None, если индекс ещё не построен — тогда работает полный перебор.
+    """
+    from documents import knowledge_index
+
+    stamp, snippets_count = knowledge_index.get_index_stats()
+    _, indexed_snippets, _ = stamp
+
+    if snippets_count and indexed_snippets < snippets_count:
+        logger.warning(
+            "AI Search index is incomplete (%s of %s snippets), run rebuild_knowledge_index",
+            indexed_snippets,
+            snippets_count,
+        )
+        return None
+
+    if not snippets_count:
+        return [], [], 0
+
+    vocabulary = knowledge_index.get_vocabulary(stamp)
+    query_tokens = _expand_query_tokens(query)
+    token_matches = {token: _match_vocabulary(token, vocabulary) for token in query_tokens}
+
+    topic_token_groups = _matched_topic_tokens(query)
+    topic_terms = set()
+    for topic_tokens in topic_token_groups:
+        for topic_token in topic_tokens:
+            topic_terms.update(vocabulary.containing(topic_token))
+
+    all_terms = set(topic_terms)
+    for matches in token_matches.values():
+        all_terms.update(matches)
+
+    postings = knowledge_index.fetch_postings(all_terms)
+
+    # document_id -> {(token, field): (есть вхождение, лучшая fuzzy-оценка)}
+    hits: Dict[int, Dict[Tuple[str, str], Tuple[bool, float]]] = {}
+    owners: Dict[int, Tuple[Optional[int], Optional[int]]] = {}
+
+    for posting in postings:
+        document_id = posting["document_id"]
+        owners[document_id] = (posting["document__snippet_id"], posting["document__section_id"])
+        doc_hits = hits.setdefault(document_id, {})
+
+        for token, matches in token_matches.items():
+            match = matches.get(posting["term"])
+            if not match:
+                continue
+
+            contains, ratio = match
+            if posting["field"] == "content" and not posting["in_lead"]:
+                ratio = 0.0
+
+            key = (token, posting["field"])
+            old_contains, old_ratio = doc_hits.get(key, (False, 0.0))
+            doc_hits[key] = (old_contains or contains, max(old_ratio, ratio))
+
+    normalized_query = _normalize_text(query)
+    document_ids = set(hits)
+
+    if not query_tokens and normalized_query:
+        phrase_ids = KnowledgeIndexDocument.objects.filter(
+            Q(title_norm__contains=normalized_query)
+            | Q(section_norm__contains=normalized_query)
+            | Q(content_norm__contains=normalized_query)
+        ).values_list("id", "snippet_id", "section_id")
+
+        for document_id, snippet_id, section_id in phrase_ids:
+            document_ids.add(document_id)
+            owners[document_id] = (snippet_id, section_id)
+
+    norms = {}
+    if document_ids:
+        norms = {
+            row["id"]: row
+            for row in KnowledgeIndexDocument.objects.filter(id__in=document_ids).values(
+                "id", "title_norm", "section_norm", "category_norm", "content_norm",
+            )
+        }
+
+    snippet_scores = []
+    section_scores = []
+
+    for document_id in document_ids:
+        snippet_id, section_id = owners[document_id]
+        doc_hits = hits.get(document_id, {})
+        norm = norms.get(document_id)
+        if not norm:
+            continue
+
+        score = 0.0
+
+        if snippet_id:
+            if normalized_query and normalized_query in norm["title_norm"]:
+                score += 20
+            if normalized_query and normalized_query in norm["section_norm"]:
+                score += 16
+            if normalized_query and normalized_query in norm["content_norm"]:
+                score += 10
+
+            for (token, field), (contains, ratio) in doc_hits.items():
+                contains_weight, fuzzy_weight, threshold = INDEX_FIELD_WEIGHTS[field]
+                if contains:
+                    score += contains_weight
+                if ratio >= threshold:
+                    score += fuzzy_weight
+
+            haystack = f"{norm['title_norm']} {norm['section_norm']} {norm['category_norm']}"
+            for topic_tokens in topic_token_groups:
+                if any(token in haystack for token in topic_tokens):
+                    score += 5
+
+            snippet_scores.append((score, snippet_id))
+
+        elif section_id and with_sections:
+            if normalized_query and normalized_query in f"{norm['title_norm']} {norm['section_norm']}":
+                score += 15
+
+            contains_weight, fuzzy_weight, threshold = SECTION_INDEX_WEIGHTS
+            for (token, field), (contains, ratio) in doc_hits.items():
+                if contains:
+                    score += contains_weight
+                if ratio >= threshold:
+                    score += fuzzy_weight
+
+            if score > 0:
+                section_scores.append((score, section_id))
+
+    snippet_scores.sort(reverse=True)
+    top_snippet_scores = [
+        item for item in snippet_scores
+        if item[0] >= MIN_RELEVANCE_SCORE
+    ][:MAX_SNIPPETS_FOR_OVERVIEW]
+
+    snippets_by_id = InfoSnippet.objects.select_related("section").in_bulk(
+        [snippet_id for _, snippet_id in top_snippet_scores]
+    )
+    ranked = [
+        (score, snippets_by_id[snippet_id])
+        for score, snippet_id in top_snippet_scores
+        if snippet_id in snippets_by_id
+    ]
+
+    matching_sections = []
+    if section_scores:
+        section_scores.sort(key=lambda item: item[0], reverse=True)
+        top_section_ids = [section_id for _, section_id in section_scores[:10]]
+        sections_by_id = KnowledgeSection.objects.select_related("parent").in_bulk(top_section_ids)
+        matching_sections = [
+            sections_by_id[section_id]
+            for section_id in top_section_ids
+            if section_id in sections_by_id
+        ]
+
+    return ranked, matching_sections, snippets_count
+
+
+def _load_ranked_knowledge(query: str, with_sections: bool):
+    try:
+        indexed = _search_index(query, with_sections)
+    except (ProgrammingError, OperationalError):
+        logger.warning("AI Search index is unavailable, falling back to full scan", exc_info=True)
+        indexed = None
+
+    if indexed is not None:
+        return indexed
+
+    snippets, sections = _load_knowledge()
+    ranked = _rank_snippets(query, snippets)
+    matching_sections = _find_matching_sections(query, sections) if with_sections else []
+
+    return ranked, matching_sections, len(snippets)
+
+
 def _build_sources_list(top_ranked: List[Tuple[float, object]]) -> str:
     sources = []
     seen = set()
@@ -613,7 +904,7 @@ def _build_sources_list(top_ranked: List[Tuple[float, object]]) -> str:
     return "\n".join(sources)
 
 
-def _render_folder_overview(query: str, ranked: List[Tuple[float, object]], sections: List) -> str:
+def _render_folder_overview(query: str, ranked: List[Tuple[float, object]], matching_sections: List) -> str:
     topic = _detect_browse_topic(query)
     topic_label = topic["label"] if topic else "запрошенной теме"
 
@@ -628,8 +919,6 @@ def _render_folder_overview(query: str, ranked: List[Tuple[float, object]], sect
         for _, snippet in useful_ranked[:MAX_SNIPPETS_FOR_OVERVIEW]
     ]
 
-    matching_sections = _find_matching_sections(query, sections)
-
     if not useful_snippets and not matching_sections:
         return (
             f"Я понял, что вы ищете информацию по теме **«{topic_label}»**, "
@@ -754,7 +1043,7 @@ def _render_no_relevant_answer(query: str, snippets_count: int) -> str:
     )
 
 
-def search_knowledge_base(query: str):
+def search_knowledge_base(query: str, apply_delay: bool = True):
     """
     Главная функция для endpoint /ask_ai/.
     documents/views.py ожидает строку и возвращает её как {'answer': answer}.
@@ -763,21 +1052,25 @@ def search_knowledge_base(query: str):
     - внешний ИИ отключён;
     - ответ формируется локально;
     - поиск работает по InfoSnippet и KnowledgeSection;
-    - добавлена имитация думания 2 секунды.
+    - имитация думания показывается клиентом (thinking_delay_ms),
+      серверная пауза включается только настройкой AI_ASSISTANT_SERVER_THINKING_DELAY.
     """
     query = str(query or "").strip()
 
     if not query:
         return "Введите ваш вопрос. Например: «что есть по вузам Китая?» или «найди скрипт продаж»."
 
-    _apply_thinking_delay()
+    if apply_delay:
+        _apply_thinking_delay()
 
     basic_intent = _detect_basic_intent(query)
     if basic_intent:
         return BASIC_INTENTS[basic_intent]["answer"]
 
+    is_broad_query = _is_broad_browse_query(query)
+
     try:
-        snippets, sections = _load_knowledge()
+        ranked, matching_sections, snippets_count = _load_ranked_knowledge(query, is_broad_query)
     except Exception as exc:
         logger.exception("AI Search failed to load knowledge base")
         return (
@@ -789,24 +1082,23 @@ def search_knowledge_base(query: str):
             f"Техническая ошибка: {exc}"
         )
 
-    if not snippets:
+    if not snippets_count:
         return (
             "База знаний пока пуста. Добавьте материалы через админ-панель: "
             "разделы, скрипты продаж, FAQ, документы, ссылки и инструкции."
         )
 
-    ranked = _rank_snippets(query, snippets)
     relevant_ranked = [
         item for item in ranked
         if item[0] >= MIN_RELEVANCE_SCORE
     ]
 
-    if _is_broad_browse_query(query):
-        return _render_folder_overview(query, ranked, sections)
+    if is_broad_query:
+        return _render_folder_overview(query, ranked, matching_sections)
 
     if not relevant_ranked:
-        return _render_no_relevant_answer(query, snippets_count=len(snippets))
+        return _render_no_relevant_answer(query, snippets_count=snippets_count)
 
     top_ranked = relevant_ranked[:MAX_SNIPPETS_FOR_ANSWER]
 
-    return _render_precise_local_answer(query, top_ranked)
\ No newline at end of file
+    return _render_precise_local_answer(query, top_ranked)
@@ -0,0 +1,195 @@
+# documents/batch_generation.py
+"""
+Пакетная генерация документов (GeneratedDocumentViewSet.bulk).
+
+Строки GeneratedDocument и DocumentReview создаются bulk_create, контексты
+собираются из одной выборки со связями, а рендер DOCX идёт в пуле процессов:
+задания группируются по шаблону, каждый процесс компилирует шаблон один раз
+(docx_cache.render_batch), поэтому пропускная способность растёт с числом ядер.
+Файлы сохраняются в хранилище, статусы записываются одним bulk_update.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from sync.changes import record_changes
+
+from .docx_cache import get_compiled_template, render_batch
+from .models import CONTEXT_RELATED_FIELDS, DocumentReview, GeneratedDocument
+from .review_guard import has_document_review_table
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ITEMS = 200
+# Меньше — рендерим в текущем процессе: запуск задач в пуле дороже самого рендера
+PARALLEL_MIN_ITEMS = 4
+RENDER_CHUNK_SIZE = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_max_items() -> int:
+    return int(getattr(settings, 'DOCUMENT_BULK_MAX_ITEMS', DEFAULT_MAX_ITEMS) or DEFAULT_MAX_ITEMS)
+
+
+def get_render_processes() -> int:
+    configured = int(getattr(settings, 'DOCUMENT_RENDER_PROCESSES', 0) or 0)
+    return configured if configured > 0 else max(1, min(os.cpu_count() or 1, 4))
+
+
+def _get_executor(processes: int) -> ProcessPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            # spawn, а не fork: дочерние процессы не должны наследовать соединения с БД
+            _executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _reset_executor() -> None:
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def render_many(tasks: list) -> list:
+    """
+    tasks — [(CompiledDocxTemplate, context)]. Возвращает [(ok, bytes | сообщение)]
+    в том же порядке.
+    """
+    results = [None] * len(tasks)
+
+    by_template = {}
+    for index, (compiled, context) in enumerate(tasks):
+        by_template.setdefault(compiled.key, (compiled, []))[1].append((index, context))
+
+    processes = get_render_processes()
+    if processes <= 1 or len(tasks) < PARALLEL_MIN_ITEMS:
+        for compiled, items in by_template.values():
+            for index, context in items:
+                try:
+                    results[index] = (True, compiled.render(context))
+                except Exception as exc:
+                    results[index] = (False, f'Ошибка DocxTemplate: {exc}')
+        return results
+
+    chunk_size = max(1, min(RENDER_CHUNK_SIZE, -(-len(tasks) // processes)))
+    executor = _get_executor(processes)
+
+    pending = []
+    for compiled, items in by_template.values():
+        for chunk in _chunks(items, chunk_size):
+            future = executor.submit(render_batch, compiled.key, compiled.data, [context for _, context in chunk])
+            pending.append((future, compiled, chunk))
+
+    for future, compiled, chunk in pending:
+        try:
+            chunk_results = future.result()
+        except BrokenProcessPool:
+            logger.exception('Document render pool is broken, rendering in-process')
+            _reset_executor()
+            chunk_results = render_batch(compiled.key, compiled.data, [context for _, context in chunk])
+        except Exception as exc:
+            chunk_results = [(False, f'Ошибка DocxTemplate: {exc}')] * len(chunk)
+
+        for (index, _), result in zip(chunk, chunk_results):
+            results[index] = result
+
+    return results
+
+
+def create_documents(items: list) -> list:
+    """
+    items — [{'template', 'deal', 'manager', 'title', 'context_data'}] после валидации.
+    Создаёт черновики и рендерит их; возвращает документы в исходном порядке,
+    у каждого выставлен generation_error (None, если файл сгенерирован).
+    """
+    if not items:
+        return []
+
+    review_table_ready = has_document_review_table()
+
+    with transaction.atomic():
+        created = GeneratedDocument.objects.bulk_create([
+            GeneratedDocument(status='draft', **item) for item in items
+        ])
+        if review_table_ready:
+            DocumentReview.objects.bulk_create(
+                [DocumentReview(document=document) for document in created],
+                ignore_conflicts=True,
+            )
+
+    loaded = GeneratedDocument.objects.select_related(*CONTEXT_RELATED_FIELDS).in_bulk(
+        [document.pk for document in created]
+    )
+    documents = [loaded[document.pk] for document in created]
+
+    tasks = []
+    renderable = []
+    compiled_by_template = {}
+    for document in documents:
+        document.generation_error = None
+        if not document.title:
+            document.title = document.build_default_title()
+
+        if not document.template.file:
+            document.generation_error = 'В шаблоне отсутствует файл DOCX.'
+            continue
+
+        try:
+            compiled = compiled_by_template.get(document.template_id)
+            if compiled is None:
+                compiled = compiled_by_template[document.template_id] = get_compiled_template(document.template)
+            tasks.append((compiled, document.build_context()))
+        except Exception as exc:
+            document.generation_error = f'Ошибка DocxTemplate: {exc}'
+            continue
+        renderable.append(document)
+
+    for document, (ok, payload) in zip(renderable, render_many(tasks)):
+        if not ok:
+            document.generation_error = payload
+            continue
+
+        try:
+            document.generated_file.save(document.build_filename(), ContentFile(payload), save=False)
+        except Exception as exc:
+            document.generation_error = f'Не удалось сохранить файл: {exc}'
+
+    now = timezone.now()
+    for document in documents:
+        document.status = 'error' if document.generation_error else 'generated'
+        document.approved_by = None
+        document.approved_at = None
+        document.updated_at = now
+        if document.generation_error:
+            logger.error('Bulk generation failed for document %s: %s', document.pk, document.generation_error)
+
+    GeneratedDocument.objects.bulk_update(
+        documents,
+        ['title', 'generated_file', 'status', 'approved_by', 'approved_at', 'updated_at'],
+    )
+    record_changes('documents', [document.pk for document in documents])
+
+    return documents
@@ -0,0 +1,311 @@
+# documents/conversion.py
+"""
+Очередь сборки approved-PDF и пул воркеров LibreOffice.
+
+Одобрение документа (GeneratedDocumentViewSet.approve) только ставит задание
+DocumentConversionJob и сразу отвечает клиенту; статус задания можно опрашивать.
+Задания выполняет `python manage.py run_document_converter`: несколько потоков,
+у каждого — свой постоянный профиль LibreOffice (без холодной инициализации
+профиля на каждый файл). Поток забирает из очереди пачку заданий и конвертирует
+их одним запуском soffice; сами процессы soffice работают параллельно на разных ядрах.
+"""
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentConversionJob, DocumentReview, GeneratedDocument, resolve_document_status
+from .review_guard import has_conversion_job_table
+from .watermarking import build_approved_documents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 4
+DEFAULT_POLL_INTERVAL_SECONDS = 2
+STALE_JOB_MINUTES = 15
+MAX_ATTEMPTS = 3
+
+
+def is_async_approval_enabled() -> bool:
+    return bool(getattr(settings, 'DOCUMENT_APPROVAL_ASYNC', True)) and has_conversion_job_table()
+
+
+def get_worker_count() -> int:
+    configured = int(getattr(settings, 'DOCUMENT_CONVERTER_WORKERS', 0) or 0)
+    return configured if configured > 0 else max(1, min(os.cpu_count() or 1, 4))
+
+
+def get_profile_root() -> Path:
+    raw = getattr(settings, 'DOCUMENT_CONVERTER_PROFILE_ROOT', '') or ''
+    if raw:
+        return Path(raw)
+    return Path(tempfile.gettempdir()) / 'managers_sl_lo_profiles'
+
+
+def enqueue_approval(document: GeneratedDocument, user) -> DocumentConversionJob:
+    """Ставит документ в очередь на сборку approved-PDF (повторный вызов вернёт активное задание)."""
+    with transaction.atomic():
+        GeneratedDocument.objects.select_for_update().filter(pk=document.pk).first()
+
+        active_job = (
+            DocumentConversionJob.objects
+            .filter(document=document, status__in=DocumentConversionJob.ACTIVE_STATUSES)
+            .order_by('-created_at')
+            .first()
+        )
+        if active_job:
+            return active_job
+
+        return DocumentConversionJob.objects.create(document=document, requested_by=user)
+
+
+def get_latest_job(document: GeneratedDocument):
+    if not has_conversion_job_table():
+        return None
+    return DocumentConversionJob.objects.filter(document=document).order_by('-created_at').first()
+
+
+def cancel_active_jobs(document: GeneratedDocument, reason: str) -> int:
+    if not has_conversion_job_table():
+        return 0
+
+    return DocumentConversionJob.objects.filter(
+        document=document,
+        status__in=DocumentConversionJob.ACTIVE_STATUSES,
+    ).update(
+        status=DocumentConversionJob.STATUS_ERROR,
+        error=reason,
+        finished_at=timezone.now(),
+    )
+
+
+def complete_approval(document: GeneratedDocument, user, approved_file, job: DocumentConversionJob | None = None):
+    """
+    Сохраняет approved-файл и одобряет документ.
+
+    С job (воркер конвертации) задание и документ блокируются и перепроверяются
+    в той же транзакции: если задание успели отменить (документ отклонили, изменили
+    или перегенерировали) или документ уже не в статусе generated, одобрение
+    не сохраняется и возвращается None. Задание завершается вместе с одобрением.
+    """
+    with transaction.atomic():
+        if job is not None:
+            locked_job = (
+                DocumentConversionJob.objects
+                .select_for_update()
+                .filter(pk=job.pk, worker=job.worker, status=DocumentConversionJob.STATUS_RUNNING)
+                .first()
+            )
+            if locked_job is None:
+                return None
+
+            current_status = (
+                GeneratedDocument.objects
+                .select_for_update()
+                .filter(pk=document.pk)
+                .values_list('status', flat=True)
+                .first()
+            )
+            if current_status == 'approved':
+                _finish_job(job, DocumentConversionJob.STATUS_DONE)
+                return None
+            if current_status != 'generated':
+                _finish_job(job, DocumentConversionJob.STATUS_ERROR, 'Документ изменён во время конвертации')
+                return None
+
+        review, _ = DocumentReview.objects.get_or_create(document=document)
+
+        if review.approved_file:
+            review.approved_file.delete(save=False)
+
+        review.mark_approved(user=user, approved_file=approved_file)
+        document.status = 'approved'
+        document.approved_by = user
+        document.approved_at = review.reviewed_at
+        document.save(update_fields=['status', 'approved_by', 'approved_at', 'updated_at'])
+
+        if job is not None:
+            _finish_job(job, DocumentConversionJob.STATUS_DONE)
+
+    # Чтобы сериализатор не взял закэшированный select_related('review') со старым статусом
+    document.review = review
+    return review
+
+
+def _finish_job(job: DocumentConversionJob, status: str, error: str = '') -> bool:
+    """Завершает задание этого воркера; отменённое или перехваченное задание не перезаписывается."""
+    finished_at = timezone.now()
+    updated = DocumentConversionJob.objects.filter(
+        pk=job.pk,
+        worker=job.worker,
+        status=DocumentConversionJob.STATUS_RUNNING,
+    ).update(status=status, error=error, finished_at=finished_at)
+
+    if updated:
+        job.status = status
+        job.error = error
+        job.finished_at = finished_at
+    return bool(updated)
+
+
+def requeue_stale_jobs() -> int:
+    """Возвращает в очередь задания, зависшие в running (воркер упал/перезапущен)."""
+    border = timezone.now() - timedelta(minutes=STALE_JOB_MINUTES)
+    stale = DocumentConversionJob.objects.filter(status=DocumentConversionJob.STATUS_RUNNING, started_at__lt=border)
+
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=DocumentConversionJob.STATUS_ERROR,
+        error='Превышено число попыток конвертации',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=DocumentConversionJob.STATUS_QUEUED, worker='')
+    return failed + requeued
+
+
+def claim_jobs(worker_name: str, limit: int) -> list:
+    with transaction.atomic():
+        job_ids = list(
+            DocumentConversionJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=DocumentConversionJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+
+        DocumentConversionJob.objects.filter(
+            id__in=job_ids,
+            status=DocumentConversionJob.STATUS_QUEUED,
+        ).update(
+            status=DocumentConversionJob.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+
+    return list(
+        DocumentConversionJob.objects
+        .filter(id__in=job_ids, worker=worker_name, status=DocumentConversionJob.STATUS_RUNNING)
+        .select_related('document', 'document__template', 'requested_by')
+    )
+
+
+def process_jobs(jobs: list, profile_dir: Path | None = None) -> None:
+    convertible = []
+
+    for job in jobs:
+        document = job.document
+        if resolve_document_status(document) == 'approved':
+            _finish_job(job, DocumentConversionJob.STATUS_DONE)
+        elif document.status != 'generated' or not document.generated_file:
+            _finish_job(job, DocumentConversionJob.STATUS_ERROR, 'Документ ещё не сгенерирован')
+        else:
+            convertible.append(job)
+
+    if not convertible:
+        return
+
+    results = build_approved_documents([job.document for job in convertible], profile_dir=profile_dir)
+
+    for job in convertible:
+        approved_file = results.get(job.document_id)
+        if approved_file is None:
+            _finish_job(
+                job,
+                DocumentConversionJob.STATUS_ERROR,
+                'Не удалось собрать approved-файл с watermark. Проверь DOCUMENT_WATERMARK_IMAGE.',
+            )
+            continue
+
+        try:
+            # Отмену задания за время конвертации complete_approval проверяет под блокировкой
+            complete_approval(job.document, job.requested_by, approved_file, job=job)
+        except Exception as exc:
+            logger.exception('Failed to save approved file for document %s', job.document_id)
+            _finish_job(job, DocumentConversionJob.STATUS_ERROR, str(exc))
+
+
+def _worker_loop(slot: int, batch_size: int, poll_interval: float, stop_event: threading.Event, once: bool) -> int:
+    worker_name = f'{socket.gethostname()}:{os.getpid()}:{slot}'
+    profile_dir = get_profile_root() / f'slot-{slot}'
+    processed = 0
+    last_requeue = time.monotonic()
+
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+
+            if slot == 0 and time.monotonic() - last_requeue > STALE_JOB_MINUTES * 60 / 3:
+                requeue_stale_jobs()
+                last_requeue = time.monotonic()
+
+            try:
+                jobs = claim_jobs(worker_name, batch_size)
+                if jobs:
+                    process_jobs(jobs, profile_dir=profile_dir)
+                    processed += len(jobs)
+            except Exception:
+                logger.exception('Document converter slot %s failed', slot)
+                jobs = []
+
+            if once and not jobs:
+                break
+
+            if not jobs:
+                stop_event.wait(poll_interval)
+    finally:
+        close_old_connections()
+
+    return processed
+
+
+def run_worker_pool(
+    workers: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    once: bool = False,
+    stop_event: threading.Event | None = None,
+) -> int:
+    """
+    Запускает пул воркеров конвертации. once=True — разобрать текущую очередь и выйти.
+    Возвращает количество обработанных заданий.
+    """
+    workers = workers or get_worker_count()
+    stop_event = stop_event or threading.Event()
+    requeue_stale_jobs()
+
+    processed = []
+    lock = threading.Lock()
+
+    def _target(slot):
+        count = _worker_loop(slot, batch_size, poll_interval, stop_event, once)
+        with lock:
+            processed.append(count)
+
+    threads = [
+        threading.Thread(target=_target, args=(slot,), name=f'document-converter-{slot}', daemon=True)
+        for slot in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    return sum(processed)
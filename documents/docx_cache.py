@@ -0,0 +1,177 @@
+# documents/docx_cache.py
+"""
+Кэш скомпилированных DOCX-шаблонов для генерации документов.
+
+На каждый generate DocxTemplate заново читает файл из хранилища, вытаскивает
+XML тела/колонтитулов, прогоняет patch_xml и компилирует Jinja-шаблон — компиляция
+занимает бо́льшую часть времени рендера. Здесь байты шаблона и скомпилированные
+Jinja-шаблоны частей документа кэшируются в процессе (LRU), ключ — id шаблона,
+имя файла, дата изменения и размер файла в хранилище. Замена файла шаблона
+меняет ключ, и старая запись вытесняется сама.
+
+Подкласс DocxTemplate опирается на внутренние методы docxtpl (версия зафиксирована
+в requirements.txt).
+"""
+import hashlib
+import io
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from docxtpl import DocxTemplate
+from jinja2 import Template
+
+DEFAULT_CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Кэш внутри процессов пула пакетной генерации (documents.batch_generation)
+_worker_templates = {}
+
+
+class CompiledDocxTemplate:
+    def __init__(self, data: bytes, key=None):
+        self.data = data
+        self.key = key
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    def part_template(self, key, build_source):
+        """Скомпилированный Jinja-шаблон части документа (тело, колонтитул)."""
+        compiled = self._parts.get(key)
+        if compiled is None:
+            source, encoding = build_source()
+            # То же преобразование, что делает DocxTemplate.render_xml_part перед компиляцией
+            source = re.sub(r'<w:p([ >])', r'\n<w:p\1', source)
+            compiled = (Template(source), encoding)
+            with self._lock:
+                self._parts.setdefault(key, compiled)
+        return compiled
+
+    def render(self, context) -> bytes:
+        document = _PrecompiledDocxTemplate(io.BytesIO(self.data), self)
+        document.render(context)
+
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+
+
+class _PrecompiledDocxTemplate(DocxTemplate):
+    def __init__(self, template_file, compiled: CompiledDocxTemplate):
+        super().__init__(template_file)
+        self._compiled = compiled
+
+    def _render_compiled(self, template, part, context):
+        self.current_rendering_part = part
+        dst_xml = template.render(context)
+        dst_xml = re.sub(r'\n<w:p([ >])', r'<w:p\1', dst_xml)
+        dst_xml = (
+            dst_xml.replace('{_{', '{{')
+            .replace('}_}', '}}')
+            .replace('{_%', '{%')
+            .replace('%_}', '%}')
+        )
+        return self.resolve_listing(dst_xml)
+
+    def build_xml(self, context, jinja_env=None):
+        if jinja_env is not None:
+            return super().build_xml(context, jinja_env)
+
+        template, _ = self._compiled.part_template(
+            'body',
+            lambda: (self.patch_xml(self.get_xml()), None),
+        )
+        return self._render_compiled(template, self.docx._part, context)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        if jinja_env is not None:
+            yield from super().build_headers_footers_xml(context, uri, jinja_env)
+            return
+
+        for rel_key, part in self.get_headers_footers(uri):
+            def build_source(part=part):
+                xml = self.get_part_xml(part)
+                return self.patch_xml(xml), self.get_headers_footers_encoding(xml)
+
+            template, encoding = self._compiled.part_template((uri, rel_key), build_source)
+            yield rel_key, self._render_compiled(template, part, context).encode(encoding)
+
+
+def _cache_size() -> int:
+    return int(getattr(settings, 'DOCUMENT_TEMPLATE_CACHE_SIZE', DEFAULT_CACHE_SIZE) or 0)
+
+
+def _read_file(file_field) -> bytes:
+    file_field.open('rb')
+    try:
+        return file_field.read()
+    finally:
+        file_field.close()
+
+
+def _file_fingerprint(file_field):
+    storage = file_field.storage
+    name = file_field.name
+
+    try:
+        return storage.get_modified_time(name).timestamp(), storage.size(name), None
+    except (NotImplementedError, OSError):
+        # Хранилище без mtime — ключом служит хэш содержимого
+        data = _read_file(file_field)
+        return hashlib.sha1(data).hexdigest(), len(data), data
+
+
+def get_compiled_template(template) -> CompiledDocxTemplate:
+    """Разобранный шаблон DocumentTemplate из LRU-кэша процесса."""
+    mtime_or_hash, size, data = _file_fingerprint(template.file)
+    key = (template.pk, template.file.name, mtime_or_hash, size)
+
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    compiled = CompiledDocxTemplate(data if data is not None else _read_file(template.file), key=key)
+
+    max_size = _cache_size()
+    if max_size <= 0:
+        return compiled
+
+    with _cache_lock:
+        for cached_key in [k for k in _cache if k[0] == template.pk]:
+            del _cache[cached_key]
+        _cache[key] = compiled
+        while len(_cache) > max_size:
+            _cache.popitem(last=False)
+
+    return compiled
+
+
+def render_batch(template_key, data: bytes, contexts: list) -> list:
+    """
+    Рендер пачки контекстов по одному шаблону; выполняется в процессе пула.
+    Шаблон компилируется один раз на процесс. Возвращает [(ok, bytes | сообщение)].
+    """
+    compiled = _worker_templates.get(template_key)
+    if compiled is None:
+        if len(_worker_templates) >= DEFAULT_CACHE_SIZE:
+            _worker_templates.clear()
+        compiled = _worker_templates[template_key] = CompiledDocxTemplate(data, key=template_key)
+
+    results = []
+    for context in contexts:
+        try:
+            results.append((True, compiled.render(context)))
+        except Exception as exc:
+            results.append((False, f'Ошибка DocxTemplate: {exc}'))
+
+    return results
+
+
+def clear_template_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
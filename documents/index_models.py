@@ -0,0 +1,72 @@
+from django.db import models
+
+
+class KnowledgeIndexDocument(models.Model):
+    """
+    Нормализованная копия материала / раздела базы знаний для локального ИИ-поиска.
+    Обновляется сигналами при сохранении и удалении InfoSnippet / KnowledgeSection.
+    """
+
+    snippet = models.OneToOneField(
+        'documents.InfoSnippet',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='index_document',
+    )
+    section = models.OneToOneField(
+        'documents.KnowledgeSection',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='index_document',
+    )
+    title_norm = models.TextField(blank=True, default='')
+    section_norm = models.TextField(blank=True, default='')
+    category_norm = models.TextField(blank=True, default='')
+    content_norm = models.TextField(blank=True, default='')
+    indexed_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Индекс базы знаний'
+        verbose_name_plural = 'Индекс базы знаний'
+
+    def __str__(self):
+        if self.snippet_id:
+            return f'Snippet #{self.snippet_id}'
+        return f'Section #{self.section_id}'
+
+
+class KnowledgeIndexTerm(models.Model):
+    FIELD_CHOICES = (
+        ('title', 'Название'),
+        ('section', 'Раздел'),
+        ('category', 'Категория'),
+        ('content', 'Содержание'),
+    )
+
+    document = models.ForeignKey(
+        KnowledgeIndexDocument,
+        on_delete=models.CASCADE,
+        related_name='terms',
+    )
+    term = models.CharField(max_length=64)
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    # Слово встречается в первых 400 словах содержания (для fuzzy-совпадений).
+    in_lead = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'Терм индекса базы знаний'
+        verbose_name_plural = 'Термы индекса базы знаний'
+        indexes = [
+            models.Index(fields=['term', 'field'], name='documents_kb_term_field_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['document', 'term', 'field'],
+                name='documents_kb_term_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.term} ({self.field})'
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import models
+
+
+class DocumentConversionJob(models.Model):
+    """Задание на сборку approved-PDF (DOCX → PDF + watermark) для воркеров конвертации."""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_ERROR = 'error'
+
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Конвертируется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_ERROR, 'Ошибка'),
+    )
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    document = models.ForeignKey(
+        'documents.GeneratedDocument',
+        on_delete=models.CASCADE,
+        related_name='conversion_jobs',
+        verbose_name='Документ',
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='document_conversion_jobs',
+        verbose_name='Кто одобрил',
+    )
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField('Ошибка', blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    worker = models.CharField('Воркер', max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задание конвертации документа'
+        verbose_name_plural = 'Очередь конвертации документов'
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='doc_conversion_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Job {self.id}: document {self.document_id} [{self.status}]'
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -0,0 +1,255 @@
+# documents/knowledge_index.py
+"""
+Инвертированный индекс базы знаний для локального ИИ-поиска.
+
+Вместо того чтобы на каждый вопрос загружать все InfoSnippet / KnowledgeSection
+и заново нормализовать их тексты, нормализованные поля и список слов каждого
+материала хранятся в KnowledgeIndexDocument / KnowledgeIndexTerm.
+Индекс обновляется сигналами (documents/signals.py), полная перестройка —
+командой `python manage.py rebuild_knowledge_index`.
+
+Состояние индекса (get_index_stats) хранится в общем кэше и сбрасывается при
+каждом изменении документов индекса, поэтому вопрос к ассистенту не тратит
+отдельные запросы на проверку полноты индекса.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from documents.ai_search import (
+    _get_category_label,
+    _get_section_path,
+    _normalize_text,
+    _tokens,
+)
+from documents.models import (
+    InfoSnippet,
+    KnowledgeIndexDocument,
+    KnowledgeIndexTerm,
+    KnowledgeSection,
+)
+from students_life.fuzzy import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+LEAD_CONTENT_WORDS = 400
+MAX_TERM_LENGTH = 64
+
+INDEX_STATS_CACHE_KEY = 'knowledge-index:stats'
+INDEX_STATS_CACHE_TIMEOUT = 60 * 60
+
+_vocabulary_cache = {
+    'stamp': None,
+    'terms': TrigramIndex(()),
+}
+
+
+def _unique(words: Iterable[str]) -> List[str]:
+    seen = set()
+    result = []
+
+    for word in words:
+        word = word[:MAX_TERM_LENGTH]
+        if word and word not in seen:
+            seen.add(word)
+            result.append(word)
+
+    return result
+
+
+def _build_terms(document, fields: Dict[str, str], content_words: List[str]) -> List[KnowledgeIndexTerm]:
+    terms = []
+
+    for field, value in fields.items():
+        for word in _unique(_tokens(value)):
+            terms.append(KnowledgeIndexTerm(document=document, term=word, field=field))
+
+    lead_words = {word[:MAX_TERM_LENGTH] for word in content_words[:LEAD_CONTENT_WORDS]}
+    for word in _unique(content_words):
+        terms.append(
+            KnowledgeIndexTerm(
+                document=document,
+                term=word,
+                field='content',
+                in_lead=word in lead_words,
+            )
+        )
+
+    return terms
+
+
+@transaction.atomic
+def index_snippet(snippet: InfoSnippet) -> KnowledgeIndexDocument:
+    title_norm = _normalize_text(snippet.title)
+    content_norm = _normalize_text(snippet.content)
+    section_norm = _normalize_text(_get_section_path(snippet.section))
+    category_norm = _normalize_text(_get_category_label(snippet.category))
+
+    document, _ = KnowledgeIndexDocument.objects.update_or_create(
+        snippet=snippet,
+        defaults={
+            'title_norm': title_norm,
+            'section_norm': section_norm,
+            'category_norm': category_norm,
+            'content_norm': content_norm,
+        },
+    )
+
+    document.terms.all().delete()
+    KnowledgeIndexTerm.objects.bulk_create(
+        _build_terms(
+            document,
+            {
+                'title': title_norm,
+                'section': section_norm,
+                'category': category_norm,
+            },
+            _tokens(content_norm),
+        )
+    )
+
+    return document
+
+
+@transaction.atomic
+def index_section(section: KnowledgeSection) -> Optional[KnowledgeIndexDocument]:
+    if not section.is_active:
+        KnowledgeIndexDocument.objects.filter(section=section).delete()
+        return None
+
+    title_norm = _normalize_text(section.title)
+    section_norm = _normalize_text(_get_section_path(section))
+
+    document, _ = KnowledgeIndexDocument.objects.update_or_create(
+        section=section,
+        defaults={
+            'title_norm': title_norm,
+            'section_norm': section_norm,
+            'category_norm': '',
+            'content_norm': '',
+        },
+    )
+
+    document.terms.all().delete()
+    KnowledgeIndexTerm.objects.bulk_create(
+        _build_terms(document, {'section': f'{title_norm} {section_norm}'}, [])
+    )
+
+    return document
+
+
+def get_subtree_ids(section: KnowledgeSection) -> List[int]:
+    if not section.tree_path:
+        section.refresh_paths()
+
+    return list(section.get_descendants(include_self=True).values_list('id', flat=True))
+
+
+def index_section_tree(section: KnowledgeSection) -> None:
+    """
+    Переиндексирует раздел, все вложенные разделы и их материалы:
+    путь раздела входит в индекс каждого дочернего элемента.
+    """
+    section_ids = get_subtree_ids(section)
+
+    for item in KnowledgeSection.objects.filter(id__in=section_ids).select_related('parent'):
+        index_section(item)
+
+    index_snippets(InfoSnippet.objects.filter(section_id__in=section_ids))
+
+
+def index_snippets(queryset) -> int:
+    count = 0
+
+    for snippet in queryset.select_related('section').iterator():
+        index_snippet(snippet)
+        count += 1
+
+    return count
+
+
+def rebuild_knowledge_index() -> Tuple[int, int]:
+    with transaction.atomic():
+        KnowledgeSection.rebuild_all_paths()
+        KnowledgeIndexDocument.objects.all().delete()
+
+        sections_count = 0
+        for section in KnowledgeSection.objects.filter(is_active=True).select_related('parent').iterator():
+            index_section(section)
+            sections_count += 1
+
+        snippets_count = index_snippets(InfoSnippet.objects.all())
+
+    return snippets_count, sections_count
+
+
+def get_index_stamp():
+    stats = KnowledgeIndexDocument.objects.aggregate(
+        total=Count('id'),
+        snippets=Count('snippet'),
+        last_indexed_at=Max('indexed_at'),
+    )
+    return stats['total'], stats['snippets'], stats['last_indexed_at']
+
+
+def get_index_stats():
+    """
+    (stamp, число материалов) для проверки полноты индекса — из общего кэша.
+    Кэш сбрасывается сигналами при любом изменении документов индекса.
+    """
+    try:
+        stats = cache.get(INDEX_STATS_CACHE_KEY)
+    except Exception:
+        logger.warning('Knowledge index stats cache is unavailable', exc_info=True)
+        stats = None
+
+    if stats is None:
+        stats = (get_index_stamp(), InfoSnippet.objects.count())
+        try:
+            cache.set(INDEX_STATS_CACHE_KEY, stats, INDEX_STATS_CACHE_TIMEOUT)
+        except Exception:
+            logger.warning('Knowledge index stats cache write failed', exc_info=True)
+
+    return stats
+
+
+def invalidate_index_stats() -> None:
+    try:
+        cache.delete(INDEX_STATS_CACHE_KEY)
+    except Exception:
+        logger.warning('Knowledge index stats invalidation failed', exc_info=True)
+
+
+def get_vocabulary(stamp) -> TrigramIndex:
+    """
+    Словарь всех слов индекса с триграммным fuzzy-индексом.
+    Кэшируется в процессе до изменения индекса.
+    """
+    if _vocabulary_cache['stamp'] != stamp:
+        _vocabulary_cache['terms'] = TrigramIndex(
+            KnowledgeIndexTerm.objects.order_by().values_list('term', flat=True).distinct()
+        )
+        _vocabulary_cache['stamp'] = stamp
+
+    return _vocabulary_cache['terms']
+
+
+def fetch_postings(terms: Iterable[str]) -> List[dict]:
+    terms = list(terms)
+    if not terms:
+        return []
+
+    return list(
+        KnowledgeIndexTerm.objects.filter(term__in=terms).values(
+            'term',
+            'field',
+            'in_lead',
+            'document_id',
+            'document__snippet_id',
+            'document__section_id',
+        )
+    )
+
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from documents.knowledge_index import rebuild_knowledge_index
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает пути разделов и полностью перестраивает поисковый индекс базы знаний.'
+
+    def handle(self, *args, **options):
+        snippets_count, sections_count = rebuild_knowledge_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс базы знаний перестроен: материалов {snippets_count}, разделов {sections_count}.'
+        ))
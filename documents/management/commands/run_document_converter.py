@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from documents.conversion import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_POLL_INTERVAL_SECONDS,
+    get_worker_count,
+    run_worker_pool,
+)
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул воркеров LibreOffice, собирающих approved-PDF из очереди одобрения документов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Количество параллельных воркеров (по умолчанию DOCUMENT_CONVERTER_WORKERS или число ядер, не больше 4).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Сколько документов воркер конвертирует одним запуском LibreOffice.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=DEFAULT_POLL_INTERVAL_SECONDS,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать текущую очередь и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or get_worker_count()
+        self.stdout.write(f'Конвертер документов запущен: воркеров {workers}.')
+
+        processed = run_worker_pool(
+            workers=workers,
+            batch_size=max(1, options['batch_size']),
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Конвертер остановлен, обработано заданий: {processed}.'))
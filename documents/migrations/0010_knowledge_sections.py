@@ -0,0 +1,164 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _table_columns(connection, table):
+    with connection.cursor() as cursor:
+        return {column.name for column in connection.introspection.get_table_description(cursor, table)}
+
+
+def create_missing_schema(apps, schema_editor):
+    # Разделы базы знаний уже использовались до этой миграции: в рабочих базах
+    # таблицы есть (без новых колонок tree_path/path_title), в новых — нет
+    connection = schema_editor.connection
+    existing_tables = set(connection.introspection.table_names())
+
+    for model_name in ('KnowledgeSection', 'KnowledgeSectionAttachment', 'InfoSnippet', 'KnowledgeTest'):
+        model = apps.get_model('documents', model_name)
+        if model._meta.db_table not in existing_tables:
+            schema_editor.create_model(model)
+            existing_tables.update(
+                field.remote_field.through._meta.db_table for field in model._meta.local_many_to_many
+            )
+            existing_tables.add(model._meta.db_table)
+            continue
+
+        for field in model._meta.local_fields:
+            # Колонки перечитываются на каждом поле: SQLite добавляет поле
+            # пересозданием таблицы по модели, и с ним появляются остальные
+            if field.column not in _table_columns(connection, model._meta.db_table):
+                schema_editor.add_field(model, field)
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if through._meta.db_table not in existing_tables:
+                schema_editor.create_model(through)
+                existing_tables.add(through._meta.db_table)
+
+
+def fill_section_paths(apps, schema_editor):
+    # У разделов, созданных до миграции, путей нет: строим их от корня
+    KnowledgeSection = apps.get_model('documents', 'KnowledgeSection')
+    rows = {
+        pk: (parent_id, title)
+        for pk, parent_id, title in KnowledgeSection.objects.values_list('id', 'parent_id', 'title')
+    }
+    paths = {}
+
+    def build(pk):
+        chain = []
+        while pk is not None and pk not in paths and pk in rows and pk not in chain:
+            chain.append(pk)
+            pk = rows[pk][0]
+        parent_path_title, parent_tree_path = paths.get(pk, ('', ''))
+        for item in reversed(chain):
+            title = rows[item][1]
+            if parent_tree_path:
+                parent_path_title, parent_tree_path = f'{parent_path_title} / {title}', f'{parent_tree_path}{item}/'
+            else:
+                parent_path_title, parent_tree_path = title, f'{item}/'
+            paths[item] = (parent_path_title, parent_tree_path)
+
+    for pk in rows:
+        build(pk)
+
+    sections = list(KnowledgeSection.objects.only('id', 'path_title', 'tree_path'))
+    for section in sections:
+        section.path_title, section.tree_path = paths[section.pk]
+    KnowledgeSection.objects.bulk_update(sections, ['path_title', 'tree_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_repair_missing_0008_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='infosnippet',
+                    name='content_format',
+                    field=models.CharField(choices=[('markdown', 'Markdown'), ('plain', 'Обычный текст'), ('html', 'HTML')], default='markdown', max_length=20, verbose_name='Формат текста'),
+                ),
+                migrations.CreateModel(
+                    name='KnowledgeSection',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('title', models.CharField(max_length=255, verbose_name='Название')),
+                        ('slug', models.SlugField(allow_unicode=True, blank=True, max_length=255, verbose_name='Slug')),
+                        ('description', models.TextField(blank=True, default='', verbose_name='Описание раздела / Markdown')),
+                        ('icon', models.CharField(blank=True, default='folder', max_length=60, verbose_name='Иконка')),
+                        ('color', models.CharField(blank=True, max_length=30, verbose_name='Цвет')),
+                        ('cover_image', models.ImageField(blank=True, null=True, upload_to='knowledge_sections/images/', verbose_name='Фото / обложка раздела')),
+                        ('file', models.FileField(blank=True, null=True, upload_to='knowledge_sections/files/', verbose_name='Файл раздела')),
+                        ('external_url', models.URLField(blank=True, default='', max_length=1000, verbose_name='Ссылка раздела')),
+                        ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок')),
+                        ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+                        ('path_title', models.CharField(blank=True, default='', editable=False, max_length=2000, verbose_name='Полный путь')),
+                        ('tree_path', models.CharField(blank=True, db_index=True, default='', editable=False, help_text='ID разделов от корня, например: 1/5/9/', max_length=500, verbose_name='Путь по ID')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_knowledge_sections', to=settings.AUTH_USER_MODEL, verbose_name='Кто создал')),
+                        ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='documents.knowledgesection', verbose_name='Родительский раздел')),
+                        ('responsible_users', models.ManyToManyField(blank=True, related_name='responsible_knowledge_sections', to=settings.AUTH_USER_MODEL, verbose_name='Ответственные сотрудники')),
+                    ],
+                    options={
+                        'verbose_name': 'Раздел базы знаний',
+                        'verbose_name_plural': 'Разделы базы знаний',
+                        'ordering': ['parent__id', 'order', 'title'],
+                    },
+                ),
+                migrations.AddField(
+                    model_name='infosnippet',
+                    name='section',
+                    field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='snippets', to='documents.knowledgesection', verbose_name='Раздел'),
+                ),
+                migrations.AddField(
+                    model_name='knowledgetest',
+                    name='section',
+                    field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tests', to='documents.knowledgesection', verbose_name='Раздел'),
+                ),
+                migrations.CreateModel(
+                    name='KnowledgeSectionAttachment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('title', models.CharField(blank=True, default='', max_length=255, verbose_name='Название')),
+                        ('attachment_type', models.CharField(choices=[('file', 'Файл'), ('image', 'Фото'), ('link', 'Ссылка')], default='file', max_length=20, verbose_name='Тип')),
+                        ('file', models.FileField(blank=True, null=True, upload_to='knowledge_sections/attachments/', verbose_name='Файл / фото')),
+                        ('url', models.URLField(blank=True, default='', max_length=1000, verbose_name='Ссылка')),
+                        ('note', models.TextField(blank=True, default='', verbose_name='Описание / комментарий')),
+                        ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок')),
+                        ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлено')),
+                        ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='documents.knowledgesection', verbose_name='Раздел базы знаний')),
+                        ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='knowledge_section_attachments', to=settings.AUTH_USER_MODEL, verbose_name='Кто добавил')),
+                    ],
+                    options={
+                        'verbose_name': 'Файл/ссылка раздела базы знаний',
+                        'verbose_name_plural': 'Файлы и ссылки разделов базы знаний',
+                        'ordering': ['order', '-created_at'],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_schema, migrations.RunPython.noop),
+        migrations.RunPython(fill_section_paths, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='infosnippet',
+            options={'ordering': ['section__order', 'category', 'order', 'title'], 'verbose_name': 'База знаний', 'verbose_name_plural': 'База знаний'},
+        ),
+        migrations.AlterField(
+            model_name='infosnippet',
+            name='category',
+            field=models.CharField(choices=[('script', 'Скрипты продаж'), ('faq', 'Ответы на частые вопросы'), ('requisites', 'Реквизиты и Счета'), ('links', 'Полезные ссылки')], default='faq', max_length=50, verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='infosnippet',
+            name='content',
+            field=models.TextField(verbose_name='Содержание'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_knowledge_sections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeIndexDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_norm', models.TextField(blank=True, default='')),
+                ('section_norm', models.TextField(blank=True, default='')),
+                ('category_norm', models.TextField(blank=True, default='')),
+                ('content_norm', models.TextField(blank=True, default='')),
+                ('indexed_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('snippet', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='index_document', to='documents.infosnippet')),
+                ('section', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='index_document', to='documents.knowledgesection')),
+            ],
+            options={
+                'verbose_name': 'Индекс базы знаний',
+                'verbose_name_plural': 'Индекс базы знаний',
+            },
+        ),
+        migrations.CreateModel(
+            name='KnowledgeIndexTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('field', models.CharField(choices=[('title', 'Название'), ('section', 'Раздел'), ('category', 'Категория'), ('content', 'Содержание')], max_length=10)),
+                ('in_lead', models.BooleanField(default=False)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='documents.knowledgeindexdocument')),
+            ],
+            options={
+                'verbose_name': 'Терм индекса базы знаний',
+                'verbose_name_plural': 'Термы индекса базы знаний',
+                'indexes': [models.Index(fields=['term', 'field'], name='documents_kb_term_field_idx')],
+                'constraints': [models.UniqueConstraint(fields=('document', 'term', 'field'), name='documents_kb_term_unique')],
+            },
+        ),
+    ]
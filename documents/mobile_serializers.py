@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import GeneratedDocument, resolve_document_status
+from .models import DocumentConversionJob, GeneratedDocument, resolve_document_status
 from .review_guard import safe_get_document_review
 
 
@@ -112,4 +112,20 @@ class GeneratedDocumentMobileSerializer(serializers.ModelSerializer):
         review = safe_get_document_review(obj)
         if review and review.approved_file:
             return self._build_url(review.approved_file)
-        return None
\ No newline at end of file
+        return None
+
+
+class DocumentConversionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DocumentConversionJob
+        fields = (
+            'id',
+            'document',
+            'status',
+            'error',
+            'attempts',
+            'created_at',
+            'started_at',
+            'finished_at',
+        )
+        read_only_fields = fields
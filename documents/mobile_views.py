@@ -1,10 +1,17 @@
-from django.db import transaction
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from users.permissions import is_admin_user
-from .mobile_serializers import GeneratedDocumentMobileSerializer
+from .batch_generation import create_documents, get_max_items
+from .conversion import (
+    cancel_active_jobs,
+    complete_approval,
+    enqueue_approval,
+    get_latest_job,
+    is_async_approval_enabled,
+)
+from .mobile_serializers import DocumentConversionJobSerializer, GeneratedDocumentMobileSerializer
 from .models import GeneratedDocument, DocumentReview, resolve_document_status
 from .review_guard import has_document_review_table
 from .watermarking import build_approved_document
@@ -56,14 +63,7 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
         document = serializer.save(manager=manager)
 
         if not document.title:
-            if document.deal_id and document.deal and getattr(document.deal, 'client', None):
-                client = document.deal.client
-                client_name = getattr(client, 'full_name', None) or (
-                    f"{getattr(client, 'first_name', '')} {getattr(client, 'last_name', '')}".strip()
-                )
-                document.title = f"{document.template.title} — {client_name or 'Клиент'}"
-            else:
-                document.title = document.template.title
+            document.title = document.build_default_title()
             document.save(update_fields=['title', 'updated_at'])
 
         review = None
@@ -94,12 +94,80 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
             document.save(update_fields=['status', 'updated_at'])
             raise
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Пакетное создание: {"items": [{"template", "deal", "title", "context_data"}, ...]}.
+        Ответ — статус по каждому элементу в исходном порядке.
+        """
+        items = request.data.get('items') if hasattr(request.data, 'get') else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Передайте непустой список items'}, status=400)
+
+        max_items = get_max_items()
+        if len(items) > max_items:
+            return Response({'detail': f'Не больше {max_items} документов за запрос'}, status=400)
+
+        results = [None] * len(items)
+        valid_indexes = []
+        valid_items = []
+
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'status': 'invalid', 'errors': {'detail': 'Ожидается объект'}}
+                continue
+
+            serializer = self.get_serializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+                continue
+
+            data = dict(serializer.validated_data)
+            requested_manager = data.pop('manager', None)
+            data['manager'] = (
+                requested_manager if is_admin_user(request.user) and requested_manager else request.user
+            )
+            valid_indexes.append(index)
+            valid_items.append(data)
+
+        documents = create_documents(valid_items)
+
+        refreshed = {
+            document.pk: document
+            for document in self.get_queryset().filter(pk__in=[document.pk for document in documents])
+        }
+        for index, document in zip(valid_indexes, documents):
+            result = {
+                'index': index,
+                'status': 'error' if document.generation_error else 'generated',
+                'document': self.get_serializer(refreshed.get(document.pk, document)).data,
+            }
+            if document.generation_error:
+                result['detail'] = document.generation_error
+            results[index] = result
+
+        generated = sum(1 for result in results if result['status'] == 'generated')
+        failed = len(results) - generated
+
+        if not failed:
+            response_status = status.HTTP_201_CREATED
+        elif generated:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response(
+            {'generated': generated, 'failed': failed, 'results': results},
+            status=response_status,
+        )
+
     def perform_update(self, serializer):
         instance = serializer.instance
         if resolve_document_status(instance) == 'approved':
             raise permissions.PermissionDenied('Нельзя менять одобренный документ')
 
         document = serializer.save()
+        cancel_active_jobs(document, 'Документ изменён')
 
         if not has_document_review_table():
             return
@@ -127,6 +195,8 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
         if resolve_document_status(document) == 'approved':
             return Response({'detail': 'Одобренный документ нельзя перегенерировать'}, status=400)
 
+        cancel_active_jobs(document, 'Документ перегенерирован')
+
         review = None
         if has_document_review_table():
             review, _ = DocumentReview.objects.get_or_create(document=document)
@@ -175,7 +245,14 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
         if getattr(document, 'status', None) != 'generated' or not getattr(document, 'generated_file', None):
             return Response({'detail': 'Документ ещё не сгенерирован'}, status=400)
 
-        review, _ = DocumentReview.objects.get_or_create(document=document)
+        DocumentReview.objects.get_or_create(document=document)
+
+        if is_async_approval_enabled():
+            # LibreOffice работает в воркерах конвертации, запрос не ждёт сборки PDF
+            job = enqueue_approval(document, request.user)
+            data = self.get_serializer(document, context={'request': request}).data
+            data['approval_job'] = DocumentConversionJobSerializer(job).data
+            return Response(data, status=status.HTTP_202_ACCEPTED)
 
         approved_file = build_approved_document(document)
         if approved_file is None:
@@ -184,18 +261,19 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
                 status=500,
             )
 
-        with transaction.atomic():
-            if review.approved_file:
-                review.approved_file.delete(save=False)
-
-            review.mark_approved(user=request.user, approved_file=approved_file)
-            document.status = 'approved'
-            document.approved_by = request.user
-            document.approved_at = review.reviewed_at
-            document.save(update_fields=['status', 'approved_by', 'approved_at', 'updated_at'])
+        complete_approval(document, request.user, approved_file)
 
         return Response(self.get_serializer(document, context={'request': request}).data)
 
+    @action(detail=True, methods=['get'], url_path='approval-status')
+    def approval_status(self, request, pk=None):
+        document = self.get_object()
+        job = get_latest_job(document)
+
+        data = self.get_serializer(document, context={'request': request}).data
+        data['approval_job'] = DocumentConversionJobSerializer(job).data if job else None
+        return Response(data)
+
     @action(detail=True, methods=['post'], url_path='reject')
     def reject(self, request, pk=None):
         document = self.get_object()
@@ -209,6 +287,7 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
             )
 
         reason = request.data.get('reason', '')
+        cancel_active_jobs(document, 'Документ отклонён')
         review, _ = DocumentReview.objects.get_or_create(document=document)
 
         if review.approved_file:
@@ -1,15 +1,15 @@
 # documents/models.py
-import io
 import json
 import logging
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.text import slugify
-from docxtpl import DocxTemplate
 
+from .docx_cache import get_compiled_template
 from .review_guard import safe_get_document_review
 
 
@@ -65,6 +65,17 @@ class KnowledgeSection(models.Model):
     )
     order = models.PositiveIntegerField('Порядок', default=0)
     is_active = models.BooleanField('Активен', default=True)
+    # Материализованный путь: пересчитывается для всего поддерева при переименовании/переносе.
+    path_title = models.CharField('Полный путь', max_length=2000, blank=True, default='', editable=False)
+    tree_path = models.CharField(
+        'Путь по ID',
+        max_length=500,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+        help_text='ID разделов от корня, например: 1/5/9/',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -78,6 +89,11 @@ class KnowledgeSection(models.Model):
 
     @property
     def full_path(self):
+        if self.path_title:
+            return self.path_title
+        return self._walk_full_path()
+
+    def _walk_full_path(self):
         parts = [self.title]
         parent = self.parent
         guard = 0
@@ -89,10 +105,140 @@ class KnowledgeSection(models.Model):
 
         return ' / '.join(reversed(parts))
 
+    def _build_paths(self, parent_path_title, parent_tree_path):
+        if self.parent_id:
+            path_title = f'{parent_path_title} / {self.title}'
+            tree_path = f'{parent_tree_path}{self.pk}/'
+        else:
+            path_title = self.title
+            tree_path = f'{self.pk}/'
+        return path_title, tree_path
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id and self.parent.is_descendant_of(self):
+            raise ValidationError({'parent': 'Нельзя перенести раздел внутрь самого себя.'})
+
+    def is_descendant_of(self, section):
+        if self.pk == section.pk:
+            return True
+        if self.tree_path and section.tree_path:
+            return self.tree_path.startswith(section.tree_path)
+
+        # Пути ещё не рассчитаны — идём по родителям
+        parent = self.parent
+        guard = 0
+        while parent and guard < 20:
+            if parent.pk == section.pk:
+                return True
+            parent = parent.parent
+            guard += 1
+        return False
+
+    def get_descendants(self, include_self=False):
+        qs = KnowledgeSection.objects.filter(tree_path__startswith=self.tree_path)
+        if not include_self:
+            qs = qs.exclude(pk=self.pk)
+        return qs
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True) or 'section'
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            old_path_title, old_tree_path = '', ''
+            if self.pk:
+                old_path_title, old_tree_path = (
+                    KnowledgeSection.objects.filter(pk=self.pk)
+                    .values_list('path_title', 'tree_path')
+                    .first()
+                ) or ('', '')
+
+            # Перенос внутрь собственного поддерева отсекают clean() и сериализатор
+            parent = self.parent if self.parent_id else None
+            super().save(*args, **kwargs)
+
+            if parent is not None and not parent.tree_path:
+                parent.refresh_paths()
+
+            path_title, tree_path = self._build_paths(
+                parent.full_path if parent else '',
+                parent.tree_path if parent else '',
+            )
+
+            self.path_title = path_title
+            self.tree_path = tree_path
+
+            if (path_title, tree_path) != (old_path_title, old_tree_path):
+                KnowledgeSection.objects.filter(pk=self.pk).update(
+                    path_title=path_title,
+                    tree_path=tree_path,
+                )
+                self._rebuild_descendant_paths(old_tree_path or tree_path)
+
+    def refresh_paths(self):
+        """Пересчитывает путь раздела (и предков без сохранённого пути)."""
+        parent = self.parent if self.parent_id else None
+        if parent is not None and not parent.tree_path:
+            parent.refresh_paths()
+
+        self.path_title, self.tree_path = self._build_paths(
+            parent.full_path if parent else '',
+            parent.tree_path if parent else '',
+        )
+        KnowledgeSection.objects.filter(pk=self.pk).update(
+            path_title=self.path_title,
+            tree_path=self.tree_path,
+        )
+
+    def _rebuild_descendant_paths(self, old_tree_path):
+        descendants = list(
+            KnowledgeSection.objects
+            .filter(tree_path__startswith=old_tree_path)
+            .exclude(pk=self.pk)
+            .only('id', 'parent_id', 'title', 'path_title', 'tree_path')
+        )
+        if not descendants:
+            return
+
+        by_parent = {}
+        for item in descendants:
+            by_parent.setdefault(item.parent_id, []).append(item)
+
+        changed = []
+        stack = [self]
+        while stack:
+            parent = stack.pop()
+            for child in by_parent.get(parent.pk, []):
+                child.path_title, child.tree_path = child._build_paths(parent.path_title, parent.tree_path)
+                changed.append(child)
+                stack.append(child)
+
+        KnowledgeSection.objects.bulk_update(changed, ['path_title', 'tree_path'], batch_size=500)
+
+        from sync.changes import record_changes
+        record_changes('knowledge_sections', [item.pk for item in changed])
+
+    @classmethod
+    def rebuild_all_paths(cls):
+        """Полный пересчёт материализованных путей (после миграции или ручных правок в БД)."""
+        sections = list(cls.objects.only('id', 'parent_id', 'title', 'path_title', 'tree_path'))
+        by_parent = {}
+        for item in sections:
+            by_parent.setdefault(item.parent_id, []).append(item)
+
+        stack = [(item, '', '') for item in by_parent.get(None, [])]
+        while stack:
+            section, parent_path_title, parent_tree_path = stack.pop()
+            section.path_title, section.tree_path = section._build_paths(parent_path_title, parent_tree_path)
+            for child in by_parent.get(section.pk, []):
+                stack.append((child, section.path_title, section.tree_path))
+
+        cls.objects.bulk_update(sections, ['path_title', 'tree_path'], batch_size=500)
+
+        from sync.changes import record_changes
+        record_changes('knowledge_sections', [item.pk for item in sections])
+        return len(sections)
 
 
 class KnowledgeSectionAttachment(models.Model):
@@ -324,6 +470,17 @@ class TemplateField(models.Model):
         return f'{self.label} ({self.key})'
 
 
+CONTEXT_RELATED_FIELDS = (
+    'template',
+    'manager',
+    'deal',
+    'deal__client',
+    'deal__university',
+    'deal__program',
+    'deal__service_ref',
+)
+
+
 class GeneratedDocument(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Создан / Ожидает'),
@@ -416,8 +573,37 @@ class GeneratedDocument(models.Model):
             context = {}
         return context
 
+    def _context_relations_cached(self) -> bool:
+        opts = self._meta
+        if not all(opts.get_field(name).is_cached(self) for name in ('template', 'manager', 'deal')):
+            return False
+
+        if self.deal is None:
+            return True
+
+        deal_opts = self.deal._meta
+        return all(
+            deal_opts.get_field(name).is_cached(self.deal)
+            for name in ('client', 'university', 'program', 'service_ref')
+        )
+
+    def load_context_relations(self):
+        """Подтягивает шаблон, менеджера и сделку со связями одним select_related-запросом."""
+        if not self.pk or self._context_relations_cached():
+            return
+
+        fresh = (
+            GeneratedDocument.objects
+            .select_related(*CONTEXT_RELATED_FIELDS)
+            .get(pk=self.pk)
+        )
+        self.template = fresh.template
+        self.manager = fresh.manager
+        self.deal = fresh.deal
+
     def build_context(self):
         base_context = {}
+        self.load_context_relations()
 
         if self.deal_id and self.deal:
             client = self.deal.client
@@ -450,33 +636,34 @@ class GeneratedDocument(models.Model):
         base_context.update(extra_context)
         return base_context
 
+    def build_default_title(self) -> str:
+        client = getattr(self.deal, 'client', None) if self.deal_id and self.deal else None
+        if client:
+            client_name = getattr(client, 'full_name', None) or (
+                f"{getattr(client, 'first_name', '')} {getattr(client, 'last_name', '')}".strip()
+            )
+            return f"{self.template.title} — {client_name or 'Клиент'}"
+        return self.template.title
+
+    def build_filename(self) -> str:
+        safe_title = ''.join(
+            c for c in str(self.title or self.template.title)
+            if c.isalpha() or c.isdigit() or c in ' -_'
+        ).rstrip()
+
+        return f'{safe_title or "document"}_{self.id}.docx'.replace(' ', '_')
+
     def generate_document(self):
+        self.load_context_relations()
+
         if not self.template.file:
             return False, 'В шаблоне отсутствует файл DOCX.'
 
         try:
-            self.template.file.open('rb')
-            template_bytes = self.template.file.read()
-            self.template.file.close()
-
-            template_stream = io.BytesIO(template_bytes)
-            doc = DocxTemplate(template_stream)
-
             context = self.build_context()
-            doc.render(context)
-
-            buffer = io.BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
+            rendered = get_compiled_template(self.template).render(context)
 
-            safe_title = ''.join(
-                c for c in str(self.title or self.template.title)
-                if c.isalpha() or c.isdigit() or c in ' -_'
-            ).rstrip()
-
-            filename = f'{safe_title or "document"}_{self.id}.docx'.replace(' ', '_')
-
-            self.generated_file.save(filename, ContentFile(buffer.read()), save=False)
+            self.generated_file.save(self.build_filename(), ContentFile(rendered), save=False)
             self.status = 'generated'
             self.approved_by = None
             self.approved_at = None
@@ -568,4 +755,7 @@ def resolve_document_status(document):
         if review.status == 'rejected':
             return 'rejected'
 
-    return getattr(document, 'status', 'draft') or 'draft'
\ No newline at end of file
+    return getattr(document, 'status', 'draft') or 'draft'
+
+from .index_models import KnowledgeIndexDocument, KnowledgeIndexTerm  # noqa: F401,E402
+from .job_models import DocumentConversionJob  # noqa: F401,E402
@@ -5,6 +5,7 @@ from django.db import connection
 from django.db.utils import OperationalError, ProgrammingError
 
 DOCUMENT_REVIEW_TABLE = "documents_documentreview"
+DOCUMENT_CONVERSION_JOB_TABLE = "documents_documentconversionjob"
 
 
 @lru_cache(maxsize=1)
@@ -17,8 +18,19 @@ def has_document_review_table() -> bool:
         return False
 
 
+@lru_cache(maxsize=1)
+def has_conversion_job_table() -> bool:
+    try:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        return DOCUMENT_CONVERSION_JOB_TABLE in tables
+    except (ProgrammingError, OperationalError):
+        return False
+
+
 def clear_document_review_table_cache() -> None:
     has_document_review_table.cache_clear()
+    has_conversion_job_table.cache_clear()
 
 
 def safe_get_document_review(document):
@@ -233,8 +233,14 @@ class KnowledgeSectionSerializer(serializers.ModelSerializer):
 
         return super().to_internal_value(payload)
 
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and parent.is_descendant_of(self.instance):
+            raise serializers.ValidationError('Нельзя перенести раздел внутрь самого себя.')
+        return parent
+
     def get_children(self, obj):
-        children = obj.children.all().order_by('order', 'title')
+        # Сортировка в памяти, чтобы использовать prefetch_related('children') из вьюсета.
+        children = sorted(obj.children.all(), key=lambda item: (item.order, item.title))
         return KnowledgeSectionMiniSerializer(children, many=True, context=self.context).data
 
     def get_cover_image_url(self, obj):
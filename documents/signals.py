@@ -0,0 +1,103 @@
+# documents/signals.py
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db.utils import OperationalError, ProgrammingError
+from django.dispatch import receiver
+
+from students_life.response_cache import invalidate_on_change
+
+from .models import (
+    DocumentTemplate,
+    InfoSnippet,
+    KnowledgeIndexDocument,
+    KnowledgeSection,
+    KnowledgeSectionAttachment,
+    TemplateField,
+)
+
+logger = logging.getLogger(__name__)
+
+# Кэш ответов API: разделы базы знаний (с вложениями и ответственными) и шаблоны документов
+invalidate_on_change(
+    ('documents.knowledge_section',),
+    KnowledgeSection,
+    KnowledgeSectionAttachment,
+    m2m=(KnowledgeSection.responsible_users.through,),
+)
+invalidate_on_change(
+    ('documents.knowledge_section',),
+    get_user_model(),
+    ignored_update_fields={'last_login', 'updated_at'},
+)
+invalidate_on_change(('documents.template',), DocumentTemplate, TemplateField)
+
+
+def _run_index_update(func, *args):
+    def _update():
+        try:
+            func(*args)
+        except (ProgrammingError, OperationalError):
+            # Таблицы индекса ещё нет (миграции не применены) — поиск работает полным перебором.
+            logger.warning('Knowledge index is unavailable, skipping update', exc_info=True)
+
+    transaction.on_commit(_update)
+
+
+@receiver(post_save, sender=InfoSnippet)
+def reindex_snippet_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    from .knowledge_index import index_snippets
+
+    _run_index_update(index_snippets, InfoSnippet.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=KnowledgeSection)
+def reindex_section_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    from .knowledge_index import index_section_tree
+
+    _run_index_update(index_section_tree, instance)
+
+
+@receiver(pre_delete, sender=KnowledgeSection)
+def remember_section_snippets(sender, instance, **kwargs):
+    from .knowledge_index import get_subtree_ids
+
+    try:
+        section_ids = get_subtree_ids(instance)
+        instance._knowledge_index_snippet_ids = list(
+            InfoSnippet.objects.filter(section_id__in=section_ids).values_list('id', flat=True)
+        )
+    except (ProgrammingError, OperationalError):
+        instance._knowledge_index_snippet_ids = []
+
+
+@receiver(post_delete, sender=KnowledgeSection)
+def reindex_orphaned_snippets(sender, instance, **kwargs):
+    snippet_ids = getattr(instance, '_knowledge_index_snippet_ids', None)
+    if not snippet_ids:
+        return
+
+    from .knowledge_index import index_snippets
+
+    # Материалы остаются без раздела (on_delete=SET_NULL) — путь в индексе нужно обновить.
+    _run_index_update(index_snippets, InfoSnippet.objects.filter(id__in=snippet_ids))
+
+
+@receiver(post_save, sender=KnowledgeIndexDocument)
+@receiver(post_delete, sender=KnowledgeIndexDocument)
+def invalidate_knowledge_index_stats(sender, raw=False, **kwargs):
+    # Переиндексация, удаление материала или раздела (каскадом) меняют состояние индекса
+    if raw:
+        return
+
+    from .knowledge_index import invalidate_index_stats
+
+    transaction.on_commit(invalidate_index_stats)
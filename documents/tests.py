@@ -1,3 +1,371 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from docx import Document
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from . import docx_cache
+from .conversion import (
+    MAX_ATTEMPTS,
+    STALE_JOB_MINUTES,
+    _finish_job,
+    cancel_active_jobs,
+    claim_jobs,
+    enqueue_approval,
+    process_jobs,
+    requeue_stale_jobs,
+)
+from .models import (
+    DocumentConversionJob,
+    DocumentReview,
+    DocumentTemplate,
+    GeneratedDocument,
+    InfoSnippet,
+    KnowledgeSection,
+)
+from .review_guard import clear_document_review_table_cache
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def _docx(text: str) -> bytes:
+    document = Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _approved_files(documents, profile_dir=None):
+    return {document.id: ContentFile(b'%PDF-1.4', name=f'approved_{document.id}.pdf') for document in documents}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DOCUMENT_APPROVAL_ASYNC=True)
+class DocumentsTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        clear_document_review_table_cache()
+        self.admin = User.objects.create_user(email='admin@example.com', password='x', role='admin')
+        self.template = DocumentTemplate.objects.create(
+            title='Договор',
+            file=ContentFile(b'docx', name='contract.docx'),
+        )
+
+    def make_document(self, title='Договор Иванова'):
+        document = GeneratedDocument.objects.create(
+            template=self.template,
+            manager=self.admin,
+            title=title,
+            status='generated',
+        )
+        document.generated_file.save('contract.docx', ContentFile(b'docx'), save=True)
+        return document
+
+
+class ConversionRaceTests(DocumentsTestCase):
+    def test_job_cancelled_during_conversion_does_not_approve(self):
+        document = self.make_document()
+        enqueue_approval(document, self.admin)
+        jobs = claim_jobs('worker-1', 1)
+
+        def _reject_while_converting(documents, profile_dir=None):
+            # Документ отклонили, пока LibreOffice собирал PDF
+            DocumentConversionJob.objects.filter(document=document).update(
+                status=DocumentConversionJob.STATUS_ERROR,
+                error='Документ отклонён',
+            )
+            return _approved_files(documents)
+
+        with mock.patch('documents.conversion.build_approved_documents', _reject_while_converting):
+            process_jobs(jobs)
+
+        document.refresh_from_db()
+        job = DocumentConversionJob.objects.get(document=document)
+        self.assertEqual(document.status, 'generated')
+        self.assertEqual(job.status, DocumentConversionJob.STATUS_ERROR)
+        self.assertEqual(job.error, 'Документ отклонён')
+
+    def test_document_changed_during_conversion_fails_job(self):
+        document = self.make_document()
+        enqueue_approval(document, self.admin)
+        jobs = claim_jobs('worker-1', 1)
+
+        def _edit_while_converting(documents, profile_dir=None):
+            GeneratedDocument.objects.filter(pk=document.pk).update(status='draft')
+            return _approved_files(documents)
+
+        with mock.patch('documents.conversion.build_approved_documents', _edit_while_converting):
+            process_jobs(jobs)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, 'draft')
+        self.assertEqual(
+            DocumentConversionJob.objects.get(document=document).status,
+            DocumentConversionJob.STATUS_ERROR,
+        )
+
+    def test_running_job_is_approved_and_done(self):
+        document = self.make_document()
+        enqueue_approval(document, self.admin)
+
+        with mock.patch('documents.conversion.build_approved_documents', _approved_files):
+            process_jobs(claim_jobs('worker-1', 1))
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, 'approved')
+        self.assertEqual(
+            DocumentConversionJob.objects.get(document=document).status,
+            DocumentConversionJob.STATUS_DONE,
+        )
+
+    def test_finish_does_not_overwrite_cancelled_job(self):
+        document = self.make_document()
+        enqueue_approval(document, self.admin)
+        job = claim_jobs('worker-1', 1)[0]
+        cancel_active_jobs(document, 'Документ перегенерирован')
+
+        self.assertFalse(_finish_job(job, DocumentConversionJob.STATUS_DONE))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DocumentConversionJob.STATUS_ERROR)
+        self.assertEqual(job.error, 'Документ перегенерирован')
+
+
+
+@override_settings(DOCUMENT_RENDER_PROCESSES=1)
+class BulkGenerationTests(DocumentsTestCase):
+    url = '/api/documents/generated/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        docx_cache.clear_template_cache()
+        self.template = DocumentTemplate.objects.create(
+            title='Договор',
+            file=ContentFile(_docx('Примечание: {{ extra }}'), name='contract.docx'),
+        )
+        self.broken = DocumentTemplate.objects.create(title='Битый', file=ContentFile(b'not a zip', name='broken.docx'))
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _post(self, items):
+        return self.api.post(self.url, {'items': items}, format='json')
+
+    def test_all_generated(self):
+        response = self._post([
+            {'template': self.template.pk, 'title': f'Договор {index}', 'context_data': {'extra': f'№{index}'}}
+            for index in range(3)
+        ])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['generated'], response.data['failed']), (3, 0))
+        self.assertEqual([item['index'] for item in response.data['results']], [0, 1, 2])
+        document = GeneratedDocument.objects.get(pk=response.data['results'][1]['document']['id'])
+        self.assertEqual(document.status, 'generated')
+        self.assertEqual(document.title, 'Договор 1')
+        self.assertTrue(document.generated_file)
+        self.assertEqual(DocumentReview.objects.filter(document__in=GeneratedDocument.objects.all()).count(), 3)
+
+    def test_partial_failure_is_multi_status(self):
+        with self.assertLogs('documents.batch_generation', 'ERROR'):
+            response = self._post([
+                {'template': self.template.pk, 'context_data': {'extra': 'первый'}},
+                {'template': 999999},
+                'не объект',
+                {'template': self.broken.pk},
+            ])
+
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual((response.data['generated'], response.data['failed']), (1, 3))
+        self.assertEqual(
+            [item['status'] for item in response.data['results']],
+            ['generated', 'invalid', 'invalid', 'error'],
+        )
+        self.assertIn('template', response.data['results'][1]['errors'])
+        self.assertTrue(response.data['results'][3]['detail'])
+        self.assertEqual(
+            GeneratedDocument.objects.get(pk=response.data['results'][3]['document']['id']).status,
+            'error',
+        )
+
+    def test_all_failed_is_bad_request(self):
+        with self.assertLogs('documents.batch_generation', 'ERROR'):
+            response = self._post([{'template': 999999}, {'template': self.broken.pk}])
+
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual((response.data['generated'], response.data['failed']), (0, 2))
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        with override_settings(DOCUMENT_BULK_MAX_ITEMS=2):
+            response = self._post([{'template': self.template.pk}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GeneratedDocument.objects.exists())
+
+
+class ConversionQueueTests(DocumentsTestCase):
+    def test_claim_takes_oldest_queued_jobs(self):
+        jobs = [enqueue_approval(self.make_document(f'Документ {index}'), self.admin) for index in range(3)]
+
+        claimed = claim_jobs('worker-1', 2)
+
+        self.assertEqual({job.pk for job in claimed}, {jobs[0].pk, jobs[1].pk})
+        for job in claimed:
+            self.assertEqual(job.status, DocumentConversionJob.STATUS_RUNNING)
+            self.assertEqual(job.worker, 'worker-1')
+            self.assertEqual(job.attempts, 1)
+        self.assertEqual([job.pk for job in claim_jobs('worker-2', 2)], [jobs[2].pk])
+        self.assertEqual(claim_jobs('worker-3', 2), [])
+
+    def test_repeated_approve_returns_active_job(self):
+        document = self.make_document()
+
+        self.assertEqual(enqueue_approval(document, self.admin).pk, enqueue_approval(document, self.admin).pk)
+
+    def test_requeue_stale_jobs(self):
+        fresh, stale, exhausted = (
+            enqueue_approval(self.make_document(f'Документ {index}'), self.admin) for index in range(3)
+        )
+        claim_jobs('worker-1', 3)
+        long_ago = timezone.now() - timedelta(minutes=STALE_JOB_MINUTES + 1)
+        DocumentConversionJob.objects.filter(pk__in=[stale.pk, exhausted.pk]).update(started_at=long_ago)
+        DocumentConversionJob.objects.filter(pk=exhausted.pk).update(attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(requeue_stale_jobs(), 2)
+
+        statuses = dict(DocumentConversionJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[fresh.pk], DocumentConversionJob.STATUS_RUNNING)
+        self.assertEqual(statuses[stale.pk], DocumentConversionJob.STATUS_QUEUED)
+        self.assertEqual(statuses[exhausted.pk], DocumentConversionJob.STATUS_ERROR)
+        self.assertEqual(DocumentConversionJob.objects.get(pk=stale.pk).worker, '')
+
+    def test_approval_status_follows_job(self):
+        document = self.make_document()
+        api = APIClient()
+        api.force_authenticate(self.admin)
+
+        response = api.post(f'/api/documents/generated/{document.pk}/approve/')
+        self.assertEqual(response.status_code, 202, response.data)
+        job_id = response.data['approval_job']['id']
+
+        status_url = f'/api/documents/generated/{document.pk}/approval-status/'
+        response = api.get(status_url)
+        self.assertEqual(response.data['status'], 'generated')
+        self.assertEqual(response.data['approval_job']['id'], job_id)
+        self.assertEqual(response.data['approval_job']['status'], DocumentConversionJob.STATUS_QUEUED)
+
+        with mock.patch('documents.conversion.build_approved_documents', _approved_files):
+            process_jobs(claim_jobs('worker-1', 1))
+
+        response = api.get(status_url)
+        self.assertEqual(response.data['status'], 'approved')
+        self.assertEqual(response.data['approval_job']['status'], DocumentConversionJob.STATUS_DONE)
+        self.assertTrue(response.data['approved_file_url'])
+
+    def test_approval_status_without_job(self):
+        document = self.make_document()
+        api = APIClient()
+        api.force_authenticate(self.admin)
+
+        response = api.get(f'/api/documents/generated/{document.pk}/approval-status/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['approval_job'])
+
+
+class KnowledgeSectionTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.root = KnowledgeSection.objects.create(title='Визы')
+        self.child = KnowledgeSection.objects.create(title='Турция', parent=self.root)
+        self.grandchild = KnowledgeSection.objects.create(title='Документы', parent=self.child)
+        self.other = KnowledgeSection.objects.create(title='Общежития')
+
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user(email='admin@example.com', password='x', role='admin'))
+
+    def _paths(self, *sections):
+        return [
+            KnowledgeSection.objects.values_list('tree_path', 'path_title').get(pk=section.pk)
+            for section in sections
+        ]
+
+    def _ids(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return {item['id'] for item in (data['results'] if isinstance(data, dict) else data)}
+
+    def test_paths_are_built_from_root(self):
+        self.assertEqual(
+            self._paths(self.root, self.child, self.grandchild),
+            [
+                (f'{self.root.pk}/', 'Визы'),
+                (f'{self.root.pk}/{self.child.pk}/', 'Визы / Турция'),
+                (f'{self.root.pk}/{self.child.pk}/{self.grandchild.pk}/', 'Визы / Турция / Документы'),
+            ],
+        )
+
+    def test_rename_rebuilds_descendant_titles(self):
+        self.root.title = 'Визовая поддержка'
+        self.root.save()
+
+        self.assertEqual(
+            [path_title for _, path_title in self._paths(self.child, self.grandchild)],
+            ['Визовая поддержка / Турция', 'Визовая поддержка / Турция / Документы'],
+        )
+
+    def test_move_rebuilds_descendant_paths(self):
+        self.child.parent = self.other
+        self.child.save()
+
+        self.assertEqual(
+            self._paths(self.child, self.grandchild),
+            [
+                (f'{self.other.pk}/{self.child.pk}/', 'Общежития / Турция'),
+                (f'{self.other.pk}/{self.child.pk}/{self.grandchild.pk}/', 'Общежития / Турция / Документы'),
+            ],
+        )
+        self.assertEqual(set(self.root.get_descendants()), set())
+
+    def test_move_into_own_subtree_is_rejected(self):
+        self.root.parent = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.root.full_clean()
+
+        response = self.api.patch(
+            f'/api/documents/knowledge-sections/{self.root.pk}/',
+            {'parent': self.grandchild.pk},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.root.refresh_from_db()
+        self.assertIsNone(self.root.parent_id)
+
+    def test_ancestor_filter_returns_subtree(self):
+        self.assertEqual(
+            self._ids(f'/api/documents/knowledge-sections/?ancestor={self.child.pk}'),
+            {self.child.pk, self.grandchild.pk},
+        )
+        self.assertEqual(self._ids('/api/documents/knowledge-sections/?ancestor=999999'), set())
+
+    def test_section_tree_filter_returns_snippets_of_subtree(self):
+        nested = InfoSnippet.objects.create(section=self.grandchild, title='Список документов', content='Паспорт')
+        direct = InfoSnippet.objects.create(section=self.root, title='Сроки', content='10 дней')
+        InfoSnippet.objects.create(section=self.other, title='Цены', content='100$')
+
+        self.assertEqual(self._ids(f'/api/documents/snippets/?section_tree={self.root.pk}'), {nested.pk, direct.pk})
+        self.assertEqual(self._ids(f'/api/documents/snippets/?section_tree={self.child.pk}'), {nested.pk})
@@ -1,16 +1,20 @@
 # documents/views.py
+import json
 import logging
 
 from django.db import transaction
 from django.db.models import Q
 from django.db.utils import OperationalError, ProgrammingError
+from django.http import StreamingHttpResponse
 from django.utils.dateparse import parse_datetime
 from rest_framework import parsers, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
 from rest_framework.response import Response
 
-from .ai_search import search_knowledge_base
+from students_life.response_cache import CachedResponseMixin
+
+from .ai_search import get_thinking_delay_seconds, search_knowledge_base, split_answer_chunks
 from .models import (
     DocumentReview,
     DocumentTemplate,
@@ -114,9 +118,22 @@ def _normalize_attachment_data(request):
     return data
 
 
-class KnowledgeSectionViewSet(viewsets.ModelViewSet):
+def _filter_section_subtree(qs, section_id, lookup):
+    """Раздел и все вложенные разделы — один запрос по индексу tree_path."""
+    section = KnowledgeSection.objects.filter(pk=section_id).only('id', 'parent_id', 'title', 'tree_path').first()
+    if section is None:
+        return qs.none()
+
+    if not section.tree_path:
+        section.refresh_paths()
+
+    return qs.filter(**{f'{lookup}__startswith': section.tree_path})
+
+
+class KnowledgeSectionViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = KnowledgeSectionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_scope = 'documents.knowledge_section'
     parser_classes = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
 
     def get_queryset(self):
@@ -133,6 +150,10 @@ class KnowledgeSectionViewSet(viewsets.ModelViewSet):
         elif parent:
             qs = qs.filter(parent_id=parent)
 
+        ancestor = self.request.query_params.get('ancestor')
+        if ancestor:
+            qs = _filter_section_subtree(qs, ancestor, 'tree_path')
+
         responsible = self.request.query_params.get('responsible')
         if responsible:
             qs = qs.filter(responsible_users__id=responsible)
@@ -230,6 +251,26 @@ class KnowledgeSectionAttachmentViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
+def _stream_ai_answer(query, thinking_delay_ms):
+    """
+    Потоковый ответ ассистента (NDJSON): сначала событие «думаю», затем ответ по абзацам.
+    Пауза «думания» выдерживается на клиенте, воркер не спит.
+    """
+    yield json.dumps({'type': 'thinking', 'delay_ms': thinking_delay_ms}) + '\n'
+
+    try:
+        answer = search_knowledge_base(query, apply_delay=False)
+    except Exception:
+        logger.exception('ask_ai stream failed')
+        yield json.dumps({'type': 'error', 'detail': 'Не удалось получить ответ.'}, ensure_ascii=False) + '\n'
+        return
+
+    for chunk in split_answer_chunks(answer):
+        yield json.dumps({'type': 'chunk', 'text': chunk}, ensure_ascii=False) + '\n'
+
+    yield json.dumps({'type': 'done'}) + '\n'
+
+
 class InfoSnippetViewSet(viewsets.ModelViewSet):
     serializer_class = InfoSnippetSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -241,6 +282,10 @@ class InfoSnippetViewSet(viewsets.ModelViewSet):
         if section:
             qs = qs.filter(section_id=section)
 
+        section_tree = self.request.query_params.get('section_tree')
+        if section_tree:
+            qs = _filter_section_subtree(qs, section_tree, 'section__tree_path')
+
         category = self.request.query_params.get('category')
         if category:
             qs = qs.filter(category=category)
@@ -279,13 +324,29 @@ class InfoSnippetViewSet(viewsets.ModelViewSet):
         if not query:
             return Response({'detail': 'Введите ваш вопрос'}, status=status.HTTP_400_BAD_REQUEST)
 
+        thinking_delay_ms = int(get_thinking_delay_seconds() * 1000)
+
+        mode = request.data.get('mode') or request.query_params.get('mode')
+        if mode == 'stream':
+            response = StreamingHttpResponse(
+                _stream_ai_answer(query, thinking_delay_ms),
+                content_type='application/x-ndjson; charset=utf-8',
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
         answer = search_knowledge_base(query)
-        return Response({'answer': answer}, status=status.HTTP_200_OK)
+        return Response(
+            {'answer': answer, 'thinking_delay_ms': thinking_delay_ms},
+            status=status.HTTP_200_OK,
+        )
 
 
-class DocumentTemplateViewSet(viewsets.ReadOnlyModelViewSet):
+class DocumentTemplateViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = DocumentTemplateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_scope = 'documents.template'
 
     def get_queryset(self):
         qs = DocumentTemplate.objects.filter(is_active=True).prefetch_related('fields')
@@ -185,27 +185,24 @@ def _resolve_source_docx_path(generated_document) -> Path | None:
     return source_path
 
 
-def _convert_docx_to_pdf(source_docx_path: Path, workdir: Path) -> Path | None:
+def _run_soffice(input_paths: list[Path], workdir: Path, profile_dir: Path, timeout: int) -> bool:
     soffice_bin = _get_soffice_binary()
 
     if not soffice_bin:
-        return None
-
-    input_docx_path = workdir / source_docx_path.name
-    shutil.copy2(source_docx_path, input_docx_path)
+        return False
 
-    profile_dir = workdir / "lo-profile"
     profile_dir.mkdir(parents=True, exist_ok=True)
 
     command = [
         soffice_bin,
         "--headless",
+        "--norestore",
         f"-env:UserInstallation={profile_dir.resolve().as_uri()}",
         "--convert-to",
         "pdf:writer_pdf_Export",
         "--outdir",
         str(workdir),
-        str(input_docx_path),
+        *[str(path) for path in input_paths],
     ]
 
     try:
@@ -213,12 +210,12 @@ def _convert_docx_to_pdf(source_docx_path: Path, workdir: Path) -> Path | None:
             command,
             capture_output=True,
             text=True,
-            timeout=120,
+            timeout=timeout,
             check=False,
         )
     except Exception:
-        logger.exception("LibreOffice conversion crashed for %s", source_docx_path)
-        return None
+        logger.exception("LibreOffice conversion crashed for %s", [str(p) for p in input_paths])
+        return False
 
     if completed.stdout:
         logger.info("LibreOffice stdout: %s", completed.stdout.strip())
@@ -226,23 +223,78 @@ def _convert_docx_to_pdf(source_docx_path: Path, workdir: Path) -> Path | None:
     if completed.returncode != 0:
         logger.error(
             "LibreOffice failed for %s. Return code=%s stderr=%s",
-            source_docx_path,
+            [str(p) for p in input_paths],
             completed.returncode,
             (completed.stderr or "").strip(),
         )
-        return None
+        return False
 
-    output_pdf_path = workdir / f"{input_docx_path.stem}.pdf"
+    return True
 
-    if not output_pdf_path.exists():
-        logger.error(
-            "LibreOffice did not create PDF for %s. Expected path: %s",
-            source_docx_path,
-            output_pdf_path,
+
+def convert_docx_batch(
+    source_docx_paths: list[Path],
+    workdir: Path,
+    profile_dir: Path | None = None,
+    timeout: int = 120,
+) -> list[Path | None]:
+    """
+    Конвертирует несколько DOCX в PDF одним запуском LibreOffice.
+
+    profile_dir — постоянный профиль LibreOffice (у каждого воркера свой):
+    повторный запуск с уже инициализированным профилем не тратит секунды
+    на первичную настройку. Без него профиль создаётся заново в workdir.
+    Если пакетный запуск упал или не создал часть PDF, не получившиеся файлы
+    конвертируются по одному: один битый DOCX не должен валить всю пачку.
+    Результат — пути к PDF в порядке source_docx_paths (None, если файл не получился).
+    """
+    if not source_docx_paths:
+        return []
+
+    if not _get_soffice_binary():
+        return [None] * len(source_docx_paths)
+
+    input_paths = []
+    for index, source_docx_path in enumerate(source_docx_paths):
+        # Префикс нужен, чтобы одинаковые имена файлов не затирали друг друга
+        input_docx_path = workdir / f"{index}_{source_docx_path.name}"
+        shutil.copy2(source_docx_path, input_docx_path)
+        input_paths.append(input_docx_path)
+
+    if profile_dir is None:
+        profile_dir = workdir / "lo-profile"
+
+    def _output(input_docx_path: Path) -> Path | None:
+        output_pdf_path = workdir / f"{input_docx_path.stem}.pdf"
+        return output_pdf_path if output_pdf_path.exists() else None
+
+    _run_soffice(input_paths, workdir, profile_dir, timeout * len(input_paths))
+    results: list[Path | None] = [_output(input_docx_path) for input_docx_path in input_paths]
+
+    failed = [index for index, output_pdf_path in enumerate(results) if output_pdf_path is None]
+    if failed and len(input_paths) > 1:
+        logger.warning(
+            "LibreOffice batch conversion failed for %s of %s files, converting them one by one",
+            len(failed),
+            len(input_paths),
         )
-        return None
+        for index in failed:
+            if _run_soffice([input_paths[index]], workdir, profile_dir, timeout):
+                results[index] = _output(input_paths[index])
+
+    for source_docx_path, input_docx_path, output_pdf_path in zip(source_docx_paths, input_paths, results):
+        if output_pdf_path is None:
+            logger.error(
+                "LibreOffice did not create PDF for %s. Expected path: %s",
+                source_docx_path,
+                workdir / f"{input_docx_path.stem}.pdf",
+            )
+
+    return results
 
-    return output_pdf_path
+
+def _convert_docx_to_pdf(source_docx_path: Path, workdir: Path, profile_dir: Path | None = None) -> Path | None:
+    return convert_docx_batch([source_docx_path], workdir, profile_dir=profile_dir)[0]
 
 
 def _get_image_ratio(watermark_path: Path) -> float:
@@ -466,52 +518,82 @@ def _build_approved_name(source_docx_path: Path, without_watermark: bool = False
     return f"generated_documents/approved/{prefix}_{safe_stem}.pdf"
 
 
-def build_approved_document(generated_document):
-    source_docx_path = _resolve_source_docx_path(generated_document)
+def _finalize_approved_document(generated_document, source_docx_path: Path, source_pdf_path: Path, tmp_dir: Path):
+    if _is_consent_document(generated_document, source_docx_path):
+        approved_name = _build_approved_name(source_docx_path, without_watermark=True)
+        logger.info(
+            "Approved PDF for document %s created without watermark because template starts with СОГЛАСИЕ.",
+            getattr(generated_document, "id", None),
+        )
+        return ContentFile(source_pdf_path.read_bytes(), name=approved_name)
 
-    if source_docx_path is None:
+    watermark_path = _get_watermark_path()
+
+    if watermark_path is None:
+        logger.error("Watermark path could not be resolved")
         return None
 
-    with tempfile.TemporaryDirectory(prefix="approved_pdf_") as tmp_dir_raw:
-        tmp_dir = Path(tmp_dir_raw)
+    approved_pdf_path = tmp_dir / f"approved_{source_pdf_path.stem}.pdf"
 
-        source_pdf_path = _convert_docx_to_pdf(source_docx_path, tmp_dir)
+    success = _apply_watermark_to_last_pdf_page(
+        source_pdf_path=source_pdf_path,
+        watermark_path=watermark_path,
+        output_pdf_path=approved_pdf_path,
+    )
 
-        if source_pdf_path is None:
-            logger.error(
-                "Failed to convert DOCX to PDF for document %s",
-                getattr(generated_document, "id", None),
-            )
-            return None
+    if not success or not approved_pdf_path.exists():
+        logger.error(
+            "Failed to build approved PDF with watermark for document %s",
+            getattr(generated_document, "id", None),
+        )
+        return None
 
-        if _is_consent_document(generated_document, source_docx_path):
-            approved_name = _build_approved_name(source_docx_path, without_watermark=True)
-            logger.info(
-                "Approved PDF for document %s created without watermark because template starts with СОГЛАСИЕ.",
-                getattr(generated_document, "id", None),
-            )
-            return ContentFile(source_pdf_path.read_bytes(), name=approved_name)
+    approved_name = _build_approved_name(source_docx_path, without_watermark=False)
+    return ContentFile(approved_pdf_path.read_bytes(), name=approved_name)
+
+
+def build_approved_documents(generated_documents, profile_dir: Path | None = None) -> dict:
+    """
+    Approved PDF для нескольких документов: все DOCX конвертируются одним
+    запуском LibreOffice. Возвращает {document.id: ContentFile | None}.
+    """
+    results = {getattr(document, "id", None): None for document in generated_documents}
 
-        watermark_path = _get_watermark_path()
+    sources = []
+    for document in generated_documents:
+        source_docx_path = _resolve_source_docx_path(document)
+        if source_docx_path is not None:
+            sources.append((document, source_docx_path))
 
-        if watermark_path is None:
-            logger.error("Watermark path could not be resolved")
-            return None
+    if not sources:
+        return results
 
-        approved_pdf_path = tmp_dir / f"approved_{source_docx_path.stem}.pdf"
+    with tempfile.TemporaryDirectory(prefix="approved_pdf_") as tmp_dir_raw:
+        tmp_dir = Path(tmp_dir_raw)
 
-        success = _apply_watermark_to_last_pdf_page(
-            source_pdf_path=source_pdf_path,
-            watermark_path=watermark_path,
-            output_pdf_path=approved_pdf_path,
+        pdf_paths = convert_docx_batch(
+            [source_docx_path for _, source_docx_path in sources],
+            tmp_dir,
+            profile_dir=profile_dir,
         )
 
-        if not success or not approved_pdf_path.exists():
-            logger.error(
-                "Failed to build approved PDF with watermark for document %s",
-                getattr(generated_document, "id", None),
+        for (document, source_docx_path), source_pdf_path in zip(sources, pdf_paths):
+            if source_pdf_path is None:
+                logger.error(
+                    "Failed to convert DOCX to PDF for document %s",
+                    getattr(document, "id", None),
+                )
+                continue
+
+            results[document.id] = _finalize_approved_document(
+                document,
+                source_docx_path,
+                source_pdf_path,
+                tmp_dir,
             )
-            return None
 
-        approved_name = _build_approved_name(source_docx_path, without_watermark=False)
-        return ContentFile(approved_pdf_path.read_bytes(), name=approved_name)
\ No newline at end of file
+    return results
+
+
+def build_approved_document(generated_document, profile_dir: Path | None = None):
+    return build_approved_documents([generated_document], profile_dir=profile_dir).get(generated_document.id)
@@ -5,7 +5,8 @@ from unfold.admin import ModelAdmin
 from unfold.decorators import display
 from unfold.contrib.forms.widgets import WysiwygWidget
 
-from .models import Notification, TutorialVideo, RatingSnapshot, Leaderboard
+from .leaderboard import refresh_snapshot
+from .models import Notification, TutorialVideo, RatingSnapshot, Leaderboard, LeaderboardSnapshot
 
 # --- УВЕДОМЛЕНИЯ ---
 @admin.register(Notification)
@@ -122,4 +123,20 @@ class RatingSnapshotAdmin(ModelAdmin):
 
     @display(description="1 Место 🥇")
     def gold_medal_manager(self, obj):
-        return f"{obj.first_place_manager} (${obj.first_place_revenue})" if obj.first_place_manager else "-"
\ No newline at end of file
+        return f"{obj.first_place_manager} (${obj.first_place_revenue})" if obj.first_place_manager else "-"
+
+
+# --- МАТЕРИАЛИЗОВАННЫЙ РЕЙТИНГ ---
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(ModelAdmin):
+    list_display = ("__str__", "computed_for", "version", "refreshed_at")
+    readonly_fields = ("key", "date_from", "date_to", "computed_for", "version", "refreshed_at")
+    actions = ["refresh_snapshots"]
+
+    def has_add_permission(self, request): return False
+
+    @admin.action(description="🔄 Пересчитать рейтинг по сырым данным")
+    def refresh_snapshots(self, request, queryset):
+        for snapshot in queryset:
+            refresh_snapshot(snapshot)
+        self.message_user(request, f"Пересчитано срезов: {queryset.count()}")
@@ -0,0 +1,381 @@
+# gamification/kpi.py
+"""
+Расчёт KPI сотрудников для рейтинга.
+
+Все показатели считаются пачкой для списка сотрудников: по одному
+сгруппированному запросу на источник (смены, клиенты, заявки, сделки,
+платежи, расходы, операции офиса) вместо ~15 запросов на каждого сотрудника.
+Количество запросов не зависит от числа сотрудников в рейтинге.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable
+
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from analytics.finance_models import OfficeFinanceEntry
+from analytics.models import Deal, Expense, Payment
+from clients.models import Client
+from leads.models import Lead
+from timetracking.models import WorkShift
+
+ATTENDANCE_DAYS_LIMIT = 31
+
+
+def _decimal(value):
+    if value is None:
+        return Decimal('0')
+    try:
+        return Decimal(str(value))
+    except Exception:
+        return Decimal('0')
+
+
+def _money(value):
+    return float(_decimal(value).quantize(Decimal('0.01')))
+
+
+def _percent_score(value, max_value, max_score):
+    value = _decimal(value)
+    max_value = _decimal(max_value)
+    max_score = _decimal(max_score)
+
+    if max_value <= 0:
+        return Decimal('0')
+
+    score = (value / max_value) * max_score
+    if score > max_score:
+        score = max_score
+
+    if score < 0:
+        score = Decimal('0')
+
+    return score.quantize(Decimal('0.01'))
+
+
+def _count_score(count, points_per_item, max_score):
+    score = _decimal(count) * _decimal(points_per_item)
+    max_score = _decimal(max_score)
+
+    if score > max_score:
+        score = max_score
+
+    if score < 0:
+        score = Decimal('0')
+
+    return score.quantize(Decimal('0.01'))
+
+
+def _grouped(queryset, key, **aggregates) -> Dict[int, dict]:
+    rows = queryset.order_by().values(key).annotate(**aggregates)
+    return {row[key]: row for row in rows}
+
+
+def _shift_stats(user_ids, date_from, date_to):
+    shifts = WorkShift.objects.filter(
+        employee_id__in=user_ids,
+        date__gte=date_from,
+        date__lte=date_to,
+    )
+
+    return _grouped(
+        shifts,
+        'employee_id',
+        shifts_count=Count('id'),
+        present_days_count=Count('date', distinct=True),
+        closed_workdays_count=Count(
+            'id',
+            filter=Q(time_out__isnull=False, is_auto_closed=False),
+        ),
+        forgot_to_close_count=Count(
+            'id',
+            filter=Q(time_out__isnull=True) | Q(is_auto_closed=True),
+        ),
+        total_hours=Sum('hours_worked'),
+    )
+
+
+def _attendance_days(user_ids, date_from, date_to):
+    """Последние ATTENDANCE_DAYS_LIMIT смен каждого сотрудника одним запросом."""
+    shifts = (
+        WorkShift.objects
+        .filter(
+            employee_id__in=user_ids,
+            date__gte=date_from,
+            date__lte=date_to,
+        )
+        .annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('employee_id')],
+                order_by=[F('date').desc(), F('time_in').desc(), F('id').desc()],
+            )
+        )
+        .filter(row_number__lte=ATTENDANCE_DAYS_LIMIT)
+        .order_by('employee_id', '-date', '-time_in', '-id')
+    )
+
+    result = {}
+    for shift in shifts:
+        time_in = None
+        time_out = None
+
+        if shift.time_in:
+            local_in = timezone.localtime(shift.time_in)
+            time_in = local_in.strftime('%H:%M')
+
+        if shift.time_out:
+            local_out = timezone.localtime(shift.time_out)
+            time_out = local_out.strftime('%H:%M')
+
+        result.setdefault(shift.employee_id, []).append(
+            {
+                'id': shift.id,
+                'date': shift.date.isoformat() if shift.date else None,
+                'time_in': time_in,
+                'time_out': time_out,
+                'hours_worked': _money(shift.hours_worked),
+                'is_closed': bool(shift.time_out and not shift.is_auto_closed),
+                'is_auto_closed': bool(shift.is_auto_closed),
+                'is_active': bool(shift.is_active),
+            }
+        )
+
+    return result
+
+
+def build_metrics_map(users: Iterable, date_from, date_to) -> Dict[int, dict]:
+    """
+    KPI за период для списка сотрудников: {user_id: metrics}.
+    У пользователей должен быть подгружен managersalary (select_related),
+    иначе план и выручка месяца дочитываются отдельным запросом на каждого.
+    """
+    users = list(users)
+    user_ids = [user.id for user in users]
+    if not user_ids:
+        return {}
+
+    created_in_period = Q(
+        created_at__date__gte=date_from,
+        created_at__date__lte=date_to,
+    )
+
+    shift_stats = _shift_stats(user_ids, date_from, date_to)
+    attendance = _attendance_days(user_ids, date_from, date_to)
+
+    client_stats = _grouped(
+        Client.objects.filter(manager_id__in=user_ids),
+        'manager_id',
+        clients_total_count=Count('id'),
+        clients_period_count=Count('id', filter=created_in_period),
+    )
+    lead_stats = _grouped(
+        Lead.objects.filter(created_in_period, manager_id__in=user_ids),
+        'manager_id',
+        leads_count=Count('id'),
+    )
+    deal_stats = _grouped(
+        Deal.objects.filter(created_in_period, manager_id__in=user_ids),
+        'manager_id',
+        deals_count=Count('id'),
+    )
+    payment_stats = _grouped(
+        Payment.objects.filter(
+            manager_id__in=user_ids,
+            is_confirmed=True,
+            payment_date__gte=date_from,
+            payment_date__lte=date_to,
+        ),
+        'manager_id',
+        payment_amount_usd=Sum('amount_usd'),
+        payment_net_income_usd=Sum('net_income_usd'),
+    )
+    expense_stats = _grouped(
+        Expense.objects.filter(
+            manager_id__in=user_ids,
+            date__gte=date_from,
+            date__lte=date_to,
+        ),
+        'manager_id',
+        old_expenses_usd=Sum('amount_usd'),
+    )
+    office_stats = _grouped(
+        OfficeFinanceEntry.objects.filter(
+            created_by_id__in=user_ids,
+            is_confirmed=True,
+            entry_date__gte=date_from,
+            entry_date__lte=date_to,
+        ),
+        'created_by_id',
+        office_income_usd=Sum('amount_usd', filter=Q(entry_type='income')),
+        office_expense_usd=Sum('amount_usd', filter=Q(entry_type='expense')),
+    )
+
+    period = {
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+    }
+
+    result = {}
+    for user in users:
+        values = {}
+        for stats in (
+            shift_stats,
+            client_stats,
+            lead_stats,
+            deal_stats,
+            payment_stats,
+            expense_stats,
+            office_stats,
+        ):
+            values.update(stats.get(user.id, {}))
+
+        result[user.id] = _compose_metrics(
+            user,
+            values,
+            attendance.get(user.id, []),
+            period,
+        )
+
+    return result
+
+
+def _compose_metrics(user, values, attendance_days, period):
+    present_days_count = values.get('present_days_count') or 0
+    shifts_count = values.get('shifts_count') or 0
+    closed_workdays_count = values.get('closed_workdays_count') or 0
+    forgot_to_close_count = values.get('forgot_to_close_count') or 0
+    total_hours = _decimal(values.get('total_hours'))
+
+    clients_total_count = values.get('clients_total_count') or 0
+    clients_period_count = values.get('clients_period_count') or 0
+    leads_count = values.get('leads_count') or 0
+    deals_count = values.get('deals_count') or 0
+
+    payment_amount_usd = _decimal(values.get('payment_amount_usd'))
+    payment_net_income_usd = _decimal(values.get('payment_net_income_usd'))
+    old_expenses_usd = _decimal(values.get('old_expenses_usd'))
+    office_income_usd = _decimal(values.get('office_income_usd'))
+    office_expense_usd = _decimal(values.get('office_expense_usd'))
+
+    income_usd = payment_net_income_usd + office_income_usd
+    expense_usd = old_expenses_usd + office_expense_usd
+    net_profit_usd = income_usd - expense_usd
+
+    salary = getattr(user, 'managersalary', None)
+    monthly_plan = _decimal(getattr(salary, 'monthly_plan', 0) if salary else 0)
+    current_month_revenue = _decimal(
+        getattr(salary, 'current_month_revenue', 0) if salary else 0
+    )
+
+    plan_base = monthly_plan if monthly_plan > 0 else Decimal('5000')
+    income_for_score = income_usd if income_usd > 0 else current_month_revenue
+
+    revenue_score = _percent_score(income_for_score, plan_base, 35)
+    clients_score = _count_score(clients_total_count, 2, 15)
+    leads_score = _count_score(leads_count, 2, 15)
+    deals_score = _count_score(deals_count, 4, 15)
+    attendance_score = _count_score(present_days_count, 1.5, 10)
+    workday_close_score = _count_score(closed_workdays_count, 1.5, 10)
+    forgot_penalty = _count_score(forgot_to_close_count, 3, 15)
+
+    total_score = (
+        revenue_score
+        + clients_score
+        + leads_score
+        + deals_score
+        + attendance_score
+        + workday_close_score
+        - forgot_penalty
+    )
+
+    if total_score < 0:
+        total_score = Decimal('0')
+
+    total_score = total_score.quantize(Decimal('0.01'))
+
+    qualities = [
+        {
+            'key': 'revenue',
+            'label': 'Доход / выполнение плана',
+            'score': _money(revenue_score),
+            'max_score': 35,
+            'value': _money(income_for_score),
+            'hint': f'Доход за период. План: ${_money(plan_base)}',
+        },
+        {
+            'key': 'clients',
+            'label': 'Клиенты',
+            'score': _money(clients_score),
+            'max_score': 15,
+            'value': clients_total_count,
+            'hint': 'Общее количество клиентов у сотрудника',
+        },
+        {
+            'key': 'leads',
+            'label': 'Заявки',
+            'score': _money(leads_score),
+            'max_score': 15,
+            'value': leads_count,
+            'hint': 'Заявки, закреплённые за сотрудником за период',
+        },
+        {
+            'key': 'deals',
+            'label': 'Оформленные сделки',
+            'score': _money(deals_score),
+            'max_score': 15,
+            'value': deals_count,
+            'hint': 'Сделки, оформленные сотрудником за период',
+        },
+        {
+            'key': 'attendance',
+            'label': 'Приходы в офис',
+            'score': _money(attendance_score),
+            'max_score': 10,
+            'value': present_days_count,
+            'hint': 'Количество дней, когда сотрудник начинал рабочий день',
+        },
+        {
+            'key': 'workday_close',
+            'label': 'Закрытие рабочего дня',
+            'score': _money(workday_close_score),
+            'max_score': 10,
+            'value': closed_workdays_count,
+            'hint': 'Сколько раз сотрудник не забывал закрыть рабочий день',
+        },
+        {
+            'key': 'forgot_close_penalty',
+            'label': 'Штраф за незакрытый день',
+            'score': -_money(forgot_penalty),
+            'max_score': 0,
+            'value': forgot_to_close_count,
+            'hint': 'Сколько раз рабочий день не был закрыт или был закрыт автоматически',
+        },
+    ]
+
+    return {
+        'period': period,
+        'total_score': _money(total_score),
+        'income_usd': _money(income_usd),
+        'expense_usd': _money(expense_usd),
+        'net_profit_usd': _money(net_profit_usd),
+        'payment_amount_usd': _money(payment_amount_usd),
+        'payment_net_income_usd': _money(payment_net_income_usd),
+        'office_income_usd': _money(office_income_usd),
+        'office_expense_usd': _money(office_expense_usd),
+        'old_expenses_usd': _money(old_expenses_usd),
+        'current_month_revenue': _money(current_month_revenue),
+        'monthly_plan': _money(monthly_plan),
+        'clients_total_count': clients_total_count,
+        'clients_period_count': clients_period_count,
+        'leads_count': leads_count,
+        'deals_count': deals_count,
+        'present_days_count': present_days_count,
+        'shifts_count': shifts_count,
+        'closed_workdays_count': closed_workdays_count,
+        'forgot_to_close_count': forgot_to_close_count,
+        'total_hours': _money(total_hours),
+        'attendance_days': attendance_days,
+        'qualities': qualities,
+    }
@@ -0,0 +1,217 @@
+# gamification/leaderboard.py
+"""
+Материализованный рейтинг сотрудников.
+
+KPI за период хранятся в LeaderboardEntry (по строке на сотрудника),
+поэтому список рейтинга читается несколькими запросами без пересчёта.
+Строки обновляются точечно сигналами (gamification/signals.py) при изменении
+платежей, смен, заявок, сделок и т.п. — и у прежнего сотрудника / периода,
+если запись перенесли. Изменения в обход сигналов (queryset.update, bulk_*)
+подхватывает полный пересчёт: каждый срез пересчитывается целиком раз в сутки —
+при первом чтении или командой `python manage.py refresh_leaderboard`.
+
+Срезы хранятся только для известных периодов (is_known_period): месяц по
+сегодня, календарный месяц, финансовый период. Произвольный диапазон дат
+считается на лету и в базу не пишется.
+"""
+import calendar
+import datetime
+import hashlib
+import logging
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils import timezone
+
+from students_life.deferred import CommitBatch
+
+from .kpi import build_metrics_map
+from .models import Leaderboard, LeaderboardEntry, LeaderboardSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_key(date_from, date_to=None) -> str:
+    return f'{date_from.isoformat()}:{date_to.isoformat() if date_to else ""}'
+
+
+def _period_users(user_ids=None):
+    qs = Leaderboard.objects.filter(is_active=True).select_related('managersalary')
+    if user_ids is not None:
+        qs = qs.filter(id__in=user_ids)
+    return qs
+
+
+@transaction.atomic
+def refresh_snapshot(snapshot: LeaderboardSnapshot, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает строки среза: всех активных сотрудников или только user_ids.
+    Возвращает количество обновлённых строк.
+    """
+    today = timezone.localdate()
+    date_to = snapshot.date_to or today
+    full_refresh = user_ids is None
+
+    if user_ids is not None:
+        user_ids = list(user_ids)
+
+    metrics_map = build_metrics_map(_period_users(user_ids), snapshot.date_from, date_to)
+
+    entries = snapshot.entries.all()
+    if not full_refresh:
+        entries = entries.filter(user_id__in=user_ids)
+
+    existing = {}
+    stale_ids = []
+    for entry in entries:
+        if entry.user_id in metrics_map:
+            existing[entry.user_id] = entry
+        else:
+            # Сотрудник деактивирован — из рейтинга убираем
+            stale_ids.append(entry.id)
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+
+    for user_id, metrics in metrics_map.items():
+        total_score = Decimal(str(metrics['total_score']))
+        revenue = Decimal(str(metrics['income_usd']))
+
+        entry = existing.get(user_id)
+        if entry is None:
+            to_create.append(
+                LeaderboardEntry(
+                    snapshot=snapshot,
+                    user_id=user_id,
+                    total_score=total_score,
+                    revenue=revenue,
+                    metrics=metrics,
+                )
+            )
+            continue
+
+        entry.total_score = total_score
+        entry.revenue = revenue
+        entry.metrics = metrics
+        entry.updated_at = now
+        to_update.append(entry)
+
+    if stale_ids:
+        LeaderboardEntry.objects.filter(id__in=stale_ids).delete()
+    if to_create:
+        LeaderboardEntry.objects.bulk_create(to_create, ignore_conflicts=True)
+    if to_update:
+        LeaderboardEntry.objects.bulk_update(
+            to_update,
+            ['total_score', 'revenue', 'metrics', 'updated_at'],
+        )
+
+    updates = {'version': F('version') + 1, 'refreshed_at': now}
+    if full_refresh:
+        updates['computed_for'] = today
+    LeaderboardSnapshot.objects.filter(pk=snapshot.pk).update(**updates)
+    snapshot.refresh_from_db(fields=['version', 'refreshed_at', 'computed_for'])
+
+    return len(metrics_map)
+
+
+def is_known_period(date_from, date_to=None) -> bool:
+    """
+    Период, для которого хранится срез: месяц по сегодня (date_to = None),
+    календарный месяц или финансовый период.
+    """
+    from analytics.models import FinancialPeriod
+
+    if date_to is None:
+        return date_from.day == 1
+
+    last_day = calendar.monthrange(date_from.year, date_from.month)[1]
+    if date_from.day == 1 and date_to == date_from.replace(day=last_day):
+        return True
+
+    return FinancialPeriod.objects.filter(start_date=date_from, end_date=date_to).exists()
+
+
+def get_snapshot(date_from, date_to=None) -> Optional[LeaderboardSnapshot]:
+    """
+    Срез рейтинга за период или None, если период не из известных
+    (is_known_period) — тогда KPI считаются на лету. При первом обращении
+    за день строки среза рассчитываются целиком.
+    """
+    if not is_known_period(date_from, date_to):
+        return None
+
+    snapshot, _ = LeaderboardSnapshot.objects.get_or_create(
+        key=snapshot_key(date_from, date_to),
+        defaults={'date_from': date_from, 'date_to': date_to},
+    )
+
+    if snapshot.computed_for != timezone.localdate():
+        refresh_snapshot(snapshot)
+
+    return snapshot
+
+
+def refresh_user(user_id: int, event_dates: Iterable = ()) -> None:
+    """
+    Пересчитывает строки сотрудника во всех срезах, которые задевает событие.
+    Пустой event_dates — событие без даты (клиенты, план): все срезы.
+    """
+    snapshots = LeaderboardSnapshot.objects.all()
+
+    event_dates = [value for value in event_dates if value]
+    if event_dates:
+        condition = Q()
+        for value in event_dates:
+            condition |= Q(date_from__lte=value) & (Q(date_to__isnull=True) | Q(date_to__gte=value))
+        snapshots = snapshots.filter(condition)
+
+    today = timezone.localdate()
+    for snapshot in snapshots:
+        if snapshot.computed_for != today:
+            # Срез, не пересчитанный сегодня, всё равно будет пересчитан целиком при чтении
+            continue
+        refresh_snapshot(snapshot, [user_id])
+
+
+def _flush_pending(items):
+    try:
+        for user_id, event_dates in items.items():
+            refresh_user(user_id, () if None in event_dates else event_dates)
+    except (ProgrammingError, OperationalError):
+        # Таблиц рейтинга ещё нет (миграции не применены) — рейтинг считается на лету.
+        logger.warning('Leaderboard snapshots are unavailable, skipping refresh', exc_info=True)
+
+
+_batch = CommitBatch(_flush_pending)
+
+
+def schedule_user_refresh(user_id: Optional[int], event_date=None) -> None:
+    """
+    Откладывает пересчёт строки сотрудника до коммита транзакции.
+    Несколько изменений одного сотрудника в транзакции (платёж, сделка,
+    зарплата) схлопываются в один пересчёт.
+    """
+    if not user_id:
+        return
+
+    if isinstance(event_date, datetime.datetime):
+        event_date = timezone.localdate(event_date) if timezone.is_aware(event_date) else event_date.date()
+
+    _batch.add(lambda items: items.setdefault(user_id, set()).add(event_date))
+
+
+def prune_snapshots(keep_days: int) -> int:
+    """Удаляет срезы, которые не обновлялись keep_days дней (при запросе они пересоздадутся)."""
+    border = timezone.now() - datetime.timedelta(days=keep_days)
+    deleted, _ = LeaderboardSnapshot.objects.filter(refreshed_at__lt=border).delete()
+    return deleted
+
+
+def snapshot_etag(snapshot: LeaderboardSnapshot, *parts) -> str:
+    raw = ':'.join(str(part) for part in (snapshot.pk, snapshot.version, snapshot.computed_for, *parts))
+    return '"{}"'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import models
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Материализованный рейтинг за период.
+    date_to = None — «по сегодняшний день». Срез пересчитывается целиком
+    раз в сутки (computed_for — дата последнего полного пересчёта),
+    в течение дня — по событиям.
+    """
+    key = models.CharField(max_length=32, unique=True)
+    date_from = models.DateField('Начало периода')
+    date_to = models.DateField('Конец периода', null=True, blank=True)
+    computed_for = models.DateField('Рассчитан по дату', null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Срез рейтинга'
+        verbose_name_plural = 'Срезы рейтинга'
+        ordering = ('-date_from',)
+
+    def __str__(self):
+        return f'{self.date_from} — {self.date_to or "сегодня"}'
+
+    @property
+    def is_rolling(self):
+        return self.date_to is None
+
+
+class LeaderboardEntry(models.Model):
+    snapshot = models.ForeignKey(
+        LeaderboardSnapshot,
+        on_delete=models.CASCADE,
+        related_name='entries',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+    )
+    total_score = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    metrics = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Строка рейтинга'
+        verbose_name_plural = 'Строки рейтинга'
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'user'], name='leaderboard_entry_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'snapshot'], name='leaderboard_entry_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total_score}'
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gamification.leaderboard import prune_snapshots, refresh_snapshot, snapshot_key
+from gamification.models import LeaderboardSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает материализованный рейтинг: срез текущего месяца и все '
+        'сохранённые срезы, удаляет давно не обновлявшиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            default=45,
+            help='Удалить срезы, не обновлявшиеся указанное число дней (0 — не удалять).',
+        )
+
+    def handle(self, *args, **options):
+        pruned = 0
+        if options['prune_days'] > 0:
+            pruned = prune_snapshots(options['prune_days'])
+
+        # Срез текущего месяца «по сегодня» — тот, что открывает мобильное приложение
+        month_start = timezone.localdate().replace(day=1)
+        LeaderboardSnapshot.objects.get_or_create(
+            key=snapshot_key(month_start),
+            defaults={'date_from': month_start},
+        )
+
+        refreshed = 0
+        for snapshot in LeaderboardSnapshot.objects.all():
+            refresh_snapshot(snapshot)
+            refreshed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан: срезов {refreshed}, удалено устаревших {pruned}.'
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0006_devicetoken_pushbroadcast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('date_from', models.DateField(verbose_name='Начало периода')),
+                ('date_to', models.DateField(blank=True, null=True, verbose_name='Конец периода')),
+                ('computed_for', models.DateField(blank=True, null=True, verbose_name='Рассчитан по дату')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Срез рейтинга',
+                'verbose_name_plural': 'Срезы рейтинга',
+                'ordering': ('-date_from',),
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_score', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('metrics', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='gamification.leaderboardsnapshot')),
+            ],
+            options={
+                'verbose_name': 'Строка рейтинга',
+                'verbose_name_plural': 'Строки рейтинга',
+                'indexes': [models.Index(fields=['user', 'snapshot'], name='leaderboard_entry_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('snapshot', 'user'), name='leaderboard_entry_unique')],
+            },
+        ),
+    ]
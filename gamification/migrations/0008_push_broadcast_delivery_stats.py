@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0007_leaderboard_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushbroadcast',
+            name='duration_ms',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pushbroadcast',
+            name='invalid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pushbroadcast',
+            name='token_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
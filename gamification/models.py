@@ -15,6 +15,9 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Уведомление"
         verbose_name_plural = "Уведомления"
+        indexes = [
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notif_recipient_keyset_idx'),
+        ]
 
 class TutorialVideo(models.Model):
     title = models.CharField("Тема урока", max_length=255)
@@ -64,4 +67,5 @@ class Leaderboard(User):
         # Сортировка по выручке в текущем месяце (от большего к меньшему)
         ordering = ('-managersalary__current_month_revenue',)
 
-from .push_models import DeviceToken, PushBroadcast # noqa: F401,E402
\ No newline at end of file
+from .push_models import DeviceToken, PushBroadcast # noqa: F401,E402
+from .leaderboard_models import LeaderboardEntry, LeaderboardSnapshot # noqa: F401,E402
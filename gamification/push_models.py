@@ -42,8 +42,11 @@ class PushBroadcast(models.Model):
     title = models.CharField(max_length=255)
     body = models.TextField()
     target_all = models.BooleanField(default=True)
+    token_count = models.PositiveIntegerField(default=0)
     sent_count = models.PositiveIntegerField(default=0)
     failed_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
 
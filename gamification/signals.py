@@ -0,0 +1,89 @@
+# gamification/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from analytics.finance_models import OfficeFinanceEntry
+from analytics.models import Deal, Expense, Payment
+from clients.models import Client
+from leads.models import Lead
+from timetracking.models import WorkShift
+from users.models import ManagerSalary
+
+from .leaderboard import schedule_user_refresh
+
+# Модель -> (поле сотрудника, поле даты события или None — влияет на все периоды)
+KPI_SOURCES = {
+    WorkShift: ('employee_id', 'date'),
+    Client: ('manager_id', None),
+    Lead: ('manager_id', 'created_at'),
+    Deal: ('manager_id', 'created_at'),
+    Payment: ('manager_id', 'payment_date'),
+    Expense: ('manager_id', 'date'),
+    OfficeFinanceEntry: ('created_by_id', 'entry_date'),
+    ManagerSalary: ('manager_id', None),
+}
+
+PROFILE_FIELDS_IGNORED = {'last_login', 'updated_at'}
+
+
+def _leaderboard_keys(sender, instance, loaded=False):
+    user_field, date_field = KPI_SOURCES[sender]
+    if loaded:
+        # При загрузке отложенные поля не читаем, чтобы не делать запрос на каждый экземпляр
+        values = instance.__dict__
+        return values.get(user_field), values.get(date_field) if date_field else None
+    return getattr(instance, user_field, None), getattr(instance, date_field, None) if date_field else None
+
+
+def _remember_leaderboard_keys(sender, instance, **kwargs):
+    # Сотрудник и дата при загрузке: если запись перенесут, пересчитать нужно и прежние
+    instance._loaded_leaderboard_keys = _leaderboard_keys(sender, instance, loaded=True)
+
+
+def _refresh_leaderboard_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    user_id, event_date = _leaderboard_keys(sender, instance)
+    schedule_user_refresh(user_id, event_date)
+
+    loaded_user_id, loaded_date = getattr(instance, '_loaded_leaderboard_keys', (None, None))
+    if loaded_user_id and (
+        loaded_user_id != user_id
+        or (loaded_date is not None and loaded_date != event_date)
+    ):
+        schedule_user_refresh(loaded_user_id, loaded_date)
+
+    instance._loaded_leaderboard_keys = (user_id, event_date)
+
+
+for _model in KPI_SOURCES:
+    post_init.connect(
+        _remember_leaderboard_keys,
+        sender=_model,
+        dispatch_uid=f'leaderboard_keys_init_{_model._meta.label_lower}',
+    )
+    post_save.connect(
+        _refresh_leaderboard_entry,
+        sender=_model,
+        dispatch_uid=f'leaderboard_refresh_save_{_model._meta.label_lower}',
+    )
+    post_delete.connect(
+        _refresh_leaderboard_entry,
+        sender=_model,
+        dispatch_uid=f'leaderboard_refresh_delete_{_model._meta.label_lower}',
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_leaderboard_after_profile_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+
+    if update_fields and set(update_fields) <= PROFILE_FIELDS_IGNORED:
+        return
+
+    # Новый или деактивированный сотрудник, а также смена имени/аватара/офиса
+    # должны попасть в срезы и сменить их ETag.
+    schedule_user_refresh(instance.pk)
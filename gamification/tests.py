@@ -1,3 +1,213 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models import Q, Sum
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import Expense, FinancialPeriod
+from catalog.models import Currency
+from clients.models import Client
+from leads.models import Lead
+from timetracking.models import WorkShift
+from users.models import User
+
+from .kpi import build_metrics_map
+from .leaderboard import get_snapshot, is_known_period
+from .models import LeaderboardEntry, LeaderboardSnapshot, Notification
+
+
+def _metric(snapshot, user, key):
+    return LeaderboardEntry.objects.get(snapshot=snapshot, user=user).metrics[key]
+
+
+def _reference_metrics(user, date_from, date_to):
+    """Показатели сотрудника отдельными запросами — как их считал прежний сериализатор."""
+    shifts = WorkShift.objects.filter(employee=user, date__gte=date_from, date__lte=date_to)
+    expenses = Expense.objects.filter(manager=user, date__gte=date_from, date__lte=date_to)
+    return {
+        'shifts_count': shifts.count(),
+        'present_days_count': shifts.values('date').distinct().count(),
+        'closed_workdays_count': shifts.filter(time_out__isnull=False, is_auto_closed=False).count(),
+        'forgot_to_close_count': shifts.filter(Q(time_out__isnull=True) | Q(is_auto_closed=True)).count(),
+        'clients_total_count': Client.objects.filter(manager=user).count(),
+        'leads_count': Lead.objects.filter(
+            manager=user,
+            created_at__date__gte=date_from,
+            created_at__date__lte=date_to,
+        ).count(),
+        'old_expenses_usd': float(expenses.aggregate(total=Sum('amount_usd'))['total'] or 0),
+    }
+
+
+class KpiAggregationTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.date_from = self.today.replace(day=1) - datetime.timedelta(days=5)
+        currency = Currency.objects.create(code='USD', name='Доллар', rate=Decimal('1'))
+        self.users = [
+            User.objects.create_user(email=f'kpi{index}@example.com', password='x', first_name=f'Сотрудник {index}')
+            for index in range(6)
+        ]
+        for index, user in enumerate(self.users):
+            for day in range(index % 5 + 1):
+                WorkShift.objects.create(
+                    employee=user,
+                    date=self.today - datetime.timedelta(days=day % 3),
+                    time_out=timezone.now() if day % 2 else None,
+                    is_auto_closed=day == 3,
+                )
+            # Смена вне периода не должна учитываться
+            WorkShift.objects.create(employee=user, date=self.date_from - datetime.timedelta(days=1))
+            for _ in range(index % 4):
+                Client.objects.create(full_name='Клиент', phone='+99365000000', city='Ашхабад', manager=user)
+            for _ in range(index % 3):
+                Lead.objects.create(full_name='Лид', phone='+99365000000', manager=user)
+            if index % 2:
+                Expense.objects.create(
+                    title='Расход',
+                    amount=Decimal('10.50') * index,
+                    currency=currency,
+                    manager=user,
+                    date=self.today,
+                )
+
+    def test_matches_per_user_queries(self):
+        metrics = build_metrics_map(self.users, self.date_from, self.today)
+
+        for user in self.users:
+            expected = _reference_metrics(user, self.date_from, self.today)
+            actual = {key: metrics[user.id][key] for key in expected}
+            self.assertEqual(actual, expected, user.email)
+
+    def test_query_count_does_not_depend_on_users(self):
+        users = list(User.objects.select_related('managersalary').filter(pk__in=[user.pk for user in self.users]))
+
+        with self.assertNumQueries(8):
+            build_metrics_map(users[:2], self.date_from, self.today)
+        with self.assertNumQueries(8):
+            build_metrics_map(users, self.date_from, self.today)
+
+
+class LeaderboardSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.month_start = self.today.replace(day=1)
+        self.first = User.objects.create_user(email='first@example.com', password='x', first_name='Первый')
+        self.second = User.objects.create_user(email='second@example.com', password='x', first_name='Второй')
+
+
+class LeaderboardReassignmentTests(LeaderboardSnapshotTestCase):
+    def test_lead_moved_to_another_manager_updates_both(self):
+        snapshot = get_snapshot(self.month_start)
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(full_name='Лид', phone='+99365000001', manager=self.first)
+        self.assertEqual(_metric(snapshot, self.first, 'leads_count'), 1)
+
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.manager = self.second
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.save()
+
+        self.assertEqual(_metric(snapshot, self.first, 'leads_count'), 0)
+        self.assertEqual(_metric(snapshot, self.second, 'leads_count'), 1)
+
+    def test_shift_moved_to_previous_month_updates_both_periods(self):
+        previous_end = self.month_start - datetime.timedelta(days=1)
+        previous_start = previous_end.replace(day=1)
+        current = get_snapshot(self.month_start)
+        previous = get_snapshot(previous_start, previous_end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            shift = WorkShift.objects.create(employee=self.first, date=self.today)
+        self.assertEqual(_metric(current, self.first, 'shifts_count'), 1)
+        self.assertEqual(_metric(previous, self.first, 'shifts_count'), 0)
+
+        shift = WorkShift.objects.get(pk=shift.pk)
+        shift.date = previous_end
+        with self.captureOnCommitCallbacks(execute=True):
+            shift.save()
+
+        self.assertEqual(_metric(current, self.first, 'shifts_count'), 0)
+        self.assertEqual(_metric(previous, self.first, 'shifts_count'), 1)
+
+    def test_stale_snapshot_is_fully_recomputed_on_read(self):
+        snapshot = get_snapshot(self.month_start)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.create(full_name='Лид', phone='+99365000001', manager=self.first)
+
+        # Перенос в обход сигналов: точечного пересчёта нет
+        Lead.objects.update(manager=self.second)
+        self.assertEqual(_metric(snapshot, self.first, 'leads_count'), 1)
+
+        LeaderboardSnapshot.objects.filter(pk=snapshot.pk).update(
+            computed_for=self.today - datetime.timedelta(days=1),
+        )
+        snapshot = get_snapshot(self.month_start)
+
+        self.assertEqual(snapshot.computed_for, self.today)
+        self.assertEqual(_metric(snapshot, self.first, 'leads_count'), 0)
+        self.assertEqual(_metric(snapshot, self.second, 'leads_count'), 1)
+
+
+class LeaderboardPeriodTests(LeaderboardSnapshotTestCase):
+    def test_known_periods(self):
+        self.assertTrue(is_known_period(datetime.date(2026, 2, 1)))
+        self.assertTrue(is_known_period(datetime.date(2026, 2, 1), datetime.date(2026, 2, 28)))
+        self.assertFalse(is_known_period(datetime.date(2026, 2, 3)))
+        self.assertFalse(is_known_period(datetime.date(2026, 2, 1), datetime.date(2026, 2, 27)))
+        self.assertFalse(is_known_period(datetime.date(2026, 2, 16), datetime.date(2026, 2, 28)))
+
+        FinancialPeriod.objects.create(start_date=datetime.date(2026, 2, 16), end_date=datetime.date(2026, 2, 28))
+        self.assertTrue(is_known_period(datetime.date(2026, 2, 16), datetime.date(2026, 2, 28)))
+
+    def test_unknown_period_is_computed_live_without_snapshot(self):
+        WorkShift.objects.create(employee=self.first, date=datetime.date(2026, 2, 5))
+
+        self.assertIsNone(get_snapshot(datetime.date(2026, 2, 3), datetime.date(2026, 2, 9)))
+
+        client = APIClient()
+        client.force_authenticate(self.first)
+        response = client.get('/api/gamification/leaderboard/?date_from=2026-02-03&date_to=2026-02-09')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertFalse(LeaderboardSnapshot.objects.exists())
+        row = next(item for item in response.json() if item['id'] == self.first.id)
+        self.assertEqual(row['details']['shifts_count'], 1)
+
+    def test_period_bounds_are_inclusive(self):
+        start, end = datetime.date(2026, 2, 1), datetime.date(2026, 2, 28)
+        for day in (start - datetime.timedelta(days=1), start, end, end + datetime.timedelta(days=1)):
+            WorkShift.objects.create(employee=self.first, date=day)
+
+        snapshot = get_snapshot(start, end)
+
+        self.assertEqual(_metric(snapshot, self.first, 'shifts_count'), 2)
+        self.assertEqual(_metric(snapshot, self.first, 'present_days_count'), 2)
+
+
+class NotificationCursorTests(TestCase):
+    def test_cursor_pages_cover_feed_without_duplicates(self):
+        user = User.objects.create_user(email='reader@example.com', password='x')
+        other = User.objects.create_user(email='other@example.com', password='x')
+        created_at = timezone.now()
+        for index in range(5):
+            Notification.objects.create(recipient=user, title=f'Уведомление {index}', body='Текст')
+        Notification.objects.create(recipient=other, title='Чужое', body='Текст')
+        # Одинаковое время создания: порядок внутри секунды решает id
+        Notification.objects.filter(recipient=user).update(created_at=created_at)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        seen = []
+        url = '/api/gamification/notifications/?pagination=cursor&limit=2'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
 
-# Create your tests here.
+        expected = list(Notification.objects.filter(recipient=user).order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
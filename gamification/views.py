@@ -7,10 +7,12 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
 from analytics.models import FinancialPeriod
+from notifications.push_engine import collect_token_user_ids, collect_tokens, deliver
 from users.permissions import is_admin_user
 
-from .firebase_service import send_push_to_tokens
-from .models import Leaderboard, Notification, TutorialVideo
+from .kpi import build_metrics_map
+from .leaderboard import get_snapshot, refresh_snapshot, snapshot_etag
+from .models import Leaderboard, LeaderboardEntry, Notification, TutorialVideo
 from .push_models import DeviceToken, PushBroadcast
 from .serializers import (
     DeviceTokenSerializer,
@@ -24,6 +26,8 @@ from .serializers import (
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # ?pagination=cursor: лента уведомлений без OFFSET по индексу (recipient, created_at, id)
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -35,7 +39,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             if dt:
                 qs = qs.filter(updated_at__gte=dt)
 
-        return qs.order_by('-created_at')
+        return qs.order_by('-created_at', '-id')
 
 
 class DeviceTokenViewSet(viewsets.ModelViewSet):
@@ -105,26 +109,32 @@ class PushBroadcastViewSet(viewsets.ModelViewSet):
             )
 
         broadcast = self.get_object()
-        tokens_qs = DeviceToken.objects.filter(is_active=True)
 
-        user_ids = request.data.get('user_ids') or []
-        if user_ids:
-            tokens_qs = tokens_qs.filter(user_id__in=user_ids)
+        user_ids = request.data.get('user_ids') or None
+        tokens = collect_tokens(user_ids=user_ids)
+        recipients = collect_token_user_ids(user_ids=user_ids)
 
-        tokens = list(tokens_qs.values_list('token', flat=True).distinct())
-
-        result = send_push_to_tokens(
+        result = deliver(
             tokens=tokens,
             title=broadcast.title,
             body=broadcast.body,
         )
 
-        broadcast.sent_count = result.get('success_count', 0)
-        broadcast.failed_count = result.get('failure_count', 0)
+        broadcast.token_count = result.token_count
+        broadcast.sent_count = result.sent
+        broadcast.failed_count = result.failed
+        broadcast.invalid_count = len(result.dead_tokens)
+        broadcast.duration_ms = result.duration_ms
         broadcast.sent_at = timezone.now()
-        broadcast.save(update_fields=['sent_count', 'failed_count', 'sent_at'])
+        broadcast.save(update_fields=[
+            'token_count',
+            'sent_count',
+            'failed_count',
+            'invalid_count',
+            'duration_ms',
+            'sent_at',
+        ])
 
-        recipients = tokens_qs.values_list('user_id', flat=True).distinct()
         notifications = [
             Notification(
                 recipient_id=user_id,
@@ -141,7 +151,7 @@ class PushBroadcastViewSet(viewsets.ModelViewSet):
             {
                 'detail': 'Рассылка выполнена',
                 'broadcast': self.get_serializer(broadcast).data,
-                'firebase': result,
+                'firebase': result.as_dict(),
             }
         )
 
@@ -191,11 +201,15 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def _period_dates(self):
+        if hasattr(self, '_period_cache'):
+            return self._period_cache
+
         params = self.request.query_params
 
         if params.get('current_period') in ('1', 'true', 'True'):
             period = FinancialPeriod.ensure_current_period()
-            return period.start_date, period.end_date
+            self._period_cache = (period.start_date, period.end_date)
+            return self._period_cache
 
         date_from = parse_date(params.get('date_from') or '')
         date_to = parse_date(params.get('date_to') or '')
@@ -208,7 +222,50 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         if not date_from:
             date_from = date_to.replace(day=1)
 
-        return date_from, date_to
+        self._period_cache = (date_from, date_to)
+        return self._period_cache
+
+    def _is_live(self):
+        """?live=1 — пересчёт KPI по сырым таблицам, только для администратора."""
+        if self.request.query_params.get('live') not in ('1', 'true', 'True'):
+            return False
+
+        if not is_admin_user(self.request.user):
+            raise PermissionDenied('Живой пересчёт рейтинга доступен только администратору.')
+
+        return True
+
+    def _get_snapshot(self):
+        date_from, date_to = self._period_dates()
+        # Период «по сегодня» хранится одним срезом, который сдвигается вместе с датой
+        if date_to == timezone.localdate():
+            date_to = None
+
+        return get_snapshot(date_from, date_to)
+
+    def _snapshot_metrics(self, snapshot, users):
+        if snapshot is None:
+            # Произвольный период — срез не хранится, считаем на лету
+            date_from, date_to = self._period_dates()
+            return build_metrics_map(users, date_from, date_to)
+
+        entries = dict(
+            LeaderboardEntry.objects
+            .filter(snapshot=snapshot, user_id__in=[user.id for user in users])
+            .values_list('user_id', 'metrics')
+        )
+
+        missing = [user.id for user in users if user.id not in entries]
+        if missing:
+            # Сотрудник появился после расчёта среза — досчитываем его строку
+            refresh_snapshot(snapshot, missing)
+            entries.update(
+                LeaderboardEntry.objects
+                .filter(snapshot=snapshot, user_id__in=missing)
+                .values_list('user_id', 'metrics')
+            )
+
+        return entries
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -218,6 +275,10 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
         context['kpi_date_to'] = date_to
         context['rank_map'] = getattr(self, '_rank_map', {})
 
+        kpi_metrics = getattr(self, '_kpi_metrics', None)
+        if kpi_metrics is not None:
+            context['kpi_metrics'] = kpi_metrics
+
         return context
 
     def get_queryset(self):
@@ -261,9 +322,7 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
 
         return qs.distinct().order_by('last_name', 'first_name', 'id')
 
-    def list(self, request, *args, **kwargs):
-        queryset = list(self.filter_queryset(self.get_queryset()))
-
+    def _live_list(self, queryset):
         first_serializer = self.get_serializer(queryset, many=True)
         data = list(first_serializer.data)
 
@@ -283,4 +342,51 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
             if user_id is not None:
                 self._rank_map[user_id] = index
 
-        return Response(data)
\ No newline at end of file
+        return Response(data)
+
+    def _not_modified(self, etag):
+        if_none_match = self.request.headers.get('If-None-Match', '')
+        return etag in [value.strip() for value in if_none_match.split(',')]
+
+    def list(self, request, *args, **kwargs):
+        queryset = list(self.filter_queryset(self.get_queryset()))
+
+        if self._is_live():
+            return self._live_list(queryset)
+
+        snapshot = self._get_snapshot()
+        self._kpi_metrics = self._snapshot_metrics(snapshot, queryset)
+
+        headers = {}
+        if snapshot is not None:
+            etag = snapshot_etag(
+                snapshot,
+                request.get_full_path(),
+                is_admin_user(request.user),
+                ','.join(str(user.id) for user in queryset),
+            )
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if self._not_modified(etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        # Порядок как при живом расчёте: стабильная сортировка по баллам и доходу
+        queryset.sort(
+            key=lambda user: (
+                float(self._kpi_metrics[user.id]['total_score'] or 0),
+                float(self._kpi_metrics[user.id]['income_usd'] or 0),
+            ),
+            reverse=True,
+        )
+        self._rank_map = {user.id: index for index, user in enumerate(queryset, start=1)}
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, headers=headers)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+
+        if not self._is_live():
+            self._kpi_metrics = self._snapshot_metrics(self._get_snapshot(), [instance])
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
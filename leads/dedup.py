@@ -0,0 +1,56 @@
+# leads/dedup.py
+"""
+Поиск дубликатов заявок по нормализованным телефону и email.
+
+Проверка — индексированный lookup по Lead.phone_normalized / email_normalized
+(LeadSerializer.validate). Уникальности в базе нет: в истории уже есть заявки
+с одинаковыми телефонами, поэтому защита от дубликатов — на уровне приложения.
+
+Гонку двух одновременных отправок с одним номером закрывает только публичная
+форма (LeadCreateAPIView): проверка и вставка идут в транзакции под
+advisory-lock PostgreSQL на ключи заявки (lock_submission_keys), второй запрос
+ждёт коммита первого и видит дубликат. Админка и мобильное API проверяют
+дубликаты без блокировки, на SQLite блокировки нет.
+"""
+import hashlib
+
+from django.db import connection
+
+from .models import Lead, normalize_email, normalize_phone
+
+LOCK_NAMESPACE = 'leads.submission'
+
+
+def find_duplicate_field(phone=None, email=None, exclude_pk=None) -> str | None:
+    """Имя поля ('email' / 'phone'), по которому уже есть заявка, или None."""
+    leads = Lead.objects.all()
+    if exclude_pk:
+        leads = leads.exclude(pk=exclude_pk)
+
+    # Email проверяется первым: совпадение по нему сообщается, даже если совпал и телефон
+    for field, key in (('email', normalize_email(email)), ('phone', normalize_phone(phone))):
+        if key and leads.filter(**{f'{field}_normalized': key}).exists():
+            return field
+
+    return None
+
+
+def _lock_id(kind: str, key: str) -> int:
+    digest = hashlib.blake2b(f'{LOCK_NAMESPACE}:{kind}:{key}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def lock_submission_keys(phone=None, email=None) -> None:
+    """Берёт транзакционные advisory-lock на ключи заявки. Вызывать внутри transaction.atomic()."""
+    if connection.vendor != 'postgresql':
+        return
+
+    lock_ids = sorted({
+        _lock_id(kind, key)
+        for kind, key in (('phone', normalize_phone(phone)), ('email', normalize_email(email)))
+        if key
+    })
+
+    with connection.cursor() as cursor:
+        for lock_id in lock_ids:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [lock_id])
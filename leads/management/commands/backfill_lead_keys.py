@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from leads.models import Lead, normalize_email, normalize_phone
+
+
+class Command(BaseCommand):
+    help = 'Заполняет нормализованные телефон и email заявок (ключи поиска дубликатов).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queryset = Lead.objects.only('id', 'phone', 'email', 'phone_normalized', 'email_normalized').order_by('pk')
+
+        updated = 0
+        batch = []
+        for lead in queryset.iterator(chunk_size=batch_size):
+            phone_key = normalize_phone(lead.phone)
+            email_key = normalize_email(lead.email)
+            if lead.phone_normalized == phone_key and lead.email_normalized == email_key:
+                continue
+
+            lead.phone_normalized = phone_key
+            lead.email_normalized = email_key
+            batch.append(lead)
+
+            if len(batch) >= batch_size:
+                Lead.objects.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Lead.objects.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Ключи дубликатов заполнены: обновлено заявок {updated}.'))
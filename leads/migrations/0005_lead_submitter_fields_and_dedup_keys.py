@@ -0,0 +1,108 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:13
+
+import re
+
+from django.db import migrations, models
+
+SUBMITTER_FIELDS = (
+    'submitter_ip',
+    'submitter_user_agent',
+    'submitter_referer',
+    'submitter_origin',
+    'submitter_host',
+)
+
+
+# Копии leads.models.normalize_phone / normalize_email: миграция не зависит от текущего кода модели
+def normalize_phone(value) -> str:
+    return re.sub(r'\D', '', str(value or ''))
+
+
+def normalize_email(value) -> str:
+    return str(value or '').strip().casefold()
+
+
+def add_missing_submitter_columns(apps, schema_editor):
+    # Поля отправителя уже пишутся публичной формой, но миграции для них не было:
+    # в рабочих базах колонки есть, в новых — создаём
+    Lead = apps.get_model('leads', 'Lead')
+    connection = schema_editor.connection
+
+    for name in SUBMITTER_FIELDS:
+        field = Lead._meta.get_field(name)
+        # Колонки перечитываются на каждом поле: SQLite добавляет поле
+        # пересозданием таблицы по модели, и с ним появляются остальные
+        with connection.cursor() as cursor:
+            existing_columns = {
+                column.name
+                for column in connection.introspection.get_table_description(cursor, Lead._meta.db_table)
+            }
+        if field.column not in existing_columns:
+            schema_editor.add_field(Lead, field)
+
+
+def fill_dedup_keys(apps, schema_editor):
+    # То же, что `manage.py backfill_lead_keys`: старые заявки участвуют в поиске дубликатов
+    Lead = apps.get_model('leads', 'Lead')
+    batch = []
+    for lead in Lead.objects.only('id', 'phone', 'email').order_by('pk').iterator(chunk_size=1000):
+        lead.phone_normalized = normalize_phone(lead.phone)
+        lead.email_normalized = normalize_email(lead.email)
+        batch.append(lead)
+        if len(batch) >= 1000:
+            Lead.objects.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_lead_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254, verbose_name='Email (нормализованный)'),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=50, verbose_name='Телефон (цифры)'),
+        ),
+        # Колонки отправителя: в состояние миграций — всегда, в базу — только если их нет
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='lead',
+                    name='submitter_host',
+                    field=models.CharField(blank=True, default='', max_length=255, verbose_name='Host'),
+                ),
+                migrations.AddField(
+                    model_name='lead',
+                    name='submitter_ip',
+                    field=models.GenericIPAddressField(blank=True, db_index=True, null=True, verbose_name='IP отправителя'),
+                ),
+                migrations.AddField(
+                    model_name='lead',
+                    name='submitter_origin',
+                    field=models.CharField(blank=True, default='', max_length=255, verbose_name='Origin'),
+                ),
+                migrations.AddField(
+                    model_name='lead',
+                    name='submitter_referer',
+                    field=models.URLField(blank=True, default='', max_length=1000, verbose_name='Referer'),
+                ),
+                migrations.AddField(
+                    model_name='lead',
+                    name='submitter_user_agent',
+                    field=models.TextField(blank=True, default='', verbose_name='User-Agent отправителя'),
+                ),
+            ],
+        ),
+        migrations.RunPython(add_missing_submitter_columns, migrations.RunPython.noop),
+        migrations.RunPython(fill_dedup_keys, migrations.RunPython.noop),
+    ]
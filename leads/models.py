@@ -1,8 +1,18 @@
 # leads/models.py
+import re
+
 from django.conf import settings
 from django.db import models
 
 
+def normalize_phone(value) -> str:
+    return re.sub(r'\D', '', str(value or ''))
+
+
+def normalize_email(value) -> str:
+    return str(value or '').strip().casefold()
+
+
 class Lead(models.Model):
     STATUS_CHOICES = (
         ('new', 'Новая заявка'),
@@ -86,6 +96,25 @@ class Lead(models.Model):
         default='',
     )
 
+    # Ключи поиска дубликатов: только цифры телефона и email в нижнем регистре.
+    # Заполняются в save() (старые записи — миграцией 0005, сверка — `manage.py backfill_lead_keys`).
+    phone_normalized = models.CharField(
+        "Телефон (цифры)",
+        max_length=50,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+    )
+    email_normalized = models.CharField(
+        "Email (нормализованный)",
+        max_length=254,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+    )
+
     manager = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -107,6 +136,21 @@ class Lead(models.Model):
     def __str__(self):
         return f"{self.full_name} ({self.phone})"
 
+    def save(self, *args, **kwargs):
+        self.phone_normalized = normalize_phone(self.phone)
+        self.email_normalized = normalize_email(self.email)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'phone' in update_fields:
+                update_fields.add('phone_normalized')
+            if 'email' in update_fields:
+                update_fields.add('email_normalized')
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Заявка с сайта"
         verbose_name_plural = "Заявки с сайта"
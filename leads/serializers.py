@@ -3,11 +3,8 @@ import re
 
 from rest_framework import serializers
 
-from .models import Lead
-
-
-def normalize_phone(value) -> str:
-    return re.sub(r'\D', '', str(value or ''))
+from .dedup import find_duplicate_field
+from .models import Lead, normalize_phone
 
 
 def starts_with_test(value) -> bool:
@@ -90,29 +87,15 @@ class LeadSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         instance = getattr(self, 'instance', None)
 
-        email = attrs.get('email')
-        phone = attrs.get('phone')
-        phone_digits = normalize_phone(phone)
-
-        duplicates = Lead.objects.all()
-
-        if instance and instance.pk:
-            duplicates = duplicates.exclude(pk=instance.pk)
-
-        if email:
-            if duplicates.filter(email__iexact=str(email).strip()).exists():
-                raise serializers.ValidationError(
-                    {'email': 'Такая заявка уже есть. Дубликат не принят.'}
-                )
-
-        if phone_digits:
-            possible_phone_duplicates = duplicates.only('id', 'phone')
-
-            for lead in possible_phone_duplicates:
-                if normalize_phone(lead.phone) == phone_digits:
-                    raise serializers.ValidationError(
-                        {'phone': 'Такая заявка уже есть. Дубликат не принят.'}
-                    )
+        duplicate_field = find_duplicate_field(
+            phone=attrs.get('phone'),
+            email=attrs.get('email'),
+            exclude_pk=instance.pk if instance else None,
+        )
+        if duplicate_field:
+            raise serializers.ValidationError(
+                {duplicate_field: 'Такая заявка уже есть. Дубликат не принят.'}
+            )
 
         return attrs
 
@@ -1,3 +1,37 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .dedup import find_duplicate_field
+from .models import Lead
+
+
+class FindDuplicateFieldTests(TestCase):
+    def test_email_match_reported_among_many_phone_matches(self):
+        for index in range(3):
+            Lead.objects.create(full_name=f'Лид {index}', phone='+993 65 123456', email=f'other{index}@example.com')
+        Lead.objects.create(full_name='Дубль', phone='+993 65 123456', email='Same@Example.com')
+
+        self.assertEqual(find_duplicate_field(phone='99365123456', email='same@example.com '), 'email')
+
+    def test_phone_match_ignores_formatting(self):
+        Lead.objects.create(full_name='Лид', phone='+993 (65) 12-34-56', email='a@example.com')
+
+        self.assertEqual(find_duplicate_field(phone='99365123456', email='b@example.com'), 'phone')
+
+    def test_no_duplicate(self):
+        Lead.objects.create(full_name='Лид', phone='+99365123456', email='a@example.com')
+
+        self.assertIsNone(find_duplicate_field(phone='+99365000000', email='b@example.com'))
+        self.assertIsNone(find_duplicate_field())
+
+    def test_exclude_pk_skips_edited_lead(self):
+        lead = Lead.objects.create(full_name='Лид', phone='+99365123456', email='a@example.com')
+
+        self.assertIsNone(find_duplicate_field(phone=lead.phone, email=lead.email, exclude_pk=lead.pk))
+
+    def test_keys_follow_updates(self):
+        lead = Lead.objects.create(full_name='Лид', phone='+99365123456', email='a@example.com')
+        lead.phone = '+99365999999'
+        lead.save(update_fields=['phone'])
+
+        self.assertIsNone(find_duplicate_field(phone='+99365123456'))
+        self.assertEqual(find_duplicate_field(phone='99365999999'), 'phone')
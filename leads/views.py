@@ -1,5 +1,6 @@
 # leads/views.py
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.utils.dateparse import parse_datetime
 from rest_framework import permissions, status, viewsets
@@ -9,6 +10,9 @@ from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 
+from search.index import search_queryset
+
+from .dedup import lock_submission_keys
 from .models import Lead
 from .serializers import LeadSerializer, MobileLeadSerializer
 
@@ -75,6 +79,13 @@ class LeadCreateAPIView(CreateAPIView):
     permission_classes = [IsAuthorizedAPIClient]
     throttle_classes = [LeadCreateThrottle]
 
+    def create(self, request, *args, **kwargs):
+        # Проверка дубликата и вставка — под блокировкой ключей заявки
+        data = request.data if hasattr(request.data, 'get') else {}
+        with transaction.atomic():
+            lock_submission_keys(phone=data.get('phone'), email=data.get('email'))
+            return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         request = self.request
 
@@ -86,15 +97,33 @@ class LeadCreateAPIView(CreateAPIView):
             submitter_host=clean_header(request.META.get('HTTP_HOST'), 255),
         )
 
-        try:
-            from notifications.firebase import notify_admins_about_new_lead
-            notify_admins_about_new_lead(lead)
-        except Exception:
-            pass
+        # Пуш — после коммита, чтобы не держать блокировку ключей на время запросов к FCM
+        transaction.on_commit(lambda: _notify_admins(lead))
+
+
+def _notify_admins(lead):
+    try:
+        from notifications.firebase import notify_admins_about_new_lead
+        notify_admins_about_new_lead(lead)
+    except Exception:
+        pass
+
 
 class LeadViewSet(viewsets.ModelViewSet):
     serializer_class = MobileLeadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    allowed_ordering = {
+        'created_at',
+        '-created_at',
+        'updated_at',
+        '-updated_at',
+        'full_name',
+        '-full_name',
+        'status',
+        '-status',
+        'direction',
+        '-direction',
+    }
 
     def _is_admin(self, user):
         return bool(
@@ -107,6 +136,17 @@ class LeadViewSet(viewsets.ModelViewSet):
             )
         )
 
+    def _get_ordering(self):
+        ordering = self.request.query_params.get('ordering') or '-created_at'
+        return ordering if ordering in self.allowed_ordering else '-created_at'
+
+    def get_keyset_ordering(self):
+        # Курсорная пагинация — только по датам; по имени/статусу остаётся limit/offset
+        ordering = self._get_ordering()
+        if ordering.lstrip('-') not in ('created_at', 'updated_at'):
+            return None
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
     def get_queryset(self):
         user = self.request.user
         is_admin = self._is_admin(user)
@@ -148,6 +188,11 @@ class LeadViewSet(viewsets.ModelViewSet):
 
         search = self.request.query_params.get('search')
         if search:
+            ranked = search_queryset(qs.distinct(), 'leads', search)
+            if ranked is not None:
+                self.search_ranked = True
+                return ranked
+
             qs = qs.filter(
                 Q(full_name__icontains=search)
                 | Q(student_name__icontains=search)
@@ -163,25 +208,7 @@ class LeadViewSet(viewsets.ModelViewSet):
                 | Q(submitter_host__icontains=search)
             )
 
-        ordering = self.request.query_params.get('ordering') or '-created_at'
-
-        allowed = {
-            'created_at',
-            '-created_at',
-            'updated_at',
-            '-updated_at',
-            'full_name',
-            '-full_name',
-            'status',
-            '-status',
-            'direction',
-            '-direction',
-        }
-
-        if ordering not in allowed:
-            ordering = '-created_at'
-
-        return qs.distinct().order_by(ordering)
+        return qs.distinct().order_by(self._get_ordering(), '-id')
 
     def perform_update(self, serializer):
         instance = self.get_object()
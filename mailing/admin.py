@@ -8,6 +8,7 @@ from unfold.decorators import display, action
 from unfold.contrib.forms.widgets import WysiwygWidget
 
 from .models import EmailTemplate, MailingCampaign, MailingLog
+from .runner import enqueue_campaign, is_async_mailing_enabled
 from .services import send_campaign, send_test_email
 
 @admin.register(EmailTemplate)
@@ -66,7 +67,11 @@ class MailingCampaignAdmin(ModelAdmin):
     def send_newsletters_now(self, request, queryset):
         count = 0
         for campaign in queryset:
-            if campaign.status not in ('sending', 'done'):
+            if campaign.status in ('queued', 'sending', 'done'):
+                continue
+            if is_async_mailing_enabled():
+                count += enqueue_campaign(campaign)
+            else:
                 send_campaign(campaign)
                 count += 1
         self.message_user(request, f"Успешно запущена отправка для {count} кампаний.", messages.SUCCESS)
@@ -74,8 +79,11 @@ class MailingCampaignAdmin(ModelAdmin):
     @action(description="🚀 ЗАПУСТИТЬ РАССЫЛКУ СЕЙЧАС")
     def send_now_detail(self, request, object_id):
         campaign = self.get_object(request, object_id)
-        if campaign.status in ('sending', 'done'):
-            self.message_user(request, "Эта рассылка уже отправлена!", level=messages.WARNING)
+        if campaign.status in ('queued', 'sending', 'done'):
+            self.message_user(request, "Эта рассылка уже отправлена или стоит в очереди!", level=messages.WARNING)
+        elif is_async_mailing_enabled():
+            enqueue_campaign(campaign)
+            self.message_user(request, "Рассылка поставлена в очередь. Статистика обновляется по мере отправки.", level=messages.SUCCESS)
         else:
             try:
                 send_campaign(campaign)
@@ -107,7 +115,7 @@ class MailingCampaignAdmin(ModelAdmin):
 
     @display(description='Статус', label=True)
     def status_badge(self, obj):
-        colors = {'draft': 'default', 'scheduled': 'info', 'sending': 'warning', 'done': 'success', 'error': 'danger'}
+        colors = {'draft': 'default', 'scheduled': 'info', 'queued': 'info', 'sending': 'warning', 'done': 'success', 'error': 'danger'}
         return obj.get_status_display(), colors.get(obj.status, 'default')
 
 
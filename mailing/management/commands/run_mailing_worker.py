@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mailing.models import MailingCampaign
+from mailing.runner import DEFAULT_POLL_INTERVAL_SECONDS, run_campaign, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Фоновая отправка email-рассылок из очереди (с продолжением прерванных кампаний).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=DEFAULT_POLL_INTERVAL_SECONDS,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать текущую очередь и завершиться.',
+        )
+        parser.add_argument(
+            '--campaign',
+            type=int,
+            default=None,
+            help='Отправить (или продолжить) одну кампанию по id и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        if options['campaign']:
+            campaign = MailingCampaign.objects.select_related('template').filter(pk=options['campaign']).first()
+            if campaign is None:
+                raise CommandError(f'Кампания {options["campaign"]} не найдена.')
+
+            campaign = run_campaign(campaign, worker_name='manual')
+            self.stdout.write(self.style.SUCCESS(
+                f'Кампания «{campaign.title}»: отправлено {campaign.total_sent}, ошибок {campaign.total_failed}.'
+            ))
+            return
+
+        self.stdout.write('Воркер рассылок запущен.')
+        processed = run_worker(poll_interval=options['poll_interval'], once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Воркер рассылок остановлен, кампаний: {processed}.'))
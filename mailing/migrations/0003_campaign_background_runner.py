@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailing', '0002_mailingcampaign_specific_clients_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailingcampaign',
+            name='checkpoint_key',
+            field=models.PositiveIntegerField(default=0, verbose_name='Последний обработанный получатель'),
+        ),
+        migrations.AddField(
+            model_name='mailingcampaign',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность воркера'),
+        ),
+        migrations.AddField(
+            model_name='mailingcampaign',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Воркер'),
+        ),
+        migrations.AlterField(
+            model_name='mailingcampaign',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Черновик'), ('scheduled', 'Запланирована'), ('queued', 'В очереди'), ('sending', 'Отправляется'), ('done', 'Завершена'), ('error', 'Ошибка')], default='draft', max_length=20, verbose_name='Статус'),
+        ),
+    ]
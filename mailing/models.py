@@ -32,6 +32,7 @@ class MailingCampaign(models.Model):
     STATUS_CHOICES = (
         ('draft',     'Черновик'),
         ('scheduled', 'Запланирована'),
+        ('queued',    'В очереди'),
         ('sending',   'Отправляется'),
         ('done',      'Завершена'),
         ('error',     'Ошибка'),
@@ -63,6 +64,11 @@ class MailingCampaign(models.Model):
     total_failed    = models.PositiveIntegerField('Ошибок отправки',  default=0)
     error_log       = models.TextField('Лог ошибок', blank=True)
 
+    # Прогресс фоновой отправки (mailing.runner): с какого получателя продолжать после перезапуска
+    checkpoint_key  = models.PositiveIntegerField('Последний обработанный получатель', default=0)
+    worker          = models.CharField('Воркер', max_length=100, blank=True)
+    heartbeat_at    = models.DateTimeField('Последняя активность воркера', null=True, blank=True)
+
     scheduled_at    = models.DateTimeField('Запланировано на', null=True, blank=True)
     started_at      = models.DateTimeField('Начало отправки',  null=True, blank=True)
     finished_at     = models.DateTimeField('Конец отправки',   null=True, blank=True)
@@ -0,0 +1,279 @@
+# mailing/runner.py
+"""
+Фоновая отправка email-рассылок.
+
+Админка только ставит кампанию в очередь (status='queued'); рассылку ведёт
+`python manage.py run_mailing_worker`. Получатели идут пачками: пачка делится
+между MAILING_CONCURRENCY потоками, у каждого потока одно SMTP-соединение на
+пачку (get_connection), общий лимит скорости — MAILING_RATE_PER_MINUTE писем
+в минуту. После пачки логи пишутся одним bulk_create, а счётчики и контрольная
+точка (checkpoint_key — ключ последнего обработанного получателя) — одним UPDATE.
+Пока потоки отправляют пачку, основной поток раз в HEARTBEAT_SECONDS обновляет
+heartbeat_at: при низком MAILING_RATE_PER_MINUTE пачка идёт дольше
+STALE_MINUTES, и без этого живую кампанию подхватил бы другой воркер.
+Прерванная кампания (упал воркер, перезапуск контейнера) продолжается с контрольной
+точки; повторно может уйти только последняя незавершённая пачка.
+"""
+import logging
+import os
+import smtplib
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MailingCampaign, MailingLog
+from .services import CompiledEmailTemplate, build_message, iter_recipients
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 2
+DEFAULT_POLL_INTERVAL_SECONDS = 5
+STALE_MINUTES = 10
+HEARTBEAT_SECONDS = 60
+ERROR_LOG_LINES = 50
+
+# Новый запуск кампании (в т.ч. повтор завершившейся с ошибками) начинается с нуля
+NEW_RUN_FIELDS = {
+    'checkpoint_key': 0,
+    'total_sent': 0,
+    'total_failed': 0,
+    'error_log': '',
+    'started_at': None,
+    'finished_at': None,
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_async_mailing_enabled() -> bool:
+    return bool(_setting('MAILING_ASYNC', True))
+
+
+def enqueue_campaign(campaign: MailingCampaign) -> bool:
+    """Ставит кампанию в очередь фоновой отправки. False — уже отправлена или отправляется."""
+    updated = MailingCampaign.objects.filter(pk=campaign.pk).exclude(
+        status__in=('queued', 'sending', 'done'),
+    ).update(status='queued', worker='', updated_at=timezone.now(), **NEW_RUN_FIELDS)
+
+    if updated:
+        campaign.refresh_from_db()
+    return bool(updated)
+
+
+class RateLimiter:
+    """Равномерно распределяет отправку: не больше rate_per_minute писем в минуту на все потоки."""
+
+    def __init__(self, rate_per_minute: int):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _send_group(compiled: CompiledEmailTemplate, recipients: list, sender_email: str, limiter: RateLimiter) -> list:
+    """Отправляет группу писем через одно SMTP-соединение. Возвращает [(получатель, ошибка | None)]."""
+    results = []
+    connection = get_connection(fail_silently=False)
+
+    try:
+        for recipient in recipients:
+            limiter.wait()
+            error = None
+            for _ in range(2):
+                try:
+                    connection.open()
+                    build_message(compiled, recipient, sender_email, connection=connection).send(fail_silently=False)
+                    error = None
+                    break
+                except smtplib.SMTPServerDisconnected as exc:
+                    # Сервер закрыл соединение (таймаут простоя) — переоткрываем и пробуем ещё раз
+                    error = str(exc)
+                    connection.close()
+                except Exception as exc:
+                    error = str(exc)
+                    break
+            results.append((recipient, error))
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    return results
+
+
+def _split(items: list, parts: int) -> list:
+    parts = max(1, min(parts, len(items)))
+    return [items[index::parts] for index in range(parts)]
+
+
+def _append_errors(campaign_id: int, errors: list) -> None:
+    if not errors:
+        return
+
+    current = MailingCampaign.objects.filter(pk=campaign_id).values_list('error_log', flat=True).first() or ''
+    lines = [line for line in current.splitlines() if line]
+    if len(lines) >= ERROR_LOG_LINES:
+        return
+
+    lines.extend(errors[:ERROR_LOG_LINES - len(lines)])
+    MailingCampaign.objects.filter(pk=campaign_id).update(error_log='\n'.join(lines))
+
+
+def _record_batch(campaign: MailingCampaign, results: list, checkpoint_key: int) -> tuple[int, int]:
+    logs = []
+    errors = []
+    sent = failed = 0
+
+    for recipient, error in results:
+        logs.append(MailingLog(
+            campaign=campaign,
+            email=recipient['email'],
+            recipient_name=recipient.get('first_name', ''),
+            is_success=error is None,
+            error_msg=error or '',
+        ))
+        if error is None:
+            sent += 1
+        else:
+            failed += 1
+            errors.append(f'{recipient["email"]}: {error}')
+
+    with transaction.atomic():
+        MailingLog.objects.bulk_create(logs)
+        MailingCampaign.objects.filter(pk=campaign.pk).update(
+            total_sent=F('total_sent') + sent,
+            total_failed=F('total_failed') + failed,
+            checkpoint_key=checkpoint_key,
+            heartbeat_at=timezone.now(),
+        )
+        _append_errors(campaign.pk, errors)
+
+    return sent, failed
+
+
+def _touch_heartbeat(campaign_id: int) -> None:
+    MailingCampaign.objects.filter(pk=campaign_id).update(heartbeat_at=timezone.now())
+
+
+def run_campaign(campaign: MailingCampaign, worker_name: str = '') -> MailingCampaign:
+    """Отправляет кампанию с контрольной точки до конца."""
+    batch_size = max(1, int(_setting('MAILING_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+    concurrency = max(1, int(_setting('MAILING_CONCURRENCY', DEFAULT_CONCURRENCY)))
+    limiter = RateLimiter(int(_setting('MAILING_RATE_PER_MINUTE', 0) or 0))
+
+    now = timezone.now()
+    updates = {'status': 'sending', 'worker': worker_name, 'heartbeat_at': now}
+    if campaign.status not in ('queued', 'sending'):
+        updates.update(NEW_RUN_FIELDS)
+    if not updates.get('started_at', campaign.started_at):
+        updates['started_at'] = now
+    MailingCampaign.objects.filter(pk=campaign.pk).update(**updates)
+    campaign.refresh_from_db()
+
+    # Шаблон разбирается один раз на кампанию, получатели читаются из БД потоком
+    compiled = CompiledEmailTemplate(campaign.template)
+    sender_email = settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
+    recipients = iter_recipients(campaign, after_key=campaign.checkpoint_key)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='mailing-send') as executor:
+        while True:
+            batch = list(islice(recipients, batch_size))
+            if not batch:
+                break
+
+            futures = [
+                executor.submit(_send_group, compiled, group, sender_email, limiter)
+                for group in _split(batch, concurrency)
+            ]
+            while wait(futures, timeout=HEARTBEAT_SECONDS).not_done:
+                _touch_heartbeat(campaign.pk)
+
+            results = []
+            for future in futures:
+                results.extend(future.result())
+
+            _record_batch(campaign, results, checkpoint_key=batch[-1]['key'])
+
+    campaign.refresh_from_db()
+    campaign.status = 'done' if campaign.total_failed == 0 else 'error'
+    campaign.finished_at = timezone.now()
+    campaign.worker = ''
+    campaign.save(update_fields=['status', 'finished_at', 'worker', 'updated_at'])
+    return campaign
+
+
+def claim_campaign(worker_name: str):
+    """Берёт кампанию из очереди или зависшую в sending (воркер не подавал признаков жизни)."""
+    stale_border = timezone.now() - timedelta(minutes=STALE_MINUTES)
+
+    with transaction.atomic():
+        campaign = (
+            MailingCampaign.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='sending', heartbeat_at__lt=stale_border))
+            .order_by('created_at')
+            .first()
+        )
+        if campaign is None:
+            return None
+
+        MailingCampaign.objects.filter(pk=campaign.pk).update(
+            status='sending',
+            worker=worker_name,
+            heartbeat_at=timezone.now(),
+        )
+
+    return MailingCampaign.objects.select_related('template').get(pk=campaign.pk)
+
+
+def run_worker(poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS, once: bool = False, stop_event=None) -> int:
+    """Цикл воркера рассылок. Возвращает количество обработанных кампаний."""
+    stop_event = stop_event or threading.Event()
+    worker_name = f'{socket.gethostname()}:{os.getpid()}'
+    processed = 0
+
+    while not stop_event.is_set():
+        close_old_connections()
+        campaign = claim_campaign(worker_name)
+
+        if campaign is None:
+            if once:
+                break
+            stop_event.wait(poll_interval)
+            continue
+
+        try:
+            run_campaign(campaign, worker_name=worker_name)
+        except Exception as exc:
+            logger.exception('Mailing campaign %s failed', campaign.pk)
+            # Кампания остаётся в sending: после STALE_MINUTES её подхватит воркер с контрольной точки
+            MailingCampaign.objects.filter(pk=campaign.pk).update(worker='')
+            _append_errors(campaign.pk, [f'Воркер: {exc}'])
+        processed += 1
+
+    close_old_connections()
+    return processed
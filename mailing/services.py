@@ -1,48 +1,81 @@
 # mailing/services.py
 import logging
+import re
 from django.core.mail import EmailMultiAlternatives
-from django.utils import timezone
 from django.conf import settings
 
 from clients.models import Client
 from users.models import User
-from .models import MailingCampaign, MailingLog
+from .models import MailingCampaign
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_VARIABLES = ('first_name', 'last_name', 'email', 'office')
+_VARIABLE_RE = re.compile(r'\{\{(' + '|'.join(TEMPLATE_VARIABLES) + r')\}\}')
+
+RECIPIENT_CHUNK_SIZE = 2000
+
+
+class CompiledText:
+    """
+    Текст шаблона, разобранный один раз на кампанию: литералы и имена переменных
+    вперемешку. Подстановка — один ''.join вместо цепочки str.replace.
+    """
+
+    def __init__(self, template_str: str):
+        self.parts = _VARIABLE_RE.split(template_str or '')
+        self.is_static = len(self.parts) == 1
+
+    def render(self, context: dict) -> str:
+        if self.is_static:
+            return self.parts[0]
+
+        parts = self.parts[:]
+        for index in range(1, len(parts), 2):
+            parts[index] = str(context.get(parts[index]) or '')
+        return ''.join(parts)
+
+
+class CompiledEmailTemplate:
+    def __init__(self, tpl):
+        self.subject = CompiledText(tpl.subject)
+        self.body_html = CompiledText(tpl.body_html)
+        self.body_text = CompiledText(tpl.body_text) if tpl.body_text else None
+
+
 def _render(template_str: str, context: dict) -> str:
-    result = template_str
-    for key, value in context.items():
-        result = result.replace('{{' + key + '}}', str(value or ''))
-    return result
+    return CompiledText(template_str).render(context)
+
+
+def _recipient_rows(qs, after_key: int, fields: tuple):
+    """Построчно из БД: серверный курсор/чанки по RECIPIENT_CHUNK_SIZE, без загрузки всей базы в память."""
+    return qs.filter(pk__gt=after_key).exclude(email='').order_by('pk').values('pk', *fields).iterator(
+        chunk_size=RECIPIENT_CHUNK_SIZE,
+    )
+
+
+def iter_recipients(campaign: MailingCampaign, after_key: int = 0):
+    """
+    Получатели кампании в стабильном порядке (генератор). key — id клиента/сотрудника
+    или номер строки для произвольных email; фоновая отправка продолжает с key > after_key.
+    """
+    if campaign.recipient_type in ('all_clients', 'specific_clients'):
+        qs = Client.objects.all() if campaign.recipient_type == 'all_clients' else campaign.specific_clients.all()
+        for row in _recipient_rows(qs.filter(email__isnull=False), after_key, ('email', 'full_name')):
+            yield {'key': row['pk'], 'email': row['email'], 'first_name': row['full_name'], 'last_name': '', 'office': ''}
+
+    elif campaign.recipient_type in ('all_staff', 'specific_staff'):
+        qs = User.objects.all() if campaign.recipient_type == 'all_staff' else campaign.specific_staff.all()
+        for row in _recipient_rows(qs.filter(is_active=True), after_key, ('email', 'first_name', 'last_name')):
+            yield {'key': row['pk'], 'email': row['email'], 'first_name': row['first_name'], 'last_name': row['last_name'], 'office': ''}
 
-def _get_recipients(campaign: MailingCampaign) -> list[dict]:
-    recipients = []
-    
-    if campaign.recipient_type == 'all_clients':
-        qs = Client.objects.filter(email__isnull=False).exclude(email='')
-        for c in qs: recipients.append({'email': c.email, 'first_name': c.full_name, 'last_name': '', 'office': ''})
-            
-    elif campaign.recipient_type == 'all_staff':
-        qs = User.objects.filter(is_active=True).exclude(email='')
-        for u in qs: recipients.append({'email': u.email, 'first_name': u.first_name, 'last_name': u.last_name, 'office': ''})
-            
-    elif campaign.recipient_type == 'specific_clients':
-        qs = campaign.specific_clients.filter(email__isnull=False).exclude(email='')
-        for c in qs: recipients.append({'email': c.email, 'first_name': c.full_name, 'last_name': '', 'office': ''})
-            
-    elif campaign.recipient_type == 'specific_staff':
-        qs = campaign.specific_staff.filter(is_active=True).exclude(email='')
-        for u in qs: recipients.append({'email': u.email, 'first_name': u.first_name, 'last_name': u.last_name, 'office': ''})
-            
     elif campaign.recipient_type == 'custom_emails':
         raw = campaign.custom_emails.replace(',', '\n')
-        for line in raw.splitlines():
+        for line_no, line in enumerate(raw.splitlines(), start=1):
             email = line.strip()
-            if '@' in email:
-                recipients.append({'email': email, 'first_name': 'Пользователь', 'last_name': '', 'office': ''})
-                
-    return recipients
+            if '@' in email and line_no > after_key:
+                yield {'key': line_no, 'email': email, 'first_name': 'Пользователь', 'last_name': '', 'office': ''}
+
 
 def send_test_email(campaign: MailingCampaign, target_email: str):
     """Отправляет одно тестовое письмо админу"""
@@ -61,41 +94,19 @@ def send_test_email(campaign: MailingCampaign, target_email: str):
         msg.attach_alternative(body_html, 'text/html')
     msg.send(fail_silently=False)
 
-def send_campaign(campaign: MailingCampaign) -> None:
-    campaign.status = 'sending'
-    campaign.started_at = timezone.now()
-    campaign.save(update_fields=['status', 'started_at'])
+def build_message(compiled: CompiledEmailTemplate, recipient: dict, sender_email: str, connection=None) -> EmailMultiAlternatives:
+    ctx = {'first_name': recipient.get('first_name', ''), 'last_name': recipient.get('last_name', ''), 'email': recipient['email'], 'office': recipient.get('office', '')}
+    subject = compiled.subject.render(ctx)
+    body_html = compiled.body_html.render(ctx)
+    body_text = compiled.body_text.render(ctx) if compiled.body_text else ''
 
-    recipients = _get_recipients(campaign)
-    tpl = campaign.template
-    sent, failed = 0, 0
-    errors = []
-    
-    sender_email = settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
+    msg = EmailMultiAlternatives(subject=subject, body=body_text, from_email=sender_email, to=[recipient['email']], connection=connection)
+    if body_html:
+        msg.attach_alternative(body_html, 'text/html')
+    return msg
+
+def send_campaign(campaign: MailingCampaign) -> None:
+    """Отправка в текущем потоке (с продолжением с контрольной точки)."""
+    from .runner import run_campaign
 
-    for r in recipients:
-        ctx = {'first_name': r.get('first_name', ''), 'last_name': r.get('last_name', ''), 'email': r['email'], 'office': r.get('office', '')}
-        subject = _render(tpl.subject, ctx)
-        body_html = _render(tpl.body_html, ctx)
-        body_text = _render(tpl.body_text, ctx) if tpl.body_text else ''
-
-        try:
-            msg = EmailMultiAlternatives(subject=subject, body=body_text, from_email=sender_email, to=[r['email']])
-            if body_html:
-                msg.attach_alternative(body_html, 'text/html')
-            msg.send(fail_silently=False)
-
-            MailingLog.objects.create(campaign=campaign, email=r['email'], recipient_name=r.get('first_name',''), is_success=True)
-            sent += 1
-        except Exception as e:
-            err_msg = str(e)
-            MailingLog.objects.create(campaign=campaign, email=r['email'], recipient_name=r.get('first_name',''), is_success=False, error_msg=err_msg)
-            failed += 1
-            errors.append(f'{r["email"]}: {err_msg}')
-
-    campaign.status = 'done' if failed == 0 else 'error'
-    campaign.total_sent = sent
-    campaign.total_failed = failed
-    campaign.finished_at = timezone.now()
-    campaign.error_log = '\n'.join(errors[:50])
-    campaign.save(update_fields=['status', 'total_sent', 'total_failed', 'finished_at', 'error_log'])
\ No newline at end of file
+    run_campaign(campaign)
@@ -1,3 +1,45 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from . import runner
+from .models import EmailTemplate, MailingCampaign, MailingLog
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_HOST_USER='noreply@example.com',
+    MAILING_BATCH_SIZE=10,
+    MAILING_CONCURRENCY=1,
+)
+class RunCampaignTests(TestCase):
+    def setUp(self):
+        template = EmailTemplate.objects.create(title='Шаблон', subject='Привет', body_html='<p>Текст</p>')
+        self.campaign = MailingCampaign.objects.create(
+            title='Кампания',
+            template=template,
+            recipient_type='custom_emails',
+            custom_emails='a@example.com, b@example.com\nc@example.com, d@example.com',
+        )
+
+    def test_sends_all_recipients(self):
+        self.assertTrue(runner.enqueue_campaign(self.campaign))
+
+        campaign = runner.run_campaign(runner.claim_campaign('test'))
+
+        self.assertEqual((campaign.status, campaign.total_sent, campaign.total_failed), ('done', 4, 0))
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(MailingLog.objects.filter(campaign=campaign, is_success=True).count(), 4)
+
+    @override_settings(MAILING_RATE_PER_MINUTE=600)
+    def test_heartbeat_is_refreshed_during_slow_batch(self):
+        runner.enqueue_campaign(self.campaign)
+
+        # 4 письма по 0,1 с в одной пачке дольше интервала heartbeat
+        with mock.patch.object(runner, 'HEARTBEAT_SECONDS', 0.05), \
+                mock.patch.object(runner, '_touch_heartbeat', wraps=runner._touch_heartbeat) as touch:
+            runner.run_campaign(runner.claim_campaign('test'))
+
+        self.assertGreaterEqual(touch.call_count, 2)
+        touch.assert_called_with(self.campaign.pk)
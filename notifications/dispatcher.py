@@ -0,0 +1,180 @@
+# notifications/dispatcher.py
+"""
+Фоновая отправка push-уведомлений.
+
+dispatch_push кладёт задание в очередь процесса и сразу возвращается — запрос
+(например, отправка заявки с сайта) не ждёт сетевых запросов к FCM. Поток-диспетчер
+разбирает очередь: собирает токены аудитории и отдаёт их движку доставки
+(notifications.push_engine), а токены с временными ошибками FCM повторяет
+с экспоненциальной задержкой.
+
+Очередь живёт в памяти процесса (в каждом воркере gunicorn — своя); при
+остановке процесса оставшиеся задания досылаются в пределах PUSH_DISPATCH_SHUTDOWN_TIMEOUT.
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE_ADMINS = 'admins'
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_RETRY_BASE_SECONDS = 2.0
+DEFAULT_SHUTDOWN_TIMEOUT = 5.0
+
+
+@dataclass
+class PushJob:
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    tokens: list | None = None
+    audience: str | None = None
+    attempt: int = 0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def resolve_tokens(job: PushJob) -> list:
+    from .firebase import get_admin_push_tokens
+
+    if job.tokens is not None:
+        return list(job.tokens)
+    if job.audience == AUDIENCE_ADMINS:
+        return get_admin_push_tokens()
+
+    logger.warning('Unknown push audience: %s', job.audience)
+    return []
+
+
+def process_job(job: PushJob):
+    """Одна попытка доставки. Возвращает задание для повтора или None."""
+    from .push_engine import deliver
+
+    tokens = resolve_tokens(job)
+    if not tokens:
+        return None
+
+    result = deliver(tokens, job.title, job.body, job.data)
+    if not result.retry_tokens:
+        return None
+
+    if job.attempt + 1 >= int(_setting('PUSH_DISPATCH_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)):
+        logger.warning('Push "%s" dropped for %s tokens after %s attempts', job.title, len(result.retry_tokens), job.attempt + 1)
+        return None
+
+    return PushJob(
+        title=job.title,
+        body=job.body,
+        data=job.data,
+        tokens=result.retry_tokens,
+        attempt=job.attempt + 1,
+    )
+
+
+class PushDispatcher:
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=int(_setting('PUSH_DISPATCH_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)))
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def submit(self, job: PushJob) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            logger.error('Push dispatch queue is full, push "%s" dropped', job.title)
+            return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='push-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _schedule_retry(self, job: PushJob):
+        base = float(_setting('PUSH_DISPATCH_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS))
+        due = time.monotonic() + base * (2 ** (job.attempt - 1))
+        heapq.heappush(self._delayed, (due, next(self._sequence), job))
+
+    def _next_job(self):
+        now = time.monotonic()
+        if self._delayed and self._delayed[0][0] <= now:
+            return heapq.heappop(self._delayed)[2]
+
+        timeout = self._delayed[0][0] - now if self._delayed else 1.0
+        try:
+            return self._queue.get(timeout=min(timeout, 1.0))
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        while True:
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+            job = self._next_job()
+            if job is None:
+                continue
+
+            close_old_connections()
+            try:
+                retry = process_job(job)
+            except Exception:
+                logger.exception('Push dispatch failed for "%s"', job.title)
+                retry = None
+            finally:
+                close_old_connections()
+
+            if retry is not None and not self._stopping.is_set():
+                self._schedule_retry(retry)
+
+    def shutdown(self, timeout: float | None = None):
+        """Дожидается отправки уже поставленных заданий (без отложенных повторов)."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout if timeout is not None else _setting('PUSH_DISPATCH_SHUTDOWN_TIMEOUT', DEFAULT_SHUTDOWN_TIMEOUT))
+
+
+_dispatcher = PushDispatcher()
+atexit.register(_dispatcher.shutdown)
+
+
+def dispatch_push(title: str, body: str, data: dict | None = None, tokens=None, audience: str | None = None) -> bool:
+    """
+    Ставит push в фоновую отправку. tokens — явный список токенов, audience —
+    получатели, которых диспетчер выберет сам (AUDIENCE_ADMINS).
+    """
+    job = PushJob(
+        title=title,
+        body=body,
+        data=dict(data or {}),
+        tokens=list(tokens) if tokens is not None else None,
+        audience=audience,
+    )
+
+    if not _setting('PUSH_DISPATCH_ASYNC', True):
+        retry = process_job(job)
+        return retry is None
+
+    return _dispatcher.submit(job)
@@ -0,0 +1,288 @@
+# notifications/push_engine.py
+"""
+Единый движок доставки push-уведомлений.
+
+Токены устройств хранятся в двух таблицах: gamification.DeviceToken и
+notifications.FCMDevice. Движок собирает токены из обеих без повторов, режет их
+на пачки по лимиту FCM multicast (500), отправляет пачки параллельно из пула
+потоков, отключает недействительные токены одним UPDATE на таблицу и возвращает
+статистику доставки.
+
+Отправка идёт через транспорт (PUSH_TRANSPORT): по умолчанию FirebaseTransport,
+для разработки и проверок — LocalTransport, который ничего не шлёт в сеть и
+отвечает как FCM (токены с префиксом из LOCAL_DEAD_PREFIX — «удалённые устройства»).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# FCM принимает в multicast не больше 500 токенов
+MULTICAST_LIMIT = 500
+DEFAULT_CONCURRENCY = 4
+DEACTIVATE_CHUNK_SIZE = 1000
+
+# Токен больше недействителен — устройство отключаем
+DEAD_TOKEN_ERRORS = ('UnregisteredError', 'SenderIdMismatchError')
+# Ошибка в самом сообщении (payload, размер data и т.п.), а не в токене —
+# токен не трогаем, только пишем в лог
+INVALID_MESSAGE_ERRORS = ('InvalidArgumentError',)
+# Временная ошибка FCM — отправку на токен можно повторить
+RETRYABLE_ERRORS = (
+    'QuotaExceededError',
+    'UnavailableError',
+    'InternalError',
+    'DeadlineExceededError',
+    'ResourceExhaustedError',
+    'UnknownError',
+)
+
+
+@dataclass
+class DeliveryResult:
+    token_count: int = 0
+    sent: int = 0
+    failed: int = 0
+    chunks: int = 0
+    dead_tokens: list = field(default_factory=list)
+    retry_tokens: list = field(default_factory=list)
+    deactivated: int = 0
+    duration_ms: int = 0
+    detail: str = ''
+
+    def as_dict(self) -> dict:
+        return {
+            'token_count': self.token_count,
+            'success_count': self.sent,
+            'failure_count': self.failed,
+            'chunks': self.chunks,
+            'invalid_count': len(self.dead_tokens),
+            'retry_count': len(self.retry_tokens),
+            'deactivated_count': self.deactivated,
+            'duration_ms': self.duration_ms,
+            'detail': self.detail,
+        }
+
+
+class TransportUnavailable(Exception):
+    pass
+
+
+class FirebaseTransport:
+    """Отправка через firebase_admin.messaging.send_each_for_multicast."""
+
+    _lock = threading.Lock()
+
+    def _get_app(self):
+        import firebase_admin
+        from firebase_admin import credentials
+
+        with self._lock:
+            try:
+                return firebase_admin.get_app()
+            except ValueError:
+                pass
+
+            file_path = (
+                getattr(settings, 'FCM_CREDENTIALS_FILE', '')
+                or os.environ.get('FCM_CREDENTIALS_FILE')
+                or os.environ.get('FIREBASE_CREDENTIALS_PATH')
+                or os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
+            )
+            json_blob = getattr(settings, 'FCM_CREDENTIALS_JSON', '') or os.environ.get('FCM_CREDENTIALS_JSON', '')
+
+            if file_path:
+                return firebase_admin.initialize_app(credentials.Certificate(file_path))
+            if json_blob:
+                return firebase_admin.initialize_app(credentials.Certificate(json.loads(json_blob)))
+
+        raise TransportUnavailable('Firebase не настроен')
+
+    def prepare(self):
+        try:
+            self._get_app()
+        except TransportUnavailable:
+            raise
+        except Exception as exc:
+            logger.exception('Firebase initialization failed.')
+            raise TransportUnavailable(str(exc)) from exc
+
+    def send_chunk(self, tokens: list, title: str, body: str, data: dict) -> list:
+        """[(успех, имя класса ошибки или None)] в порядке tokens."""
+        from firebase_admin import messaging
+
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        response = messaging.send_each_for_multicast(message, app=self._get_app())
+        return [
+            (item.success, type(item.exception).__name__ if item.exception else None)
+            for item in response.responses
+        ]
+
+
+class LocalTransport:
+    """Локальная замена FCM: ничего не отправляет, запоминает отправленные пачки."""
+
+    LOCAL_DEAD_PREFIX = 'dead-'
+    LOCAL_RETRY_PREFIX = 'retry-'
+    LOCAL_INVALID_PREFIX = 'invalid-'
+
+    sent_chunks = []
+
+    def prepare(self):
+        return None
+
+    def send_chunk(self, tokens: list, title: str, body: str, data: dict) -> list:
+        self.sent_chunks.append({'tokens': list(tokens), 'title': title, 'body': body, 'data': dict(data)})
+
+        results = []
+        for token in tokens:
+            if token.startswith(self.LOCAL_DEAD_PREFIX):
+                results.append((False, 'UnregisteredError'))
+            elif token.startswith(self.LOCAL_RETRY_PREFIX):
+                results.append((False, 'UnavailableError'))
+            elif token.startswith(self.LOCAL_INVALID_PREFIX):
+                results.append((False, 'InvalidArgumentError'))
+            else:
+                results.append((True, None))
+        return results
+
+
+def get_transport():
+    path = getattr(settings, 'PUSH_TRANSPORT', '') or 'notifications.push_engine.FirebaseTransport'
+    return import_string(path)()
+
+
+def clean_tokens(tokens: Iterable[str]) -> list:
+    return list(dict.fromkeys(str(token).strip() for token in tokens if str(token or '').strip()))
+
+
+def collect_tokens(user_ids: Iterable[int] | None = None) -> list:
+    """Активные токены из DeviceToken и FCMDevice без повторов; user_ids=None — всех пользователей."""
+    from gamification.push_models import DeviceToken
+
+    from .models import FCMDevice
+
+    tokens = []
+    for model in (DeviceToken, FCMDevice):
+        qs = model.objects.filter(is_active=True)
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=list(user_ids))
+        tokens.extend(qs.values_list('token', flat=True))
+
+    return clean_tokens(tokens)
+
+
+def collect_token_user_ids(user_ids: Iterable[int] | None = None) -> list:
+    """Пользователи, у которых есть хотя бы один активный токен."""
+    from gamification.push_models import DeviceToken
+
+    from .models import FCMDevice
+
+    found = set()
+    for model in (DeviceToken, FCMDevice):
+        qs = model.objects.filter(is_active=True)
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=list(user_ids))
+        found.update(qs.values_list('user_id', flat=True).distinct())
+
+    return sorted(found)
+
+
+def deactivate_tokens(tokens: Iterable[str]) -> int:
+    from gamification.push_models import DeviceToken
+
+    from .models import FCMDevice
+
+    tokens = clean_tokens(tokens)
+    deactivated = 0
+    for start in range(0, len(tokens), DEACTIVATE_CHUNK_SIZE):
+        chunk = tokens[start:start + DEACTIVATE_CHUNK_SIZE]
+        for model in (DeviceToken, FCMDevice):
+            deactivated += model.objects.filter(token__in=chunk, is_active=True).update(is_active=False)
+    return deactivated
+
+
+def _concurrency() -> int:
+    return max(1, int(getattr(settings, 'PUSH_SEND_CONCURRENCY', DEFAULT_CONCURRENCY) or DEFAULT_CONCURRENCY))
+
+
+def deliver(tokens: Iterable[str], title: str, body: str, data: dict | None = None, transport=None) -> DeliveryResult:
+    """Отправляет push на токены и отключает недействительные."""
+    started = time.monotonic()
+    tokens = clean_tokens(tokens)
+    result = DeliveryResult(token_count=len(tokens))
+    if not tokens:
+        return result
+
+    transport = transport or get_transport()
+    try:
+        transport.prepare()
+    except TransportUnavailable as exc:
+        result.failed = len(tokens)
+        result.detail = str(exc)
+        return result
+
+    payload = {str(k): str(v) for k, v in (data or {}).items()}
+    chunks = [tokens[start:start + MULTICAST_LIMIT] for start in range(0, len(tokens), MULTICAST_LIMIT)]
+    result.chunks = len(chunks)
+
+    def _send(chunk):
+        try:
+            return chunk, transport.send_chunk(chunk, title, body, payload)
+        except Exception:
+            logger.exception('Push chunk of %s tokens failed.', len(chunk))
+            return chunk, None
+
+    workers = min(_concurrency(), len(chunks))
+    if workers == 1:
+        responses = [_send(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='push-send') as executor:
+            responses = list(executor.map(_send, chunks))
+
+    invalid_count = 0
+    for chunk, outcome in responses:
+        if outcome is None:
+            # Пачка не ушла целиком (сеть, 5xx) — все её токены можно повторить
+            result.failed += len(chunk)
+            result.retry_tokens.extend(chunk)
+            continue
+
+        for token, (success, error_name) in zip(chunk, outcome):
+            if success:
+                result.sent += 1
+                continue
+
+            result.failed += 1
+            if error_name in DEAD_TOKEN_ERRORS:
+                result.dead_tokens.append(token)
+            elif error_name in RETRYABLE_ERRORS:
+                result.retry_tokens.append(token)
+            elif error_name in INVALID_MESSAGE_ERRORS:
+                invalid_count += 1
+
+    if invalid_count:
+        logger.warning(
+            'FCM rejected push "%s" as invalid argument for %s tokens; tokens kept active.',
+            title,
+            invalid_count,
+        )
+
+    if result.dead_tokens:
+        result.deactivated = deactivate_tokens(result.dead_tokens)
+
+    result.duration_ms = int((time.monotonic() - started) * 1000)
+    return result
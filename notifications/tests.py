@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+
+from gamification.push_models import DeviceToken
+from users.models import User
+
+from .models import FCMDevice
+from .push_engine import LocalTransport, collect_tokens, deliver
+
+
+@override_settings(PUSH_TRANSPORT='notifications.push_engine.LocalTransport')
+class DeadTokenTests(TestCase):
+    def setUp(self):
+        LocalTransport.sent_chunks.clear()
+        self.user = User.objects.create_user(email='push@example.com', password='x')
+
+    def test_unregistered_tokens_are_deactivated_in_both_tables(self):
+        DeviceToken.objects.create(user=self.user, token='alive-1')
+        DeviceToken.objects.create(user=self.user, token='dead-1')
+        FCMDevice.objects.create(user=self.user, token='dead-2')
+
+        result = deliver(collect_tokens(), 'Заголовок', 'Текст')
+
+        self.assertEqual((result.sent, result.failed, result.deactivated), (1, 2, 2))
+        self.assertFalse(DeviceToken.objects.get(token='dead-1').is_active)
+        self.assertFalse(FCMDevice.objects.get(token='dead-2').is_active)
+        self.assertTrue(DeviceToken.objects.get(token='alive-1').is_active)
+
+    def test_invalid_argument_keeps_token_active(self):
+        DeviceToken.objects.create(user=self.user, token='invalid-1')
+
+        with self.assertLogs('notifications.push_engine', level='WARNING'):
+            result = deliver(collect_tokens(), 'Заголовок', 'Текст')
+
+        self.assertEqual((result.failed, result.deactivated), (1, 0))
+        self.assertEqual(result.dead_tokens, [])
+        self.assertTrue(DeviceToken.objects.get(token='invalid-1').is_active)
+
+    def test_retryable_errors_are_not_deactivated(self):
+        DeviceToken.objects.create(user=self.user, token='retry-1')
+
+        result = deliver(collect_tokens(), 'Заголовок', 'Текст')
+
+        self.assertEqual(result.retry_tokens, ['retry-1'])
+        self.assertTrue(DeviceToken.objects.get(token='retry-1').is_active)
@@ -0,0 +1,116 @@
+# search/documents.py
+"""
+Тексты поисковых документов.
+
+Для каждого типа — поля, по которым ищет ?search= соответствующего списка.
+Тексты собираются пачкой: несколько запросов values_list на весь набор id,
+без загрузки моделей и N+1 по связям.
+"""
+import re
+from collections import defaultdict
+
+from django.apps import apps
+
+from catalog.search import normalize_text
+
+NON_DIGITS_RE = re.compile(r'\D+')
+
+
+def phone_digits(value) -> str:
+    """Цифры телефона — чтобы «99365…» находил «+993 (65) …»."""
+    return NON_DIGITS_RE.sub('', value or '')
+
+
+def join_text(*parts) -> str:
+    return normalize_text(' '.join(str(part) for part in parts if part))
+
+
+def lead_texts(ids):
+    Lead = apps.get_model('leads', 'Lead')
+    # submitter_user_agent не индексируется: у всех заявок он почти одинаковый
+    # («Mozilla/5.0 …») и только засоряет выдачу
+    rows = Lead.objects.filter(pk__in=ids).values_list(
+        'pk',
+        'full_name',
+        'student_name',
+        'parent_name',
+        'phone',
+        'email',
+        'country',
+        'departure_city',
+        'arrival_city',
+        'submitter_ip',
+        'submitter_origin',
+        'submitter_host',
+    )
+    return {
+        pk: join_text(*fields, phone_digits(fields[3]))
+        for pk, *fields in rows
+    }
+
+
+def client_texts(ids):
+    Client = apps.get_model('clients', 'Client')
+    rows = Client.objects.filter(pk__in=ids).values_list(
+        'pk',
+        'full_name',
+        'phone',
+        'email',
+        'city',
+        'citizenship',
+        'passport_inter_num',
+        'passport_local_num',
+        'partner_name',
+        'relative__full_name',
+        'relative__phone',
+    )
+    return {
+        pk: join_text(*fields, phone_digits(fields[1]), phone_digits(fields[9]))
+        for pk, *fields in rows
+    }
+
+
+def project_texts(ids):
+    Project = apps.get_model('tasks', 'Project')
+    ProjectSection = apps.get_model('tasks', 'ProjectSection')
+    ProjectSectionPost = apps.get_model('tasks', 'ProjectSectionPost')
+
+    parts = defaultdict(list)
+    for pk, *fields in Project.objects.filter(pk__in=ids).values_list(
+        'pk', 'title', 'description', 'city', 'office__city',
+    ):
+        parts[pk].extend(fields)
+
+    for through in (Project.participants.through, Project.responsible_users.through):
+        for project_id, first_name, last_name in through.objects.filter(project_id__in=list(parts)).values_list(
+            'project_id', 'user__first_name', 'user__last_name',
+        ):
+            parts[project_id].extend((first_name, last_name))
+
+    for project_id, title, description in ProjectSection.objects.filter(project_id__in=list(parts)).values_list(
+        'project_id', 'title', 'description',
+    ):
+        parts[project_id].extend((title, description))
+
+    for project_id, title, body, copy_text in ProjectSectionPost.objects.filter(
+        section__project_id__in=list(parts),
+    ).values_list('section__project_id', 'title', 'body', 'copy_text'):
+        parts[project_id].extend((title, body, copy_text))
+
+    return {pk: join_text(*values) for pk, values in parts.items()}
+
+
+# Тип -> (модель, функция текстов)
+SEARCH_ENTITIES = {
+    'leads': ('leads.Lead', lead_texts),
+    'clients': ('clients.Client', client_texts),
+    'projects': ('tasks.Project', project_texts),
+}
+
+
+def entity_model(entity):
+    return apps.get_model(SEARCH_ENTITIES[entity][0])
+
+
+def build_texts(entity, ids) -> dict:
+    return SEARCH_ENTITIES[entity][1](list(ids))
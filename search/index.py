@@ -0,0 +1,194 @@
+# search/index.py
+"""
+Поисковый индекс заявок, клиентов и проектов.
+
+Документы (SearchDocument) обновляются сигналами (search/signals.py): id
+изменённых записей копятся до коммита транзакции и переиндексируются пачкой —
+тексты собираются несколькими запросами, документы пишутся одним upsert.
+
+Поиск (search_queryset) на PostgreSQL идёт по триграммному GIN-индексу:
+подстрока (LIKE '%…%') или похожие слова (оператор %> pg_trgm — опечатки),
+ранг — word_similarity, точное вхождение фразы всегда выше. На других СУБД
+(SQLite в разработке и тестах) документы типа ранжируются в Python тем же
+fuzzy-алгоритмом, что и поиск по каталогу.
+"""
+import logging
+import re
+from typing import Iterable
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Greatest
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils import timezone
+
+from catalog.search import normalize_text, score_similarity
+from students_life.deferred import CommitBatch
+
+from .documents import build_texts, entity_model, phone_digits
+from .models import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+REINDEX_BATCH_SIZE = 500
+# Порог fuzzy-оценки на SQLite — примерно как pg_trgm.word_similarity_threshold (0.6)
+FALLBACK_MIN_SCORE = 0.6
+MIN_PHONE_QUERY_DIGITS = 4
+LETTERS_RE = re.compile(r'[^\W\d_]', flags=re.UNICODE)
+
+
+# --- Индексация -----------------------------------------------------------------
+
+def reindex(entity: str, ids: Iterable) -> int:
+    """Пересобирает документы entity с указанными id (удалённые записи — удаляет)."""
+    ids = {int(pk) for pk in ids if pk is not None}
+    if not ids:
+        return 0
+
+    texts = build_texts(entity, ids)
+    missing = ids - set(texts)
+    if missing:
+        SearchDocument.objects.filter(entity=entity, object_id__in=missing).delete()
+
+    now = timezone.now()
+    SearchDocument.objects.bulk_create(
+        [
+            SearchDocument(entity=entity, object_id=pk, text=text, indexed_at=now)
+            for pk, text in texts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['entity', 'object_id'],
+        update_fields=['text', 'indexed_at'],
+    )
+    return len(texts)
+
+
+def rebuild(entity: str, missing_only: bool = False) -> int:
+    """
+    Полная переиндексация entity пачками по REINDEX_BATCH_SIZE.
+    missing_only — только записи без документа (быстро, если индекс актуален).
+    """
+    model = entity_model(entity)
+    indexed = SearchDocument.objects.filter(entity=entity).values('object_id')
+
+    queryset = model.objects.order_by('pk')
+    if missing_only:
+        queryset = queryset.exclude(pk__in=indexed)
+    else:
+        SearchDocument.objects.filter(entity=entity).exclude(
+            object_id__in=model.objects.values('pk'),
+        ).delete()
+
+    total = 0
+    batch = []
+    for pk in queryset.values_list('pk', flat=True).iterator(chunk_size=REINDEX_BATCH_SIZE):
+        batch.append(pk)
+        if len(batch) >= REINDEX_BATCH_SIZE:
+            total += reindex(entity, batch)
+            batch = []
+    if batch:
+        total += reindex(entity, batch)
+    return total
+
+
+def _flush_pending(items):
+    for entity, ids in items.items():
+        try:
+            reindex(entity, ids)
+        except (ProgrammingError, OperationalError):
+            logger.warning('Search index is unavailable, skipping update of %s', entity, exc_info=True)
+
+
+_batch = CommitBatch(_flush_pending)
+
+
+def schedule_reindex(entity: str, ids: Iterable) -> None:
+    """Откладывает переиндексацию записей entity до коммита транзакции."""
+    ids = {pk for pk in ids if pk is not None}
+    if not ids:
+        return
+
+    _batch.add(lambda items: items.setdefault(entity, set()).update(ids))
+
+
+# --- Поиск ------------------------------------------------------------------------
+
+def _phone_query(query: str) -> str:
+    """Цифры запроса, если он похож на номер телефона («+993 65 12…»)."""
+    if LETTERS_RE.search(query):
+        return ''
+    digits = phone_digits(query)
+    return digits if len(digits) >= MIN_PHONE_QUERY_DIGITS and digits != query else ''
+
+
+def _postgres_search(queryset, documents, query, digits):
+    matches = Q(text__contains=query) | Q(text__trigram_word_similar=query)
+    exact = Q(text__contains=query)
+    if digits:
+        matches |= Q(text__contains=digits)
+        exact |= Q(text__contains=digits)
+
+    matched = documents.filter(matches)
+    rank = (
+        matched
+        .filter(object_id=OuterRef('pk'))
+        .annotate(rank=Greatest(
+            Case(When(exact, then=Value(1.0)), default=Value(0.0), output_field=FloatField()),
+            TrigramWordSimilarity(query, 'text'),
+        ))
+        .values('rank')[:1]
+    )
+
+    return (
+        queryset
+        .filter(pk__in=matched.values('object_id'))
+        .annotate(search_rank=Subquery(rank, output_field=FloatField()))
+        .order_by('-search_rank', '-pk')
+    )
+
+
+def _fallback_search(queryset, documents, query, digits):
+    ranked = []
+    for object_id, text in documents.values_list('object_id', 'text'):
+        if query in text or (digits and digits in text):
+            score = 1.0
+        else:
+            score = score_similarity(query, text)
+        if score >= FALLBACK_MIN_SCORE:
+            ranked.append((score, object_id))
+
+    if not ranked:
+        # Та же аннотация, что и у непустой выдачи: вызывающий сортирует по search_rank
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+    return (
+        queryset
+        .filter(pk__in=[object_id for _, object_id in ranked])
+        .annotate(search_rank=Case(
+            *[When(pk=object_id, then=Value(score)) for score, object_id in ranked],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+        .order_by('-search_rank', '-pk')
+    )
+
+
+def search_queryset(queryset, entity: str, search: str):
+    """
+    queryset, отфильтрованный по ?search= и упорядоченный по релевантности
+    (аннотация search_rank). None — индекс entity ещё не построен
+    (manage.py rebuild_search_index), вызывающий ищет по-старому.
+    """
+    query = normalize_text(search)
+    if not query:
+        return queryset
+
+    documents = SearchDocument.objects.filter(entity=entity)
+    if not documents.exists():
+        return None
+
+    digits = _phone_query(query)
+    if connections[queryset.db].vendor == 'postgresql':
+        return _postgres_search(queryset, documents, query, digits)
+    return _fallback_search(queryset, documents, query, digits)
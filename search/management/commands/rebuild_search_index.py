@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from search.documents import SEARCH_ENTITIES
+from search.index import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс заявок, клиентов и проектов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entity',
+            choices=sorted(SEARCH_ENTITIES),
+            action='append',
+            help='Тип объектов (можно указать несколько раз); по умолчанию — все.',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Проиндексировать только записи без поискового документа.',
+        )
+
+    def handle(self, *args, **options):
+        for entity in options['entity'] or sorted(SEARCH_ENTITIES):
+            total = rebuild(entity, missing_only=options['missing'])
+            self.stdout.write(self.style.SUCCESS(f'Поисковый индекс {entity}: проиндексировано {total}.'))
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:30
+
+import django.utils.timezone
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN-индекс с gin_trgm_ops есть только в PostgreSQL; на SQLite поиск работает без него
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS search_document_text_trgm '
+        'ON search_searchdocument USING gin (text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS search_document_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=40, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('text', models.TextField(blank=True, default='', verbose_name='Нормализованный текст')),
+                ('indexed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Проиндексирован')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковый индекс',
+                'constraints': [models.UniqueConstraint(fields=('entity', 'object_id'), name='search_document_unique')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,24 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SearchDocument(models.Model):
+    """
+    Поисковый документ записи (заявки, клиента, проекта): нормализованный текст
+    всех полей, по которым ищет ?search= (см. search/documents.py). На PostgreSQL
+    по text построен триграммный GIN-индекс (миграция 0001).
+    """
+    entity = models.CharField('Тип объекта', max_length=40)
+    object_id = models.BigIntegerField('ID объекта')
+    text = models.TextField('Нормализованный текст', blank=True, default='')
+    indexed_at = models.DateTimeField('Проиндексирован', default=timezone.now)
+
+    def __str__(self):
+        return f'{self.entity}#{self.object_id}'
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(fields=['entity', 'object_id'], name='search_document_unique'),
+        ]
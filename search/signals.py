@@ -0,0 +1,86 @@
+# search/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from clients.models import Client, ClientRelative
+from leads.models import Lead
+from tasks.models import Project, ProjectSection, ProjectSectionPost
+from users.models import Office
+
+from .index import schedule_reindex
+
+User = get_user_model()
+
+USER_NAME_FIELDS = {'first_name', 'last_name'}
+
+
+def _reindex_self(entity):
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        schedule_reindex(entity, [instance.pk])
+    return handler
+
+
+def _reindex_parent(entity, parent_field):
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        schedule_reindex(entity, [getattr(instance, parent_field, None)])
+    return handler
+
+
+for _model, _entity in ((Lead, 'leads'), (Client, 'clients'), (Project, 'projects')):
+    _handler = _reindex_self(_entity)
+    post_save.connect(_handler, sender=_model, weak=False, dispatch_uid=f'search_save_{_entity}')
+    post_delete.connect(_handler, sender=_model, weak=False, dispatch_uid=f'search_delete_{_entity}')
+
+for _model, _entity, _field in (
+    (ClientRelative, 'clients', 'client_id'),
+    (ProjectSection, 'projects', 'project_id'),
+):
+    _handler = _reindex_parent(_entity, _field)
+    post_save.connect(_handler, sender=_model, weak=False, dispatch_uid=f'search_save_{_model._meta.label_lower}')
+    post_delete.connect(_handler, sender=_model, weak=False, dispatch_uid=f'search_delete_{_model._meta.label_lower}')
+
+
+@receiver(post_save, sender=ProjectSectionPost, dispatch_uid='search_save_tasks.projectsectionpost')
+@receiver(post_delete, sender=ProjectSectionPost, dispatch_uid='search_delete_tasks.projectsectionpost')
+def reindex_post_project(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    project_ids = ProjectSection.objects.filter(pk=instance.section_id).values_list('project_id', flat=True)
+    schedule_reindex('projects', project_ids)
+
+
+@receiver(m2m_changed, sender=Project.participants.through, dispatch_uid='search_m2m_project_participants')
+@receiver(m2m_changed, sender=Project.responsible_users.through, dispatch_uid='search_m2m_project_responsible')
+def reindex_project_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        schedule_reindex('projects', [instance.pk])
+    elif pk_set:
+        schedule_reindex('projects', pk_set)
+
+
+@receiver(post_save, sender=User, dispatch_uid='search_user_name_changed')
+def reindex_user_projects(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Имена участников входят в документ проекта; вход в систему (last_login) не трогаем
+    if raw or (update_fields is not None and not USER_NAME_FIELDS & set(update_fields)):
+        return
+    project_ids = set(
+        Project.participants.through.objects.filter(user_id=instance.pk).values_list('project_id', flat=True)
+    )
+    project_ids.update(
+        Project.responsible_users.through.objects.filter(user_id=instance.pk).values_list('project_id', flat=True)
+    )
+    schedule_reindex('projects', project_ids)
+
+
+@receiver(post_save, sender=Office, dispatch_uid='search_office_changed')
+def reindex_office_projects(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_reindex('projects', Project.objects.filter(office_id=instance.pk).values_list('pk', flat=True))
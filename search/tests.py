@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from leads.models import Lead
+from tasks.models import Project
+from users.models import User
+
+from .index import search_queryset
+from .models import SearchDocument
+
+
+class SearchQuerysetTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lead = Lead.objects.create(full_name='Аннагельды Бердыев', phone='+993 65 123456')
+            self.other = Lead.objects.create(full_name='Огулджан Мамедова', phone='+993 61 000000')
+
+    def _found(self, search):
+        return list(search_queryset(Lead.objects.all(), 'leads', search).values_list('pk', flat=True))
+
+    def test_typo_matches(self):
+        self.assertEqual(self._found('бердыив'), [self.lead.pk])
+
+    def test_phone_digits_match_formatted_number(self):
+        self.assertEqual(self._found('99365123'), [self.lead.pk])
+        self.assertEqual(self._found('+993 65 123'), [self.lead.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self._found('Ходжаев'), [])
+
+    def test_empty_index_falls_back(self):
+        SearchDocument.objects.all().delete()
+
+        self.assertIsNone(search_queryset(Lead.objects.all(), 'leads', 'бердыев'))
+
+
+class SearchSignalTests(TestCase):
+    def _text(self, lead):
+        return SearchDocument.objects.filter(entity='leads', object_id=lead.pk).values_list('text', flat=True).first()
+
+    def test_reindexed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            lead = Lead.objects.create(full_name='Аннагельды Бердыев', phone='+993 65 123456')
+            self.assertIsNone(self._text(lead))
+        self.assertTrue(callbacks)
+        self.assertIn('бердыев', self._text(lead))
+
+        lead.full_name = 'Аннагельды Ходжаев'
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.save()
+        self.assertIn('ходжаев', self._text(lead))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.delete()
+        self.assertFalse(SearchDocument.objects.filter(entity='leads').exists())
+
+    def test_rolled_back_change_is_not_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(full_name='Аннагельды Бердыев', phone='+993 65 123456')
+            try:
+                with transaction.atomic():
+                    lead.full_name = 'Отменённое имя'
+                    lead.save()
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+
+        self.assertIn('бердыев', self._text(lead))
+        self.assertNotIn('отменённое', self._text(lead))
+
+
+class ProjectSearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _titles(self, search):
+        response = self.api.get('/api/tasks/projects/', {'search': search})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.json()['results']]
+
+    def test_pinned_projects_first(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(title='Визы Турция', created_by=self.admin)
+            Project.objects.create(title='Архив виз Турции', created_by=self.admin, is_pinned=True)
+            Project.objects.create(title='Общежитие', created_by=self.admin)
+
+        self.assertEqual(self._titles('турц'), ['Архив виз Турции', 'Визы Турция'])
+
+    def test_member_rename_reindexes_projects(self):
+        member = User.objects.create_user(email='member@example.com', password='x', first_name='Мерген', last_name='Атаев')
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(title='Визовый центр', created_by=self.admin)
+            project.participants.add(member)
+        self.assertEqual(self._titles('атаев'), ['Визовый центр'])
+
+        member.last_name = 'Овезов'
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+
+        self.assertEqual(self._titles('овезов'), ['Визовый центр'])
+        self.assertEqual(self._titles('атаев'), [])
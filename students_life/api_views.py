@@ -5,18 +5,13 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from analytics.models import Payment, Deal, FinancialPeriod
+from analytics.models import Payment, Deal
 from clients.models import Client
 from tasks.models import Task
-from timetracking.models import WorkShift
-from reports.models import DailyReport
 from leads.models import Lead
 from documents.models import GeneratedDocument
-from .dashboard import is_admin_user, close_overdue_shifts
-
-
-def as_float(value):
-    return float(value or 0)
+from .dashboard import is_admin_user
+from .dashboard_metrics import get_dashboard_metrics
 
 
 class HealthCheckView(APIView):
@@ -51,36 +46,41 @@ class AppConfigView(APIView):
                 'logout': '/api/auth/logout/',
                 'refresh': '/api/auth/refresh/',
                 'dashboard': '/api/app/dashboard/',
+                'dashboard_metrics': '/api/app/dashboard/metrics/',
+                'sync': '/api/sync/',
                 'health': '/api/health/',
             },
         })
 
 
-class DashboardSummaryView(APIView):
+class DashboardMetricsView(APIView):
+    """KPI-плитки главной страницы (те же, что в админке) для роли пользователя."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        close_overdue_shifts()
+        return Response(get_dashboard_metrics(request.user, as_admin=is_admin_user(request.user)))
+
 
+class DashboardSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
         user = request.user
         today = timezone.localdate()
 
         if is_admin_user(user):
-            period = FinancialPeriod.ensure_current_period()
-            period.calculate_stats()
+            metrics = get_dashboard_metrics(user, as_admin=True)['metrics']
 
             payload = {
                 'role': 'admin',
                 'today': str(today),
                 'metrics': {
-                    'period_revenue_usd': as_float(period.total_revenue),
-                    'period_profit_usd': as_float(period.net_profit),
-                    'clients_total': Client.objects.count(),
-                    'active_deals': Deal.objects.filter(
-                        payment_status__in=['new', 'waiting_payment', 'paid_partial']
-                    ).count(),
-                    'pending_payments': Payment.objects.filter(is_confirmed=False).count(),
-                    'pending_documents': GeneratedDocument.objects.filter(status='generated').count(),
+                    'period_revenue_usd': metrics['period_revenue_usd'],
+                    'period_profit_usd': metrics['period_profit_usd'],
+                    'clients_total': metrics['clients_total'],
+                    'active_deals': metrics['active_deals'],
+                    'pending_payments': metrics['pending_payments'],
+                    'pending_documents': metrics['pending_documents'],
                 },
                 'recent': {
                     'payments': list(
@@ -120,50 +120,30 @@ class DashboardSummaryView(APIView):
             }
             return Response(payload)
 
-        sal = getattr(user, 'managersalary', None)
-        revenue = as_float(getattr(sal, 'current_month_revenue', 0))
-        plan = as_float(getattr(sal, 'monthly_plan', 0))
-        progress = min(int((revenue / plan) * 100), 100) if plan > 0 else 0
+        metrics = get_dashboard_metrics(user, as_admin=False)['metrics']
 
         payload = {
             'role': 'manager',
             'today': str(today),
             'workday': {
-                'has_active_shift': WorkShift.objects.filter(
-                    employee=user,
-                    date=today,
-                    is_active=True
-                ).exists(),
-                'has_report_today': DailyReport.objects.filter(
-                    employee=user,
-                    date=today
-                ).exists(),
-                'forgotten_shift_count': WorkShift.objects.filter(
-                    employee=user,
-                    is_auto_closed=True
-                ).count(),
+                'has_active_shift': metrics['has_active_shift'],
+                'has_report_today': metrics['has_report_today'],
+                'forgotten_shift_count': metrics['forgotten_shift_count'],
             },
             'salary': {
-                'fixed_salary_usd': as_float(getattr(sal, 'fixed_salary', 0)),
-                'bonus_balance_usd': as_float(getattr(sal, 'current_balance', 0)),
-                'month_revenue_usd': revenue,
-                'month_plan_usd': plan,
-                'plan_progress_percent': progress,
-                'motivation_target_usd': as_float(getattr(sal, 'motivation_target', 0)),
-                'motivation_reward_usd': as_float(getattr(sal, 'motivation_reward', 0)),
+                'fixed_salary_usd': metrics['fixed_salary_usd'],
+                'bonus_balance_usd': metrics['bonus_balance_usd'],
+                'month_revenue_usd': metrics['month_revenue_usd'],
+                'month_plan_usd': metrics['month_plan_usd'],
+                'plan_progress_percent': metrics['plan_progress_percent'],
+                'motivation_target_usd': metrics['motivation_target_usd'],
+                'motivation_reward_usd': metrics['motivation_reward_usd'],
             },
             'counts': {
-                'clients': Client.objects.filter(
-                    Q(manager=user) | Q(shared_with=user)
-                ).distinct().count(),
-                'deals': Deal.objects.filter(manager=user).count(),
-                'pending_payments': Payment.objects.filter(
-                    manager=user,
-                    is_confirmed=False
-                ).count(),
-                'tasks': Task.objects.filter(
-                    assigned_to=user
-                ).exclude(status='done').count(),
+                'clients': metrics['clients'],
+                'deals': metrics['deals'],
+                'pending_payments': metrics['pending_payments'],
+                'tasks': metrics['tasks'],
             },
             'recent': {
                 'clients': list(
@@ -1,137 +1,45 @@
 # students_life/dashboard.py
 import datetime
 
-from django.db.models import Q, Sum
-from django.db.models.functions import TruncDay
+from django.db.models import Q
 from django.utils import timezone
 
-from analytics.models import Deal, FinancialPeriod, Payment
+from analytics.models import Deal
 from clients.models import Client
-from documents.models import GeneratedDocument
 from leads.models import Lead
-from reports.models import DailyReport
-from support.models import SupportMessage
-from tasks.models import Project, Task
-from timetracking.models import WorkShift
+from tasks.models import Task
+
+from .dashboard_metrics import get_dashboard_metrics
 
 
 def is_admin_user(user):
     return bool(user and user.is_authenticated and (user.is_superuser or getattr(user, 'role', None) == 'admin'))
 
 
-def close_overdue_shifts():
-    now = timezone.localtime()
-    today = timezone.localdate()
-    tz = timezone.get_current_timezone()
-
-    overdue_shifts = WorkShift.objects.select_related('employee').filter(is_active=True)
-
-    for shift in overdue_shifts:
-        should_close = shift.date < today or (shift.date == today and now.time() >= datetime.time(22, 0))
-        if not should_close:
-            continue
-
-        close_dt = timezone.make_aware(datetime.datetime.combine(shift.date, datetime.time(22, 0)), tz)
-        if shift.time_in and close_dt <= shift.time_in:
-            close_dt = now
-
-        shift.time_out = close_dt
-        shift.is_active = False
-        shift.is_auto_closed = True
-        shift.save(update_fields=['time_out', 'is_active', 'is_auto_closed', 'hours_worked', 'updated_at'])
-
-        employee = shift.employee
-        auto_closed_count = WorkShift.objects.filter(employee=employee, is_auto_closed=True).count()
-        if auto_closed_count >= 3 and employee.is_effective:
-            employee.is_effective = False
-            employee.save(update_fields=['is_effective', 'updated_at'])
-
-
 def dashboard_callback(request, context):
     user = request.user
     now = timezone.localtime()
-    today = timezone.localdate()
     tomorrow = now + datetime.timedelta(days=1)
 
-    close_overdue_shifts()
-
     context['hot_tasks'] = Task.objects.filter(status__in=['todo', 'process'], deadline__isnull=False, deadline__lte=tomorrow).order_by('deadline')[:5]
 
     if is_admin_user(user):
-        last_week = today - datetime.timedelta(days=6)
-        payments_data = (
-            Payment.objects.filter(payment_date__gte=last_week, is_confirmed=True)
-            .annotate(day=TruncDay('payment_date'))
-            .values('day')
-            .annotate(total=Sum('amount_usd'))
-            .order_by('day')
-        )
-        days = [p['day'].strftime('%d.%m') for p in payments_data if p['day']]
-        amounts = [float(p['total'] or 0) for p in payments_data]
-
-        period = FinancialPeriod.ensure_current_period()
-        period.calculate_stats()
-
-        total_rev = float(period.total_revenue or 0)
-        net_profit = float(period.net_profit or 0)
-        active_deals = Deal.objects.filter(payment_status__in=['new', 'waiting_payment', 'paid_partial']).count()
-        total_clients = Client.objects.count()
-        pending_pays = Payment.objects.filter(is_confirmed=False).count()
-        pending_docs = GeneratedDocument.objects.filter(status='generated').count()
-        new_support = SupportMessage.objects.filter(status='new').count()
-        active_projects = Project.objects.filter(status='active', is_hidden=False).count()
-
-        context.update({
-            'kpi': [
-                {'title': 'Выручка (период)', 'metric': f'${total_rev:,.2f}', 'footer': 'Текущий финансовый период', 'color': 'primary'},
-                {'title': 'Чистая прибыль', 'metric': f'${net_profit:,.2f}', 'footer': 'Подтверждённые платежи - расходы', 'color': 'success'},
-                {'title': 'Активные сделки', 'metric': active_deals, 'footer': 'Новые / ждут оплату / частично оплачены', 'color': 'warning'},
-                {'title': 'Проекты', 'metric': active_projects, 'footer': 'Активные внутренние проекты', 'color': 'info'},
-                {'title': 'Ждут внимания', 'metric': pending_pays + pending_docs + new_support, 'footer': f'Платежи: {pending_pays} | Документы: {pending_docs} | Поддержка: {new_support}', 'color': 'danger'},
-                {'title': 'Клиентов всего', 'metric': total_clients, 'footer': 'Вся клиентская база', 'color': 'default'},
-            ],
-            'chart': {
-                'name': 'Подтверждённые платежи за 7 дней',
-                'type': 'line',
-                'labels': days,
-                'datasets': [{'label': 'USD', 'data': amounts, 'borderColor': '#10B981', 'backgroundColor': 'rgba(16,185,129,0.10)'}],
-            },
-        })
+        dashboard = get_dashboard_metrics(user, as_admin=True)
+        context.update({'kpi': dashboard['kpi'], 'chart': dashboard['chart']})
     else:
-        sal = getattr(user, 'managersalary', None)
-        balance = float(getattr(sal, 'current_balance', 0) or 0)
-        fixed = float(getattr(sal, 'fixed_salary', 0) or 0)
-        plan = float(getattr(sal, 'monthly_plan', 0) or 0)
-        revenue = float(getattr(sal, 'current_month_revenue', 0) or 0)
-        mot_target = float(getattr(sal, 'motivation_target', 0) or 0)
-        mot_reward = float(getattr(sal, 'motivation_reward', 0) or 0)
-
-        progress = min(int((revenue / plan) * 100), 100) if plan > 0 else 0
-        left_to_motivation = max(mot_target - revenue, 0)
-
-        context['raw_balance'] = balance
-        context['has_active_shift'] = WorkShift.objects.filter(employee=user, date=today, is_active=True).exists()
-        context['has_report_today'] = DailyReport.objects.filter(employee=user, date=today).exists()
-        context['forgets_count'] = WorkShift.objects.filter(employee=user, is_auto_closed=True).count()
+        dashboard = get_dashboard_metrics(user, as_admin=False)
+        metrics = dashboard['metrics']
+
+        context['raw_balance'] = metrics['bonus_balance_usd']
+        context['has_active_shift'] = metrics['has_active_shift']
+        context['has_report_today'] = metrics['has_report_today']
+        context['forgets_count'] = metrics['forgotten_shift_count']
         context['new_leads'] = Lead.objects.filter(Q(manager=user) | Q(manager__isnull=True, status='new')).order_by('-created_at')[:5]
         context['my_clients'] = Client.objects.filter(Q(manager=user) | Q(shared_with=user)).distinct().order_by('-updated_at')[:5]
         context['my_deals'] = Deal.objects.filter(manager=user).order_by('-updated_at')[:5]
         context['my_tasks'] = Task.objects.filter(assigned_to=user).exclude(status='done').order_by('deadline', '-updated_at')[:5]
 
-        mot_text, mot_val, mot_color = (
-            ('Выполнено! 🎉', f'+${mot_reward:,.0f}', 'success')
-            if left_to_motivation <= 0 and mot_target > 0
-            else (f'До бонуса +${mot_reward:,.0f}', f'${left_to_motivation:,.0f}', 'warning')
-        )
-
-        context.update({
-            'kpi': [
-                {'title': 'ЗП (Оклад + Бонус)', 'metric': f'${balance + fixed:,.2f}', 'footer': f'Оклад: ${fixed:,.0f} | Бонус: ${balance:,.0f}', 'color': 'success'},
-                {'title': 'Выручка за месяц', 'metric': f'${revenue:,.2f}', 'footer': f'План: ${plan:,.0f}', 'color': 'primary'},
-                {'title': 'Мотивация', 'metric': mot_val, 'footer': mot_text, 'color': mot_color},
-            ],
-            'progress': [{'title': 'Выполнение плана продаж', 'description': f'Вы принесли ${revenue:,.2f} из ${plan:,.0f}', 'value': progress, 'color': 'success' if progress >= 100 else 'primary'}],
-        })
+        context.update({'kpi': dashboard['kpi'], 'progress': dashboard['progress']})
 
     return context
 
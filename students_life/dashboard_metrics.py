@@ -0,0 +1,264 @@
+# students_life/dashboard_metrics.py
+"""
+KPI-плитки главной страницы админки и мобильного приложения.
+
+Счётчики собираются скалярными подзапросами в одном SELECT: у администратора —
+к строке текущего финансового периода, у менеджера — к строке его профиля
+(вместе с кошельком ManagerSalary). Готовый набор кэшируется на
+DASHBOARD_CACHE_TIMEOUT секунд: общий для всех администраторов и свой
+у каждого менеджера. Кэш менеджера сбрасывается сигналами (users/signals.py),
+когда он начинает/завершает смену, сдаёт отчёт или меняется его кошелёк.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Exists, F, Func, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay
+from django.utils import timezone
+
+from analytics.models import Deal, FinancialPeriod, Payment
+from clients.models import Client
+from documents.models import GeneratedDocument
+from reports.models import DailyReport
+from support.models import SupportMessage
+from tasks.models import Project, Task
+from timetracking.models import WorkShift
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TIMEOUT = 60
+ADMIN_CACHE_KEY = 'dashboard-metrics:admin'
+
+ACTIVE_DEAL_STATUSES = ('new', 'waiting_payment', 'paid_partial')
+
+
+def manager_cache_key(user_id) -> str:
+    return f'dashboard-metrics:manager:{user_id}'
+
+
+def _cache_timeout() -> int:
+    return int(getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+
+
+def _count(queryset, distinct=False):
+    """Скалярный подзапрос COUNT(*) по queryset (без GROUP BY)."""
+    template = '%(function)s(DISTINCT %(expressions)s)' if distinct else '%(function)s(%(expressions)s)'
+    total = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT', template=template)).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def _money(value) -> float:
+    return float(value or 0)
+
+
+def _admin_counters() -> dict:
+    return {
+        'active_deals': _count(Deal.objects.filter(payment_status__in=ACTIVE_DEAL_STATUSES)),
+        'active_projects': _count(Project.objects.filter(status='active', is_hidden=False)),
+        'clients_total': _count(Client.objects.all()),
+        'pending_payments': _count(Payment.objects.filter(is_confirmed=False)),
+        'pending_documents': _count(GeneratedDocument.objects.filter(status='generated')),
+        'new_support_messages': _count(SupportMessage.objects.filter(status='new')),
+    }
+
+
+def _payments_chart(today) -> dict:
+    last_week = today - datetime.timedelta(days=6)
+    payments_data = (
+        Payment.objects.filter(payment_date__gte=last_week, is_confirmed=True)
+        .annotate(day=TruncDay('payment_date'))
+        .values('day')
+        .annotate(total=Sum('amount_usd'))
+        .order_by('day')
+    )
+    rows = [row for row in payments_data if row['day']]
+
+    return {
+        'name': 'Подтверждённые платежи за 7 дней',
+        'type': 'line',
+        'labels': [row['day'].strftime('%d.%m') for row in rows],
+        'datasets': [{
+            'label': 'USD',
+            'data': [_money(row['total']) for row in rows],
+            'borderColor': '#10B981',
+            'backgroundColor': 'rgba(16,185,129,0.10)',
+        }],
+    }
+
+
+def build_admin_metrics() -> dict:
+    today = timezone.localdate()
+    start, _ = FinancialPeriod.get_period_dates(today)
+    counters = _admin_counters()
+
+    def _fetch():
+        return (
+            FinancialPeriod.objects
+            .filter(start_date=start)
+            .annotate(**counters)
+            .values('start_date', 'end_date', 'total_revenue', 'net_profit', *counters)
+            .first()
+        )
+
+    # Итоги периода и все счётчики — одним запросом
+    row = _fetch()
+    if row is None:
+        FinancialPeriod.ensure_current_period()
+        row = _fetch()
+
+    total_rev = _money(row['total_revenue'])
+    net_profit = _money(row['net_profit'])
+    pending_pays = row['pending_payments']
+    pending_docs = row['pending_documents']
+    new_support = row['new_support_messages']
+
+    return {
+        'role': 'admin',
+        'today': str(today),
+        'generated_at': timezone.now().isoformat(),
+        'metrics': {
+            'period_start': str(row['start_date']),
+            'period_end': str(row['end_date']),
+            'period_revenue_usd': total_rev,
+            'period_profit_usd': net_profit,
+            'clients_total': row['clients_total'],
+            'active_deals': row['active_deals'],
+            'active_projects': row['active_projects'],
+            'pending_payments': pending_pays,
+            'pending_documents': pending_docs,
+            'new_support_messages': new_support,
+        },
+        'kpi': [
+            {'key': 'period_revenue', 'title': 'Выручка (период)', 'metric': f'${total_rev:,.2f}', 'value': total_rev, 'footer': 'Текущий финансовый период', 'color': 'primary'},
+            {'key': 'net_profit', 'title': 'Чистая прибыль', 'metric': f'${net_profit:,.2f}', 'value': net_profit, 'footer': 'Подтверждённые платежи - расходы', 'color': 'success'},
+            {'key': 'active_deals', 'title': 'Активные сделки', 'metric': row['active_deals'], 'value': row['active_deals'], 'footer': 'Новые / ждут оплату / частично оплачены', 'color': 'warning'},
+            {'key': 'active_projects', 'title': 'Проекты', 'metric': row['active_projects'], 'value': row['active_projects'], 'footer': 'Активные внутренние проекты', 'color': 'info'},
+            {'key': 'attention', 'title': 'Ждут внимания', 'metric': pending_pays + pending_docs + new_support, 'value': pending_pays + pending_docs + new_support, 'footer': f'Платежи: {pending_pays} | Документы: {pending_docs} | Поддержка: {new_support}', 'color': 'danger'},
+            {'key': 'clients_total', 'title': 'Клиентов всего', 'metric': row['clients_total'], 'value': row['clients_total'], 'footer': 'Вся клиентская база', 'color': 'default'},
+        ],
+        'chart': _payments_chart(today),
+    }
+
+
+def build_manager_metrics(user_id: int) -> dict:
+    User = get_user_model()
+    today = timezone.localdate()
+    me = OuterRef('pk')
+
+    row = (
+        User.objects
+        .filter(pk=user_id)
+        .annotate(
+            has_active_shift=Exists(WorkShift.objects.filter(employee_id=me, date=today, is_active=True)),
+            has_report_today=Exists(DailyReport.objects.filter(employee_id=me, date=today)),
+            forgotten_shift_count=_count(WorkShift.objects.filter(employee_id=me, is_auto_closed=True)),
+            clients_count=_count(Client.objects.filter(Q(manager_id=me) | Q(shared_with=me)), distinct=True),
+            deals_count=_count(Deal.objects.filter(manager_id=me)),
+            pending_payments_count=_count(Payment.objects.filter(manager_id=me, is_confirmed=False)),
+            tasks_count=_count(Task.objects.filter(assigned_to=me).exclude(status='done')),
+        )
+        .values(
+            'has_active_shift',
+            'has_report_today',
+            'forgotten_shift_count',
+            'clients_count',
+            'deals_count',
+            'pending_payments_count',
+            'tasks_count',
+            'managersalary__current_balance',
+            'managersalary__fixed_salary',
+            'managersalary__monthly_plan',
+            'managersalary__current_month_revenue',
+            'managersalary__motivation_target',
+            'managersalary__motivation_reward',
+        )
+        .first()
+    ) or {}
+
+    balance = _money(row.get('managersalary__current_balance'))
+    fixed = _money(row.get('managersalary__fixed_salary'))
+    plan = _money(row.get('managersalary__monthly_plan'))
+    revenue = _money(row.get('managersalary__current_month_revenue'))
+    mot_target = _money(row.get('managersalary__motivation_target'))
+    mot_reward = _money(row.get('managersalary__motivation_reward'))
+
+    progress = min(int((revenue / plan) * 100), 100) if plan > 0 else 0
+    left_to_motivation = max(mot_target - revenue, 0)
+
+    mot_text, mot_val, mot_color = (
+        ('Выполнено! 🎉', f'+${mot_reward:,.0f}', 'success')
+        if left_to_motivation <= 0 and mot_target > 0
+        else (f'До бонуса +${mot_reward:,.0f}', f'${left_to_motivation:,.0f}', 'warning')
+    )
+
+    return {
+        'role': 'manager',
+        'today': str(today),
+        'generated_at': timezone.now().isoformat(),
+        'metrics': {
+            'has_active_shift': bool(row.get('has_active_shift')),
+            'has_report_today': bool(row.get('has_report_today')),
+            'forgotten_shift_count': row.get('forgotten_shift_count', 0),
+            'fixed_salary_usd': fixed,
+            'bonus_balance_usd': balance,
+            'month_revenue_usd': revenue,
+            'month_plan_usd': plan,
+            'plan_progress_percent': progress,
+            'motivation_target_usd': mot_target,
+            'motivation_reward_usd': mot_reward,
+            'clients': row.get('clients_count', 0),
+            'deals': row.get('deals_count', 0),
+            'pending_payments': row.get('pending_payments_count', 0),
+            'tasks': row.get('tasks_count', 0),
+        },
+        'kpi': [
+            {'key': 'salary', 'title': 'ЗП (Оклад + Бонус)', 'metric': f'${balance + fixed:,.2f}', 'value': balance + fixed, 'footer': f'Оклад: ${fixed:,.0f} | Бонус: ${balance:,.0f}', 'color': 'success'},
+            {'key': 'month_revenue', 'title': 'Выручка за месяц', 'metric': f'${revenue:,.2f}', 'value': revenue, 'footer': f'План: ${plan:,.0f}', 'color': 'primary'},
+            {'key': 'motivation', 'title': 'Мотивация', 'metric': mot_val, 'value': left_to_motivation, 'footer': mot_text, 'color': mot_color},
+        ],
+        'progress': [{
+            'title': 'Выполнение плана продаж',
+            'description': f'Вы принесли ${revenue:,.2f} из ${plan:,.0f}',
+            'value': progress,
+            'color': 'success' if progress >= 100 else 'primary',
+        }],
+    }
+
+
+def _cached(key: str, build):
+    timeout = _cache_timeout()
+    if timeout <= 0:
+        return build()
+
+    try:
+        payload = cache.get(key)
+    except Exception:
+        logger.warning('Dashboard metrics cache is unavailable', exc_info=True)
+        return build()
+
+    if payload is None:
+        payload = build()
+        try:
+            cache.set(key, payload, timeout)
+        except Exception:
+            logger.warning('Dashboard metrics cache write failed', exc_info=True)
+    return payload
+
+
+def get_dashboard_metrics(user, as_admin: bool) -> dict:
+    """KPI дашборда администратора или менеджера user (из кэша, если он свежий)."""
+    if as_admin:
+        return _cached(ADMIN_CACHE_KEY, build_admin_metrics)
+    return _cached(manager_cache_key(user.pk), lambda: build_manager_metrics(user.pk))
+
+
+def invalidate_manager_metrics(user_id) -> None:
+    if not user_id:
+        return
+    try:
+        cache.delete(manager_cache_key(user_id))
+    except Exception:
+        logger.warning('Dashboard metrics invalidation failed for user %s', user_id, exc_info=True)
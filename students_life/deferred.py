@@ -0,0 +1,101 @@
+# students_life/deferred.py
+"""
+Отложенная до коммита работа, собранная в одну пачку на транзакцию.
+
+Сигналы и массовые операции складывают в пачку ключи того, что нужно
+пересчитать (даты, id объектов), а пересчёт выполняется один раз после коммита.
+Пачка привязана к транзакции (точнее — к текущему уровню точек сохранения):
+у каждой свой on_commit-колбэк (регистрируется при каждом добавлении,
+срабатывает только первый вызов). Если транзакцию или точку сохранения
+откатили, Django выбрасывает её колбэки, и пачка больше никогда не сбрасывается —
+изменения из отменённой транзакции не попадают в следующую на этом же потоке.
+
+Вне транзакции (autocommit) работа выполняется сразу.
+
+    _batch = CommitBatch(_flush, factory=set)
+    _batch.add(lambda dates: dates.update(new_dates))
+"""
+import threading
+from typing import Callable
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class _Bucket:
+    __slots__ = ('data', 'callback', 'position', 'flushed')
+
+    def __init__(self, data):
+        self.data = data
+        self.callback = None
+        self.position = -1
+        self.flushed = False
+
+
+class CommitBatch:
+    """Накопитель работы до коммита: flush(data) вызывается один раз на пачку."""
+
+    def __init__(self, flush: Callable, factory: Callable = dict):
+        self._flush = flush
+        self._factory = factory
+        self._local = threading.local()
+
+    def _buckets(self) -> dict:
+        buckets = getattr(self._local, 'buckets', None)
+        if buckets is None:
+            buckets = self._local.buckets = {}
+        return buckets
+
+    @staticmethod
+    def _is_registered(connection, bucket) -> bool:
+        # Колбэк пачки ещё ждёт коммита — значит, её транзакцию не откатили
+        hooks = connection.run_on_commit
+        if 0 <= bucket.position < len(hooks) and hooks[bucket.position][1] is bucket.callback:
+            return True
+        for position, (_, callback, _) in enumerate(hooks):
+            if callback is bucket.callback:
+                bucket.position = position
+                return True
+        return False
+
+    def _run(self, data) -> None:
+        if data:
+            self._flush(data)
+
+    def _open_bucket(self, connection, key) -> _Bucket:
+        buckets = self._buckets()
+        # Пачки откаченных транзакций уже не сбросятся — убираем их
+        for stale_key in [k for k, b in buckets.items() if not self._is_registered(connection, b)]:
+            del buckets[stale_key]
+
+        bucket = _Bucket(self._factory())
+
+        def callback():
+            if bucket.flushed:
+                return
+            bucket.flushed = True
+            if buckets.get(key) is bucket:
+                del buckets[key]
+            self._run(bucket.data)
+
+        bucket.callback = callback
+        buckets[key] = bucket
+        return bucket
+
+    def add(self, update: Callable, using: str = None) -> None:
+        """update(data) добавляет работу в пачку текущей транзакции."""
+        connection = transaction.get_connection(using or DEFAULT_DB_ALIAS)
+        if not connection.in_atomic_block:
+            data = self._factory()
+            update(data)
+            self._run(data)
+            return
+
+        key = (connection.alias, tuple(connection.savepoint_ids))
+        bucket = self._buckets().get(key)
+        if bucket is None or not self._is_registered(connection, bucket):
+            bucket = self._open_bucket(connection, key)
+        update(bucket.data)
+        # Повторная регистрация того же колбэка: пачку сбросит первый из них,
+        # даже если более ранние колбэки выполняются отдельно (captureOnCommitCallbacks)
+        transaction.on_commit(bucket.callback, using=connection.alias)
+        bucket.position = len(connection.run_on_commit) - 1
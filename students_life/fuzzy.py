@@ -0,0 +1,118 @@
+# students_life/fuzzy.py
+"""
+Общий fuzzy-поиск слов по заранее построенному словарю.
+
+Вместо попарных SequenceMatcher по всем словам документа словарь один раз
+раскладывается в триграммный индекс (как pg_trgm: слово дополняется пробелами
+по краям). Запрос затрагивает только слова, у которых есть общие триграммы
+с искомым токеном, и точная оценка SequenceMatcher считается только для них.
+
+Используется ИИ-ассистентом базы знаний (documents.ai_search) и поиском
+по каталогу вузов/программ (catalog.search).
+"""
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, Set, Tuple
+
+
+def trigrams(word: str, padded: bool = True) -> Set[str]:
+    value = f'  {word} ' if padded else word
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def max_possible_ratio(a: str, b: str) -> float:
+    """Верхняя граница SequenceMatcher.ratio() — зависит только от длин строк."""
+    total = len(a) + len(b)
+    if not total:
+        return 0.0
+    return 2.0 * min(len(a), len(b)) / total
+
+
+class TrigramIndex:
+    def __init__(self, words: Iterable[str]):
+        self.words: Tuple[str, ...] = tuple(dict.fromkeys(word for word in words if word))
+        self._word_set = set(self.words)
+        self._postings = defaultdict(list)
+
+        for position, word in enumerate(self.words):
+            for gram in trigrams(word):
+                self._postings[gram].append(position)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self._word_set
+
+    def containing(self, token: str) -> Set[str]:
+        """Слова словаря, в которые token входит как подстрока."""
+        if not token:
+            return set()
+
+        if len(token) < 3:
+            return {word for word in self.words if token in word}
+
+        postings = sorted(
+            (self._postings.get(gram, ()) for gram in trigrams(token, padded=False)),
+            key=len,
+        )
+        if not postings[0]:
+            return set()
+
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                return set()
+
+        return {
+            self.words[position]
+            for position in candidates
+            if token in self.words[position]
+        }
+
+    def contained_in(self, token: str, min_length: int = 1) -> Set[str]:
+        """Слова словаря, которые сами входят в token как подстрока."""
+        result = set()
+        length = len(token)
+
+        for size in range(max(min_length, 1), length + 1):
+            for start in range(length - size + 1):
+                part = token[start:start + size]
+                if part in self._word_set:
+                    result.add(part)
+
+        return result
+
+    def similar(self, token: str, threshold: float) -> Dict[str, float]:
+        """
+        Слова словаря с SequenceMatcher.ratio() >= threshold.
+        Кандидаты — слова с общими триграммами и подходящей длиной.
+        """
+        if not token:
+            return {}
+
+        counts = defaultdict(int)
+        for gram in trigrams(token):
+            for position in self._postings.get(gram, ()):
+                counts[position] += 1
+
+        result = {}
+        for position in counts:
+            word = self.words[position]
+
+            if max_possible_ratio(token, word) < threshold:
+                continue
+
+            ratio = 1.0 if word == token else SequenceMatcher(None, token, word).ratio()
+            if ratio >= threshold:
+                result[word] = ratio
+
+        return result
+
+
+@lru_cache(maxsize=256)
+def get_index(words: Tuple[str, ...]) -> TrigramIndex:
+    """Кэш индексов для статических словарей (синонимы, фразы интентов и т.п.)."""
+    return TrigramIndex(words)
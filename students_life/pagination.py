@@ -0,0 +1,272 @@
+# students_life/pagination.py
+"""
+Пагинация списков API (DEFAULT_PAGINATION_CLASS).
+
+По умолчанию работает как LimitOffsetPagination (limit/offset, count, next,
+previous) — существующие клиенты ничего не замечают. Дополнительно:
+
+* Курсорный режим (keyset): ?pagination=cursor или ?cursor=<из next/previous>.
+  Страница выбирается условием по последней строке предыдущей страницы
+  (например created_at < X OR created_at = X AND id < Y) по индексу, без OFFSET,
+  поэтому стоимость страницы не зависит от глубины прокрутки, а строки,
+  добавленные во время прокрутки, не сдвигают страницы. Доступен во вьюсетах
+  с keyset_ordering (или get_keyset_ordering()) — набором NOT NULL полей,
+  последнее из которых уникально (обычно '-id'). Вьюсет может сделать курсор
+  режимом по умолчанию: pagination_mode = 'cursor'.
+
+* Режим подсчёта ?count=exact|estimate|none (по умолчанию вьюсета —
+  pagination_count_mode): exact — COUNT(*) как раньше; estimate — оценка
+  планировщика PostgreSQL (EXPLAIN), а для небольших выборок и других СУБД —
+  точный COUNT; none — без подсчёта (count: null). В курсорном режиме по
+  умолчанию none. Наличие следующей страницы определяется по limit + 1 строке
+  и от подсчёта не зависит.
+"""
+import base64
+import binascii
+import datetime
+import json
+import logging
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+MODE_OFFSET = 'offset'
+MODE_CURSOR = 'cursor'
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+
+def _cursor_value(value):
+    # DjangoJSONEncoder обрезает микросекунды, а позиция курсора должна совпадать точно
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def estimate_count(queryset, exact_threshold: int) -> int:
+    """
+    Оценка числа строк queryset по плану PostgreSQL. Если оценка меньше
+    exact_threshold (или СУБД не PostgreSQL), считает точно — это дёшево.
+    """
+    if not isinstance(queryset, QuerySet):
+        return len(queryset)
+
+    if connections[queryset.db].vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            estimated = int(plan[0]['Plan']['Plan Rows'])
+            if estimated >= exact_threshold:
+                return estimated
+        except Exception:
+            logger.warning('Row count estimate failed, falling back to COUNT(*)', exc_info=True)
+
+    return queryset.count()
+
+
+class KeysetPagination(LimitOffsetPagination):
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    estimate_exact_threshold = 10000
+    invalid_cursor_message = 'Неверный курсор.'
+
+    # --- выбор режима ---
+
+    def get_keyset_ordering(self, view):
+        if view is None:
+            return None
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering()
+        return getattr(view, 'keyset_ordering', None)
+
+    def get_mode(self, request, view, queryset) -> str:
+        if not isinstance(queryset, QuerySet) or not self.get_keyset_ordering(view):
+            return MODE_OFFSET
+        # Результаты поиска упорядочены по релевантности — курсор по датам к ним не применим
+        if getattr(view, 'search_ranked', False):
+            return MODE_OFFSET
+        if request.query_params.get(self.cursor_query_param):
+            return MODE_CURSOR
+
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', MODE_OFFSET)
+        return MODE_CURSOR if mode == MODE_CURSOR else MODE_OFFSET
+
+    def get_count_mode(self, request, view) -> str:
+        value = request.query_params.get(self.count_query_param)
+        if value in COUNT_MODES:
+            return value
+
+        default = COUNT_NONE if self.mode == MODE_CURSOR else COUNT_EXACT
+        return getattr(view, 'pagination_count_mode', None) or default
+
+    def count_rows(self, queryset):
+        if self.count_mode == COUNT_EXACT:
+            return self.get_count(queryset)
+        if self.count_mode == COUNT_ESTIMATE:
+            return estimate_count(queryset, self.estimate_exact_threshold)
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.mode = self.get_mode(request, view, queryset)
+        self.count_mode = self.get_count_mode(request, view)
+        self.count = self.count_rows(queryset)
+
+        if self.mode == MODE_CURSOR:
+            self.display_page_controls = False
+            return self._paginate_keyset(queryset, request, view)
+        return self._paginate_offset(queryset, request)
+
+    # --- limit/offset ---
+
+    def _paginate_offset(self, queryset, request):
+        self.offset = self.get_offset(request)
+        if self.count is not None and self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if self.mode == MODE_CURSOR:
+            return self.next_link
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.mode == MODE_CURSOR:
+            return self.previous_link
+        return super().get_previous_link()
+
+    # --- keyset ---
+
+    def _keyset_fields(self, queryset, ordering):
+        fields = []
+        for item in ordering:
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            try:
+                field = queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValueError(f'keyset_ordering: unknown field {name!r}')
+            fields.append((name, field, descending))
+        return fields
+
+    def encode_cursor(self, position, reverse=False) -> str:
+        payload = json.dumps({'p': position, 'r': int(reverse)}, default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, value: str, fields):
+        try:
+            padded = value + '=' * (-len(value) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            position = payload['p']
+            if len(position) != len(fields):
+                raise ValueError('cursor length mismatch')
+            values = [field.to_python(raw) for raw, (_, field, _) in zip(position, fields)]
+            return values, bool(payload.get('r'))
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, fields, values, reverse):
+        """Условие «строго после позиции values» в порядке fields (или до неё при reverse)."""
+        condition = Q()
+        for index, (name, _, descending) in enumerate(fields):
+            lookup = 'gt' if descending == reverse else 'lt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_index in range(index):
+                step &= Q(**{fields[prev_index][0]: values[prev_index]})
+            condition |= step
+        return condition
+
+    def _position(self, obj, fields):
+        return [obj.pk if name == 'pk' else getattr(obj, field.attname) for name, field, _ in fields]
+
+    def _cursor_link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _paginate_keyset(self, queryset, request, view):
+        fields = self._keyset_fields(queryset, self.get_keyset_ordering(view))
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        values, reverse = self.decode_cursor(cursor, fields) if cursor else (None, False)
+
+        ordering = [
+            f'-{name}' if descending != reverse else name
+            for name, _, descending in fields
+        ]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(fields, values, reverse))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else values is not None
+        has_previous = values is not None if not reverse else has_more
+
+        self.next_link = None
+        self.previous_link = None
+        if has_next:
+            position = self._position(rows[-1], fields) if rows else values
+            self.next_link = self._cursor_link(position, reverse=False)
+        if has_previous:
+            position = self._position(rows[0], fields) if rows else values
+            self.previous_link = self._cursor_link(position, reverse=True)
+
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.mode == MODE_CURSOR:
+            payload = OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data),
+            ])
+            if self.count is not None:
+                payload['count'] = self.count
+                payload.move_to_end('count', last=False)
+            return Response(payload)
+        return super().get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count']['nullable'] = True
+        return response
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator админки для больших журналов: число строк — оценка планировщика (см. estimate_count)."""
+    exact_threshold = KeysetPagination.estimate_exact_threshold
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list, self.exact_threshold)
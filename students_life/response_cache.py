@@ -0,0 +1,129 @@
+# students_life/response_cache.py
+"""
+Кэш ответов read-mostly API (справочники, каталог, база знаний, шаблоны документов).
+
+Ответы list/retrieve кладутся в общий кэш (settings.CACHES, один на все воркеры
+gunicorn). Ключ — область кэша вьюсета, её текущая версия, host и полный путь
+с query-параметрами. Сигналы post_save/post_delete/m2m_changed моделей, от которых
+зависит ответ, после коммита увеличивают версию области — старые ключи больше
+не читаются и вытесняются по таймауту. Изменения в обход сигналов (queryset.update)
+видны не позже API_RESPONSE_CACHE_TIMEOUT.
+
+Ответы кэшируемых вьюсетов не должны зависеть от пользователя.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+VERSION_TIMEOUT = None  # версии областей храним без срока
+
+
+def _version_key(scope: str) -> str:
+    return f'api-cache:{scope}:version'
+
+
+def get_scope_version(scope: str) -> int:
+    version = cache.get(_version_key(scope))
+    if version is None:
+        version = 1
+        cache.add(_version_key(scope), version, VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_scope(scope: str) -> None:
+    try:
+        cache.incr(_version_key(scope))
+    except ValueError:
+        cache.set(_version_key(scope), 2, VERSION_TIMEOUT)
+    except Exception:
+        logger.warning('Response cache invalidation failed for %s', scope, exc_info=True)
+
+
+def _cache_timeout(viewset) -> int:
+    if viewset.cache_timeout is not None:
+        return viewset.cache_timeout
+    return int(getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+class CachedResponseMixin:
+    """Кэширует ответы list/retrieve вьюсета в области cache_scope."""
+
+    cache_scope = None
+    cache_timeout = None
+
+    def _response_cache_key(self, request) -> str:
+        # Схема входит в ключ: абсолютные ссылки в ответе (файлы, next) у http и https разные
+        raw = request.build_absolute_uri()
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        return f'api-cache:{self.cache_scope}:{get_scope_version(self.cache_scope)}:{self.action}:{digest}'
+
+    def _cached_response(self, request, build_response):
+        if not self.cache_scope or _cache_timeout(self) <= 0:
+            return build_response()
+
+        try:
+            key = self._response_cache_key(request)
+            cached = cache.get(key)
+        except Exception:
+            logger.warning('Response cache is unavailable', exc_info=True)
+            return build_response()
+
+        if cached is not None:
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = build_response()
+        if response.status_code == 200:
+            try:
+                cache.set(key, response.data, _cache_timeout(self))
+            except Exception:
+                logger.warning('Response cache write failed', exc_info=True)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+
+def invalidate_on_change(scopes, *models, m2m=(), ignored_update_fields=frozenset()):
+    """
+    Подписывает области кэша на изменения моделей. m2m — through-модели связей,
+    ignored_update_fields — сохранения только этих полей кэш не сбрасывают.
+    """
+    scopes = tuple(scopes)
+
+    def _invalidate(sender, raw=False, update_fields=None, action=None, **kwargs):
+        if raw:
+            return
+        if action is not None and not action.startswith('post_'):
+            return
+        if update_fields and set(update_fields) <= set(ignored_update_fields):
+            return
+
+        def _bump():
+            for scope in scopes:
+                invalidate_scope(scope)
+
+        transaction.on_commit(_bump)
+
+    uid_suffix = '-'.join(scopes)
+    for model in models:
+        label = model._meta.label_lower
+        post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f'api-cache-save:{label}:{uid_suffix}')
+        post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f'api-cache-delete:{label}:{uid_suffix}')
+
+    for through in m2m:
+        label = through._meta.label_lower
+        m2m_changed.connect(_invalidate, sender=through, weak=False, dispatch_uid=f'api-cache-m2m:{label}:{uid_suffix}')
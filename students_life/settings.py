@@ -1,5 +1,6 @@
 # students_life/settings.py
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -102,6 +103,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
 
     'django_cleanup',
     'import_export',
@@ -125,6 +127,8 @@ INSTALLED_APPS = [
     'mailing',
     'notifications',
     'support',
+    'sync',
+    'search',
 ]
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
@@ -193,6 +197,32 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LEADS_API_KEY = os.environ.get('LEADS_API_KEY', 'super_secret_key_manager_sl_2026')
 
+# ИИ-ассистент: длительность «думания» отдаётся клиенту (thinking_delay_ms),
+# блокирующая пауза на сервере включается только явно.
+AI_ASSISTANT_THINKING_DELAY_SECONDS = float(os.environ.get('AI_ASSISTANT_THINKING_DELAY_SECONDS', '2'))
+AI_ASSISTANT_SERVER_THINKING_DELAY = env_bool('AI_ASSISTANT_SERVER_THINKING_DELAY', False)
+
+# Одобрение документов: approved-PDF собирают воркеры `manage.py run_document_converter`.
+# DOCUMENT_APPROVAL_ASYNC=False — старое поведение, LibreOffice запускается прямо в запросе.
+DOCUMENT_APPROVAL_ASYNC = env_bool('DOCUMENT_APPROVAL_ASYNC', True)
+DOCUMENT_CONVERTER_WORKERS = int(os.environ.get('DOCUMENT_CONVERTER_WORKERS', '0'))
+DOCUMENT_CONVERTER_PROFILE_ROOT = os.environ.get('DOCUMENT_CONVERTER_PROFILE_ROOT', '')
+# Сколько разобранных DOCX-шаблонов держать в памяти процесса (0 — не кэшировать)
+DOCUMENT_TEMPLATE_CACHE_SIZE = int(os.environ.get('DOCUMENT_TEMPLATE_CACHE_SIZE', '32'))
+# Пакетная генерация (POST /documents/.../bulk/): процессы рендера (0 — по числу ядер, до 4)
+DOCUMENT_RENDER_PROCESSES = int(os.environ.get('DOCUMENT_RENDER_PROCESSES', '0'))
+DOCUMENT_BULK_MAX_ITEMS = int(os.environ.get('DOCUMENT_BULK_MAX_ITEMS', '200'))
+
+# Push-уведомления админам отправляет фоновый поток (notifications.dispatcher).
+# PUSH_DISPATCH_ASYNC=False — отправка прямо в запросе.
+PUSH_DISPATCH_ASYNC = env_bool('PUSH_DISPATCH_ASYNC', True)
+PUSH_DISPATCH_MAX_ATTEMPTS = int(os.environ.get('PUSH_DISPATCH_MAX_ATTEMPTS', '4'))
+PUSH_DISPATCH_RETRY_BASE_SECONDS = float(os.environ.get('PUSH_DISPATCH_RETRY_BASE_SECONDS', '2'))
+# Движок доставки (notifications.push_engine): параллельных пачек по 500 токенов и транспорт.
+# notifications.push_engine.LocalTransport — локальная замена FCM без сетевых запросов.
+PUSH_SEND_CONCURRENCY = int(os.environ.get('PUSH_SEND_CONCURRENCY', '4'))
+PUSH_TRANSPORT = os.environ.get('PUSH_TRANSPORT', 'notifications.push_engine.FirebaseTransport')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -201,7 +231,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'students_life.pagination.KeysetPagination',
     'PAGE_SIZE': 50,
     # Добавлены настройки троттлинга
     'DEFAULT_THROTTLE_CLASSES': [
@@ -235,6 +265,13 @@ EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', '20'))
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 SERVER_EMAIL = EMAIL_HOST_USER
 
+# Рассылки отправляет `manage.py run_mailing_worker` (mailing.runner); MAILING_ASYNC=False — прямо из админки.
+MAILING_ASYNC = env_bool('MAILING_ASYNC', True)
+MAILING_BATCH_SIZE = int(os.environ.get('MAILING_BATCH_SIZE', '50'))
+MAILING_CONCURRENCY = int(os.environ.get('MAILING_CONCURRENCY', '2'))
+# 0 — без ограничения скорости
+MAILING_RATE_PER_MINUTE = int(os.environ.get('MAILING_RATE_PER_MINUTE', '0'))
+
 USE_X_FORWARDED_HOST = True
 
 LANGUAGE_CODE = 'ru-ru'
@@ -251,13 +288,49 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-CACHES = {
-    'default': {
+# Общий кэш для всех воркеров gunicorn. CACHE_BACKEND:
+#   file   — файлы в CACHE_DIR (по умолчанию, общий для воркеров одного контейнера;
+#            в docker-compose CACHE_DIR — общий том app_cache у web и фоновых контейнеров,
+#            чтобы сброс кэша из планировщика был виден дашборду);
+#   redis  — CACHE_URL, например redis://redis:6379/1 (нужен пакет redis);
+#   db     — таблица CACHE_TABLE (создаётся `manage.py createcachetable`);
+#   locmem — кэш внутри процесса (тесты, локальная разработка).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file').strip().lower()
+if CACHE_BACKEND == 'redis':
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://redis:6379/1'),
+    }
+elif CACHE_BACKEND == 'db':
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('CACHE_TABLE', 'managers_sl_cache'),
+    }
+elif CACHE_BACKEND == 'locmem':
+    _default_cache = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'managers-sl-cache',
     }
+else:
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'managers_sl_cache')),
+    }
+
+CACHES = {
+    'default': {
+        **_default_cache,
+        'KEY_PREFIX': 'managers-sl',
+    }
 }
 
+# Сколько секунд живут закэшированные ответы справочных API (students_life.response_cache); 0 — не кэшировать
+API_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('API_RESPONSE_CACHE_TIMEOUT', '300'))
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '60'))
+
+# Сколько дней журнал /api/sync/ хранит записи об удалениях (manage.py prune_sync_log)
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+
 PWA_APP_NAME = 'Managers SL'
 PWA_APP_DESCRIPTION = 'Students Life ERP System'
 PWA_APP_THEME_COLOR = '#D50000'
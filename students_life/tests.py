@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from .deferred import CommitBatch
+
+
+class CommitBatchTests(TestCase):
+    def setUp(self):
+        self.flushed = []
+        self.batch = CommitBatch(lambda data: self.flushed.append(set(data)), factory=set)
+
+    def test_coalesces_until_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for value in (1, 2, 2, 3):
+                self.batch.add(lambda data, value=value: data.add(value))
+            self.assertEqual(self.flushed, [])
+
+        self.assertEqual(self.flushed, [{1, 2, 3}])
+
+    def test_rolled_back_work_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.batch.add(lambda data: data.add('rolled back'))
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+            self.batch.add(lambda data: data.add('kept'))
+
+        self.assertEqual(self.flushed, [{'kept'}])
+
+    def test_new_batch_after_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.add(lambda data: data.add(1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.add(lambda data: data.add(2))
+
+        self.assertEqual(self.flushed, [{1}, {2}])
+
+
+class CommitBatchAutocommitTests(TransactionTestCase):
+    def test_runs_immediately_outside_transaction(self):
+        flushed = []
+        batch = CommitBatch(flushed.append, factory=set)
+
+        batch.add(lambda data: data.add(1))
+
+        self.assertEqual(flushed, [{1}])
@@ -9,7 +9,7 @@ from django.views.generic import RedirectView, TemplateView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.auth_views import LoginView, LogoutView
-from students_life.api_views import HealthCheckView, AppConfigView, DashboardSummaryView
+from students_life.api_views import HealthCheckView, AppConfigView, DashboardMetricsView, DashboardSummaryView
 
 
 @login_required
@@ -31,6 +31,7 @@ urlpatterns = [
     path('api/health/', HealthCheckView.as_view(), name='api_health'),
     path('api/app/config/', AppConfigView.as_view(), name='api_app_config'),
     path('api/app/dashboard/', DashboardSummaryView.as_view(), name='api_app_dashboard'),
+    path('api/app/dashboard/metrics/', DashboardMetricsView.as_view(), name='api_app_dashboard_metrics'),
 
     path('api/auth/login/', LoginView.as_view(), name='api_login'),
     path('api/auth/logout/', LogoutView.as_view(), name='api_logout'),
@@ -49,6 +50,7 @@ urlpatterns = [
     path('api/', include('users.urls')),
     path('api/', include('notifications.urls')),
     path('api/', include('support.urls')),
+    path('api/', include('sync.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,84 @@
+# sync/changes.py
+"""
+Запись изменений в журнал синхронизации.
+
+Сигналы (sync/signals.py) и массовые операции (bulk_create/bulk_update в обход
+сигналов) вызывают record_changes. Изменения копятся до коммита транзакции
+(students_life.deferred.CommitBatch — изменения откаченной транзакции
+отбрасываются): повторные правки одного объекта схлопываются, удаление
+побеждает изменение.
+После коммита прежние записи этих объектов удаляются и вставляются новые —
+одним DELETE и одним bulk_create.
+
+Курсор клиента — id последней прочитанной записи, поэтому записи должны
+становиться видимыми строго в порядке id. Id из последовательности выдаются
+при INSERT, а коммитятся транзакции в произвольном порядке: без блокировки
+запись с меньшим id могла бы появиться уже после того, как клиент прочитал
+большую, и курсор её пропустил бы. На PostgreSQL запись в журнал идёт под
+транзакционным advisory-lock (LOG_LOCK_ID): следующая запись получает id
+только после коммита предыдущей. На SQLite записи и так сериализованы
+блокировкой базы.
+"""
+import logging
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.utils import OperationalError, ProgrammingError
+
+from students_life.deferred import CommitBatch
+
+from .models import ChangeLogEntry
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_xact_lock, сериализующий запись в журнал синхронизации
+LOG_LOCK_ID = 0x73796E635F6C6F67
+
+
+def _lock_log() -> None:
+    """Ждёт коммита других записей в журнал. Вызывать внутри transaction.atomic()."""
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOG_LOCK_ID])
+
+
+def _flush_pending(items):
+    by_entity = {}
+    for entity, object_id in items:
+        by_entity.setdefault(entity, []).append(object_id)
+
+    condition = Q()
+    for entity, ids in by_entity.items():
+        condition |= Q(entity=entity, object_id__in=ids)
+
+    try:
+        with transaction.atomic():
+            _lock_log()
+            ChangeLogEntry.objects.filter(condition).delete()
+            ChangeLogEntry.objects.bulk_create([
+                ChangeLogEntry(entity=entity, object_id=object_id, action=action)
+                for (entity, object_id), action in items.items()
+            ])
+    except (ProgrammingError, OperationalError):
+        logger.warning('Sync change log is unavailable, changes are not recorded', exc_info=True)
+
+
+_batch = CommitBatch(_flush_pending)
+
+
+def record_changes(entity: str, object_ids: Iterable, action: str = ChangeLogEntry.ACTION_UPSERT) -> None:
+    """Откладывает запись изменений объектов entity до коммита транзакции."""
+    object_ids = [object_id for object_id in object_ids if object_id is not None]
+    if not object_ids:
+        return
+
+    def _update(items):
+        for object_id in object_ids:
+            key = (entity, int(object_id))
+            if items.get(key) != ChangeLogEntry.ACTION_DELETE:
+                items[key] = action
+
+    _batch.add(_update)
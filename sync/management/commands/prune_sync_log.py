@@ -0,0 +1,33 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync.models import ChangeLogEntry
+from sync.views import retention_days
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из журнала синхронизации записи об удалённых объектах старше срока хранения. '
+        'Клиенты с курсором старше этого срока получают reset и перезагружают данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Срок хранения в днях (по умолчанию SYNC_TOMBSTONE_RETENTION_DAYS).',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        border = timezone.now() - datetime.timedelta(days=days)
+
+        deleted, _ = ChangeLogEntry.objects.filter(
+            action=ChangeLogEntry.ACTION_DELETE,
+            changed_at__lt=border,
+        ).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей журнала синхронизации: {deleted}.'))
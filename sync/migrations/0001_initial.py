@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=40, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('action', models.CharField(choices=[('upsert', 'Создан / изменён'), ('delete', 'Удалён')], default='upsert', max_length=10, verbose_name='Действие')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение для синхронизации',
+                'verbose_name_plural': 'Журнал синхронизации',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'object_id'], name='sync_change_object_idx'), models.Index(fields=['entity', 'id'], name='sync_change_entity_idx'), models.Index(fields=['action', 'changed_at'], name='sync_change_prune_idx')],
+            },
+        ),
+    ]
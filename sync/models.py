@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Журнал изменений для дельта-синхронизации мобильного приложения (/api/sync/).
+    На каждый объект хранится только последняя запись: новое изменение заменяет
+    предыдущее, поэтому журнал не растёт от частых правок одной записи.
+    """
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = (
+        (ACTION_UPSERT, 'Создан / изменён'),
+        (ACTION_DELETE, 'Удалён'),
+    )
+
+    entity = models.CharField('Тип объекта', max_length=40)
+    object_id = models.BigIntegerField('ID объекта')
+    action = models.CharField('Действие', max_length=10, choices=ACTION_CHOICES, default=ACTION_UPSERT)
+    changed_at = models.DateTimeField('Время изменения', default=timezone.now)
+
+    def __str__(self):
+        return f'{self.entity}#{self.object_id} {self.action}'
+
+    class Meta:
+        verbose_name = 'Изменение для синхронизации'
+        verbose_name_plural = 'Журнал синхронизации'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['entity', 'object_id'], name='sync_change_object_idx'),
+            models.Index(fields=['entity', 'id'], name='sync_change_entity_idx'),
+            models.Index(fields=['action', 'changed_at'], name='sync_change_prune_idx'),
+        ]
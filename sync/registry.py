@@ -0,0 +1,61 @@
+# sync/registry.py
+"""
+Типы объектов, которые отдаёт /api/sync/.
+
+Для каждого типа указан вьюсет, из которого берутся права доступа, видимые
+пользователю записи (get_queryset) и сериализатор списка — синхронизация
+отдаёт объекты в том же виде, что и обычный список ресурса.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.apps import apps
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class SyncEntity:
+    name: str
+    model_label: str
+    viewset_path: str
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @cached_property
+    def viewset_class(self):
+        return import_string(self.viewset_path)
+
+
+SYNC_ENTITIES = {
+    entity.name: entity
+    for entity in (
+        SyncEntity('clients', 'clients.Client', 'clients.views.ClientViewSet'),
+        SyncEntity('leads', 'leads.Lead', 'leads.views.LeadViewSet'),
+        SyncEntity('documents', 'documents.GeneratedDocument', 'documents.views.GeneratedDocumentViewSet'),
+        SyncEntity('projects', 'tasks.Project', 'tasks.views.ProjectViewSet'),
+        SyncEntity('knowledge_sections', 'documents.KnowledgeSection', 'documents.views.KnowledgeSectionViewSet'),
+        SyncEntity('universities', 'catalog.University', 'catalog.views.UniversityViewSet'),
+        SyncEntity('programs', 'catalog.Program', 'catalog.views.ProgramViewSet'),
+    )
+}
+
+# Дочерние модели: их изменение меняет представление родителя в списке
+# (счётчики задач проекта, статус проверки документа, вложения раздела).
+# Модель -> (тип родителя, поле с id родителя)
+SYNC_PARENTS = {
+    'tasks.ProjectTask': ('projects', 'project_id'),
+    'tasks.ProjectSection': ('projects', 'project_id'),
+    'tasks.ProjectAttachment': ('projects', 'project_id'),
+    'documents.DocumentReview': ('documents', 'document_id'),
+    'documents.KnowledgeSectionAttachment': ('knowledge_sections', 'section_id'),
+}
+
+# Связи многие-ко-многим, меняющие видимость или представление объекта
+# (поле модели типа синхронизации)
+SYNC_M2M_FIELDS = {
+    'clients': ('shared_with',),
+    'projects': ('participants', 'responsible_users'),
+    'knowledge_sections': ('responsible_users',),
+}
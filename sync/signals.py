@@ -0,0 +1,58 @@
+# sync/signals.py
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .changes import record_changes
+from .models import ChangeLogEntry
+from .registry import SYNC_ENTITIES, SYNC_M2M_FIELDS, SYNC_PARENTS
+
+
+def _entity_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_changes(_MODEL_ENTITIES[sender], [instance.pk])
+
+
+def _entity_deleted(sender, instance, **kwargs):
+    record_changes(_MODEL_ENTITIES[sender], [instance.pk], action=ChangeLogEntry.ACTION_DELETE)
+
+
+def _child_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entity, parent_field = _CHILD_PARENTS[sender]
+    record_changes(entity, [getattr(instance, parent_field, None)])
+
+
+def _m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    entity = _M2M_ENTITIES[sender]
+    if not reverse:
+        record_changes(entity, [instance.pk])
+    elif pk_set:
+        # Изменение со стороны пользователя (user.projects.add(...))
+        record_changes(entity, pk_set)
+
+
+_MODEL_ENTITIES = {}
+_CHILD_PARENTS = {}
+_M2M_ENTITIES = {}
+
+for _entity in SYNC_ENTITIES.values():
+    _model = _entity.model
+    _MODEL_ENTITIES[_model] = _entity.name
+    post_save.connect(_entity_saved, sender=_model, dispatch_uid=f'sync_save_{_model._meta.label_lower}')
+    post_delete.connect(_entity_deleted, sender=_model, dispatch_uid=f'sync_delete_{_model._meta.label_lower}')
+
+    for _field_name in SYNC_M2M_FIELDS.get(_entity.name, ()):
+        _through = getattr(_model, _field_name).through
+        _M2M_ENTITIES[_through] = _entity.name
+        m2m_changed.connect(_m2m_changed, sender=_through, dispatch_uid=f'sync_m2m_{_through._meta.label_lower}')
+
+for _label, _parent in SYNC_PARENTS.items():
+    _model = apps.get_model(_label)
+    _CHILD_PARENTS[_model] = _parent
+    post_save.connect(_child_changed, sender=_model, dispatch_uid=f'sync_child_save_{_model._meta.label_lower}')
+    post_delete.connect(_child_changed, sender=_model, dispatch_uid=f'sync_child_delete_{_model._meta.label_lower}')
@@ -0,0 +1,147 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from users.models import User
+
+from .models import ChangeLogEntry
+from .views import encode_cursor
+
+
+class SyncTestCase(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@example.com', password='x')
+        self.other = User.objects.create_user(email='other@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def _create_client(self, manager, name='Клиент'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Client.objects.create(full_name=name, phone='+99365000000', city='Ашхабад', manager=manager)
+
+    def _sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _changes(self, data):
+        return [(item['type'], item['id'], item['action']) for item in data['changes']]
+
+
+class SyncCursorTests(SyncTestCase):
+    def test_first_request_resets_to_end_of_log(self):
+        self._create_client(self.manager)
+
+        data = self._sync()
+
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(self._sync(data['cursor'], types='clients')['changes'], [])
+
+    def test_delta_after_cursor(self):
+        cursor = self._sync()['cursor']
+        first = self._create_client(self.manager, 'Первый')
+        second = self._create_client(self.manager, 'Второй')
+
+        data = self._sync(cursor, types='clients')
+
+        self.assertFalse(data['reset'])
+        self.assertEqual(self._changes(data), [
+            ('clients', first.pk, 'upsert'),
+            ('clients', second.pk, 'upsert'),
+        ])
+        self.assertEqual(data['changes'][0]['data']['full_name'], 'Первый')
+        self.assertEqual(self._sync(data['cursor'], types='clients')['changes'], [])
+
+    def test_repeated_edits_keep_one_entry_after_cursor(self):
+        cursor = self._sync()['cursor']
+        client = self._create_client(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.comments = 'Позвонить'
+            client.save()
+
+        self.assertEqual(ChangeLogEntry.objects.filter(entity='clients', object_id=client.pk).count(), 1)
+        self.assertEqual(self._changes(self._sync(cursor, types='clients')), [('clients', client.pk, 'upsert')])
+
+    def test_pages_follow_cursor(self):
+        cursor = self._sync()['cursor']
+        clients = [self._create_client(self.manager, f'Клиент {index}') for index in range(3)]
+
+        seen = []
+        has_more = True
+        while has_more:
+            data = self._sync(cursor, types='clients', limit=2)
+            seen.extend(item['id'] for item in data['changes'])
+            cursor, has_more = data['cursor'], data['has_more']
+
+        self.assertEqual(seen, [client.pk for client in clients])
+
+    def test_expired_cursor_resets(self):
+        cursor = encode_cursor(0, timezone.now() - datetime.timedelta(days=365))
+
+        self.assertTrue(self._sync(cursor)['reset'])
+        self.assertTrue(self._sync('not-a-cursor')['reset'])
+
+
+class SyncTombstoneTests(SyncTestCase):
+    def test_deleted_object_comes_as_delete(self):
+        client = self._create_client(self.manager)
+        cursor = self._sync()['cursor']
+        client_id = client.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete()
+
+        data = self._sync(cursor, types='clients')
+
+        self.assertEqual(data['changes'], [{'type': 'clients', 'id': client_id, 'action': 'delete'}])
+
+    def test_rolled_back_delete_leaves_no_tombstone(self):
+        client = self._create_client(self.manager)
+        cursor = self._sync()['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Client.objects.get(pk=client.pk).delete()
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+            # Следующая запись на том же потоке не должна унести удаление из отменённой транзакции
+            other = Client.objects.create(full_name='Другой', phone='+99365000001', city='Ашхабад', manager=self.manager)
+
+        self.assertTrue(Client.objects.filter(pk=client.pk).exists())
+        self.assertFalse(ChangeLogEntry.objects.filter(action=ChangeLogEntry.ACTION_DELETE).exists())
+        self.assertEqual(self._changes(self._sync(cursor, types='clients')), [('clients', other.pk, 'upsert')])
+
+    def test_object_moved_to_other_manager_comes_as_delete(self):
+        client = self._create_client(self.manager)
+        cursor = self._sync()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            client.manager = self.other
+            client.save()
+
+        self.assertEqual(self._changes(self._sync(cursor, types='clients')), [('clients', client.pk, 'delete')])
+
+    def test_prune_removes_only_old_tombstones(self):
+        kept = self._create_client(self.manager)
+        removed = self._create_client(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            removed.delete()
+        ChangeLogEntry.objects.filter(action=ChangeLogEntry.ACTION_DELETE).update(
+            changed_at=timezone.now() - datetime.timedelta(days=60),
+        )
+
+        call_command('prune_sync_log', days=30, stdout=StringIO())
+
+        self.assertEqual(
+            list(ChangeLogEntry.objects.values_list('entity', 'object_id', 'action')),
+            [('clients', kept.pk, 'upsert')],
+        )
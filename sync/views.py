@@ -0,0 +1,164 @@
+# sync/views.py
+"""
+GET /api/sync/ — лента изменений для офлайн-клиента.
+
+Клиент передаёт курсор из прошлого ответа и получает изменения всех типов
+(sync/registry.py) с этого места: upsert — с данными в формате списка ресурса,
+delete — только тип и id. Объект, который пользователь больше не видит
+(передан другому менеджеру, скрыт), приходит как delete.
+
+Без курсора, с испорченным курсором или курсором старше
+SYNC_TOMBSTONE_RETENTION_DAYS (записи об удалениях за этот срок уже вычищены)
+ответ содержит reset: true и курсор на текущий конец журнала — клиент
+перезагружает данные обычными списками и дальше синхронизируется с этого курсора.
+
+Параметры: cursor, types=clients,leads (набор типов не меняется между запросами
+с одним курсором), limit (по умолчанию 200, максимум 500).
+"""
+import base64
+import binascii
+import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import ChangeLogEntry
+from .registry import SYNC_ENTITIES
+
+CURSOR_VERSION = 'v1'
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 500
+DEFAULT_RETENTION_DAYS = 30
+
+
+def retention_days() -> int:
+    return int(getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+
+
+def encode_cursor(last_id: int, issued_at: datetime.datetime = None) -> str:
+    issued_at = issued_at or timezone.now()
+    raw = f'{CURSOR_VERSION}:{int(last_id)}:{int(issued_at.timestamp())}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value: str):
+    """(last_id, issued_at) или None, если курсор не разобрать."""
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        version, last_id, issued_ts = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+        if version != CURSOR_VERSION:
+            return None
+        issued_at = datetime.datetime.fromtimestamp(int(issued_ts), tz=datetime.timezone.utc)
+        return int(last_id), issued_at
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        return None
+
+
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def _parse_limit(self, request) -> int:
+        value = request.query_params.get('limit')
+        if not value:
+            return DEFAULT_LIMIT
+        try:
+            return max(1, min(int(value), MAX_LIMIT))
+        except (TypeError, ValueError):
+            raise ValidationError({'limit': 'Должно быть целым числом.'})
+
+    def _parse_types(self, request) -> list:
+        value = request.query_params.get('types')
+        if not value:
+            return list(SYNC_ENTITIES)
+
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in SYNC_ENTITIES]
+        if unknown:
+            raise ValidationError({'types': f'Неизвестные типы: {", ".join(unknown)}.'})
+        return names
+
+    def _viewset(self, entity, request):
+        viewset = entity.viewset_class(
+            request=request,
+            args=(),
+            kwargs={},
+            action='list',
+            format_kwarg=None,
+        )
+        viewset.check_permissions(request)
+        return viewset
+
+    def _allowed_viewsets(self, names, request) -> dict:
+        allowed = {}
+        for name in names:
+            try:
+                allowed[name] = self._viewset(SYNC_ENTITIES[name], request)
+            except PermissionDenied:
+                continue
+        return allowed
+
+    def _reset_response(self):
+        last_id = ChangeLogEntry.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        return Response({
+            'cursor': encode_cursor(last_id),
+            'has_more': False,
+            'reset': True,
+            'changes': [],
+        })
+
+    def get(self, request):
+        limit = self._parse_limit(request)
+        viewsets = self._allowed_viewsets(self._parse_types(request), request)
+
+        cursor = request.query_params.get('cursor')
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._reset_response()
+
+        last_id, issued_at = decoded
+        if issued_at < timezone.now() - datetime.timedelta(days=retention_days()):
+            return self._reset_response()
+
+        entries = list(
+            ChangeLogEntry.objects
+            .filter(id__gt=last_id, entity__in=list(viewsets))
+            .values_list('id', 'entity', 'object_id', 'action')[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        upsert_ids = {}
+        for _, entity, object_id, action in entries:
+            if action == ChangeLogEntry.ACTION_UPSERT:
+                upsert_ids.setdefault(entity, []).append(object_id)
+
+        # Одна выборка на тип: только видимые пользователю объекты
+        payloads = {}
+        for entity, ids in upsert_ids.items():
+            viewset = viewsets[entity]
+            objects = list(viewset.get_queryset().filter(pk__in=ids))
+            data = viewset.get_serializer(objects, many=True).data
+            payloads[entity] = {obj.pk: item for obj, item in zip(objects, data)}
+
+        changes = []
+        for _, entity, object_id, action in entries:
+            item = payloads.get(entity, {}).get(object_id)
+            if item is None:
+                changes.append({'type': entity, 'id': object_id, 'action': ChangeLogEntry.ACTION_DELETE})
+            else:
+                changes.append({'type': entity, 'id': object_id, 'action': ChangeLogEntry.ACTION_UPSERT, 'data': item})
+
+        if entries:
+            last_id = entries[-1][0]
+
+        return Response({
+            'cursor': encode_cursor(last_id),
+            'has_more': has_more,
+            'reset': False,
+            'changes': changes,
+        })
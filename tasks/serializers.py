@@ -21,6 +21,23 @@ def is_admin_user(user):
     )
 
 
+def is_project_member(project, user_id) -> bool:
+    """Создатель, участник или ответственный. Использует prefetch участников, если он есть."""
+    if project.created_by_id == user_id:
+        return True
+
+    prefetched = getattr(project, '_prefetched_objects_cache', {})
+    for name in ('participants', 'responsible_users'):
+        members = prefetched.get(name)
+        if members is not None:
+            if any(member.id == user_id for member in members):
+                return True
+        elif getattr(project, name).filter(id=user_id).exists():
+            return True
+
+    return False
+
+
 class TaskUserMiniSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
 
@@ -278,6 +295,11 @@ class ProjectSubtaskSerializer(serializers.ModelSerializer):
         )
 
     def get_subtasks_count(self, obj):
+        # subtasks_total аннотирует ProjectViewSet при загрузке проекта целиком
+        total = getattr(obj, 'subtasks_total', None)
+        if total is not None:
+            return total
+
         try:
             return obj.subtasks.count()
         except Exception:
@@ -344,14 +366,20 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
         }
 
     def get_subtasks(self, obj):
-        qs = obj.subtasks.select_related(
-            'assigned_to',
-            'created_by',
-        ).order_by('status', 'order', '-updated_at')
+        qs = getattr(obj, 'ordered_subtasks', None)
+        if qs is None:
+            qs = obj.subtasks.select_related(
+                'assigned_to',
+                'created_by',
+            ).order_by('status', 'order', '-updated_at')
 
         return ProjectSubtaskSerializer(qs, many=True, context=self.context).data
 
     def get_subtasks_count(self, obj):
+        subtasks = getattr(obj, 'ordered_subtasks', None)
+        if subtasks is not None:
+            return len(subtasks)
+
         try:
             return obj.subtasks.count()
         except Exception:
@@ -382,9 +410,7 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
         return (
             obj.created_by_id == user.id
             or obj.assigned_to_id == user.id
-            or obj.project.created_by_id == user.id
-            or obj.project.participants.filter(id=user.id).exists()
-            or obj.project.responsible_users.filter(id=user.id).exists()
+            or is_project_member(obj.project, user.id)
         )
 
     def validate(self, attrs):
@@ -499,64 +525,54 @@ class ProjectSerializer(serializers.ModelSerializer):
         if not user or not user.is_authenticated:
             return False
 
-        return (
-            obj.created_by_id == user.id
-            or obj.participants.filter(id=user.id).exists()
-            or obj.responsible_users.filter(id=user.id).exists()
-        )
+        return is_project_member(obj, user.id)
+
+    def _counter(self, obj, name, count):
+        # Счётчики аннотирует ProjectViewSet (annotate_project_counters);
+        # у только что созданного/изменённого проекта их нет — считаем запросом.
+        value = getattr(obj, name, None)
+        if value is not None:
+            return value
 
-    def get_tasks_count(self, obj):
         try:
-            return obj.items.filter(parent__isnull=True).count()
+            return count()
         except Exception:
             return 0
 
+    def get_tasks_count(self, obj):
+        return self._counter(obj, 'tasks_total', lambda: obj.items.filter(parent__isnull=True).count())
+
     def get_done_tasks_count(self, obj):
-        try:
-            return obj.items.filter(parent__isnull=True, status='done').count()
-        except Exception:
-            return 0
+        return self._counter(obj, 'done_tasks_total', lambda: obj.items.filter(parent__isnull=True, status='done').count())
 
     def get_subtasks_count(self, obj):
-        try:
-            return obj.items.filter(parent__isnull=False).count()
-        except Exception:
-            return 0
+        return self._counter(obj, 'subtasks_total', lambda: obj.items.filter(parent__isnull=False).count())
 
     def get_sections_count(self, obj):
-        try:
-            return obj.sections.count()
-        except Exception:
-            return 0
+        return self._counter(obj, 'sections_total', lambda: obj.sections.count())
 
     def get_posts_count(self, obj):
-        try:
-            return ProjectSectionPost.objects.filter(section__project=obj).count()
-        except Exception:
-            return 0
+        return self._counter(obj, 'posts_total', lambda: ProjectSectionPost.objects.filter(section__project=obj).count())
 
     def get_progress_percent(self, obj):
-        try:
-            root_tasks = obj.items.filter(parent__isnull=True)
-            total = root_tasks.count()
+        total = self.get_tasks_count(obj)
 
-            if total <= 0:
-                return 100 if obj.status == 'done' else 0
+        if total <= 0:
+            return 100 if obj.status == 'done' else 0
 
-            done = root_tasks.filter(status='done').count()
-            return round((done / total) * 100)
-        except Exception:
-            return 0
+        return round((self.get_done_tasks_count(obj) / total) * 100)
 
     def get_items(self, obj):
-        qs = obj.items.filter(parent__isnull=True).select_related(
-            'assigned_to',
-            'created_by',
-        ).prefetch_related(
-            'subtasks',
-            'subtasks__assigned_to',
-            'subtasks__created_by',
-        ).order_by('status', 'order', '-updated_at')
+        qs = getattr(obj, 'root_items', None)
+        if qs is None:
+            qs = obj.items.filter(parent__isnull=True).select_related(
+                'assigned_to',
+                'created_by',
+            ).prefetch_related(
+                'subtasks',
+                'subtasks__assigned_to',
+                'subtasks__created_by',
+            ).order_by('status', 'order', '-updated_at')
 
         return ProjectTaskSerializer(qs, many=True, context=self.context).data
 
@@ -569,4 +585,14 @@ class ProjectSerializer(serializers.ModelSerializer):
             attrs.pop('is_hidden', None)
             attrs.pop('is_pinned', None)
 
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class ProjectListSerializer(ProjectSerializer):
+    """Проект в списке: без задач и вложений, счётчики — из аннотаций запроса."""
+
+    class Meta(ProjectSerializer.Meta):
+        fields = tuple(
+            name for name in ProjectSerializer.Meta.fields
+            if name not in ('items', 'attachments')
+        )
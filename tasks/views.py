@@ -1,12 +1,17 @@
-from django.db.models import Q
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils.dateparse import parse_datetime
 from rest_framework import parsers, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from search.index import search_queryset
+
 from .models import Project, ProjectAttachment, ProjectSection, ProjectSectionPost, ProjectTask, Task
 from .serializers import (
     ProjectAttachmentSerializer,
+    ProjectListSerializer,
     ProjectSectionPostSerializer,
     ProjectSectionSerializer,
     ProjectSerializer,
@@ -23,6 +28,36 @@ def is_admin_user(user):
     )
 
 
+def _count_by_project(queryset, project_field='project'):
+    counts = (
+        queryset
+        .filter(**{project_field: OuterRef('pk')})
+        .order_by()
+        .values(project_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def annotate_project_counters(queryset):
+    """Счётчики задач, подзадач, разделов и постов — коррелированными подзапросами, без JOIN."""
+    return queryset.annotate(
+        tasks_total=_count_by_project(ProjectTask.objects.filter(parent__isnull=True)),
+        done_tasks_total=_count_by_project(ProjectTask.objects.filter(parent__isnull=True, status='done')),
+        subtasks_total=_count_by_project(ProjectTask.objects.filter(parent__isnull=False)),
+        sections_total=_count_by_project(ProjectSection.objects.all()),
+        posts_total=_count_by_project(ProjectSectionPost.objects.all(), project_field='section__project'),
+    )
+
+
+def project_member_ids(user):
+    """Проекты, где пользователь участник или ответственный (подзапрос вместо JOIN + DISTINCT)."""
+    participants = Project.participants.through.objects.filter(user=user).values('project_id')
+    responsible = Project.responsible_users.through.objects.filter(user=user).values('project_id')
+    return Q(pk__in=participants) | Q(pk__in=responsible)
+
+
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -173,31 +208,46 @@ class ProjectViewSet(ProjectAccessMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
 
+    def is_full_list(self):
+        return str(self.request.query_params.get('full', '')).lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self.is_full_list():
+            return ProjectListSerializer
+        return ProjectSerializer
+
     def get_queryset(self):
         user = self.request.user
 
-        qs = Project.objects.select_related('created_by', 'office').prefetch_related(
-            'participants',
-            'responsible_users',
-            'items',
-            'items__assigned_to',
-            'items__created_by',
-            'items__subtasks',
-            'items__subtasks__assigned_to',
-            'items__subtasks__created_by',
-            'attachments',
-            'sections',
-            'sections__created_by',
-            'sections__posts',
-            'sections__posts__created_by',
-            'sections__posts__updated_by',
+        qs = annotate_project_counters(
+            Project.objects.select_related('created_by', 'office').prefetch_related(
+                'participants',
+                'responsible_users',
+            )
         )
 
+        # Задачи и вложения нужны только карточке проекта (и списку с ?full=1)
+        if self.action != 'list' or self.is_full_list():
+            subtasks = (
+                ProjectTask.objects
+                .select_related('assigned_to', 'created_by')
+                .annotate(subtasks_total=Count('subtasks'))
+                .order_by('status', 'order', '-updated_at')
+            )
+            root_items = (
+                ProjectTask.objects
+                .filter(parent__isnull=True)
+                .select_related('assigned_to', 'created_by')
+                .prefetch_related(Prefetch('subtasks', queryset=subtasks, to_attr='ordered_subtasks'))
+                .order_by('status', 'order', '-updated_at')
+            )
+            qs = qs.prefetch_related(
+                Prefetch('items', queryset=root_items, to_attr='root_items'),
+                Prefetch('attachments', queryset=ProjectAttachment.objects.select_related('uploaded_by')),
+            )
+
         if not self.is_admin(user):
-            qs = qs.filter(
-                Q(created_by=user) | Q(participants=user) | Q(responsible_users=user),
-                is_hidden=False,
-            ).distinct()
+            qs = qs.filter(Q(created_by=user) | project_member_ids(user), is_hidden=False)
 
         params = self.request.query_params
 
@@ -223,29 +273,36 @@ class ProjectViewSet(ProjectAccessMixin, viewsets.ModelViewSet):
         elif hidden in ('0', 'false', 'no'):
             qs = qs.filter(is_hidden=False)
 
+        updated_after = params.get('updated_after')
+        if updated_after:
+            dt = parse_datetime(updated_after)
+            if dt:
+                qs = qs.filter(updated_at__gte=dt)
+
         search = params.get('search')
         if search:
+            ranked = search_queryset(qs, 'projects', search)
+            if ranked is not None:
+                self.search_ranked = True
+                # Закреплённые проекты — первыми и в результатах поиска
+                return ranked.order_by('-is_pinned', '-search_rank', '-pk')
+
+            User = get_user_model()
+            matched_users = User.objects.filter(Q(first_name__icontains=search) | Q(last_name__icontains=search)).values('pk')
             qs = qs.filter(
                 Q(title__icontains=search)
                 | Q(description__icontains=search)
                 | Q(city__icontains=search)
                 | Q(office__city__icontains=search)
-                | Q(participants__first_name__icontains=search)
-                | Q(participants__last_name__icontains=search)
-                | Q(responsible_users__first_name__icontains=search)
-                | Q(responsible_users__last_name__icontains=search)
-                | Q(sections__title__icontains=search)
-                | Q(sections__description__icontains=search)
-                | Q(sections__posts__title__icontains=search)
-                | Q(sections__posts__body__icontains=search)
-                | Q(sections__posts__copy_text__icontains=search)
-            ).distinct()
-
-        updated_after = params.get('updated_after')
-        if updated_after:
-            dt = parse_datetime(updated_after)
-            if dt:
-                qs = qs.filter(updated_at__gte=dt)
+                | Q(pk__in=Project.participants.through.objects.filter(user__in=matched_users).values('project_id'))
+                | Q(pk__in=Project.responsible_users.through.objects.filter(user__in=matched_users).values('project_id'))
+                | Q(pk__in=ProjectSection.objects.filter(
+                    Q(title__icontains=search) | Q(description__icontains=search)
+                ).values('project_id'))
+                | Q(pk__in=ProjectSectionPost.objects.filter(
+                    Q(title__icontains=search) | Q(body__icontains=search) | Q(copy_text__icontains=search)
+                ).values('section__project_id'))
+            )
 
         ordering = params.get('ordering') or '-updated_at'
         allowed = {'-updated_at', 'updated_at', '-created_at', 'created_at', 'title', '-title', 'deadline', '-deadline'}
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from timetracking.services import close_overdue_shifts
+
+
+class Command(BaseCommand):
+    help = 'Закрывает рабочие смены, которые сотрудники забыли завершить (после 22:00 дня смены).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять проверку каждые N секунд (0 — один проход и выход).',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            close_old_connections()
+            closed = close_overdue_shifts()
+            if closed or not interval:
+                self.stdout.write(self.style.SUCCESS(f'Автоматически закрыто смен: {closed}.'))
+
+            if not interval:
+                return
+            time.sleep(interval)
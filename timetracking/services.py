@@ -0,0 +1,110 @@
+# timetracking/services.py
+"""
+Обслуживание рабочих смен.
+
+Смены, которые сотрудник забыл закрыть, закрываются автоматически в 22:00 дня
+смены (`python manage.py close_overdue_shifts`, по расписанию). Закрытие идёт
+пачкой: один SELECT открытых просроченных смен и bulk_update. Сотрудники, у которых
+набралось AUTO_CLOSE_LIMIT автозакрытых смен, отмечаются неэффективными по одному
+сгруппированному COUNT и одному UPDATE. Сигналы при этом не срабатывают, поэтому
+рейтинг и кэш KPI дашборда (users.signals.DASHBOARD_SOURCES) обновляются явно
+после коммита.
+"""
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import WorkShift
+
+AUTO_CLOSE_TIME = datetime.time(22, 0)
+AUTO_CLOSE_LIMIT = 3
+BULK_UPDATE_BATCH_SIZE = 500
+
+CLOSED_SHIFT_FIELDS = ['time_out', 'is_active', 'is_auto_closed', 'hours_worked', 'updated_at']
+
+
+def _auto_close_at(shift: WorkShift, now: datetime.datetime, tz) -> datetime.datetime:
+    close_dt = timezone.make_aware(datetime.datetime.combine(shift.date, AUTO_CLOSE_TIME), tz)
+    if shift.time_in and close_dt <= shift.time_in:
+        close_dt = now
+    return close_dt
+
+
+def _hours_between(time_in, time_out) -> Decimal:
+    return Decimal(str(round((time_out - time_in).total_seconds() / 3600, 2)))
+
+
+def _mark_ineffective_employees(employee_ids, now) -> list:
+    """Отмечает неэффективными сотрудников с AUTO_CLOSE_LIMIT и более автозакрытых смен."""
+    User = get_user_model()
+
+    offenders = list(
+        WorkShift.objects
+        .filter(employee_id__in=employee_ids, is_auto_closed=True)
+        .values('employee_id')
+        .annotate(auto_closed=Count('id'))
+        .filter(auto_closed__gte=AUTO_CLOSE_LIMIT)
+        .values_list('employee_id', flat=True)
+    )
+    if not offenders:
+        return []
+
+    changed = list(User.objects.filter(pk__in=offenders, is_effective=True).values_list('pk', flat=True))
+    if changed:
+        User.objects.filter(pk__in=changed).update(is_effective=False, updated_at=now)
+    return changed
+
+
+def close_overdue_shifts(now: datetime.datetime | None = None) -> int:
+    """Закрывает забытые смены. Возвращает количество закрытых."""
+    from gamification.leaderboard import schedule_user_refresh
+    from students_life.dashboard_metrics import invalidate_manager_metrics
+
+    now = now or timezone.now()
+    local_now = timezone.localtime(now)
+    today = local_now.date()
+    tz = timezone.get_current_timezone()
+
+    overdue = Q(date__lt=today)
+    if local_now.time() >= AUTO_CLOSE_TIME:
+        overdue |= Q(date=today)
+
+    with transaction.atomic():
+        shifts = list(
+            WorkShift.objects
+            .select_for_update(skip_locked=True)
+            .filter(overdue, is_active=True)
+            .only('id', 'employee_id', 'date', 'time_in')
+            .order_by('pk')
+        )
+        if not shifts:
+            return 0
+
+        for shift in shifts:
+            shift.time_out = _auto_close_at(shift, now, tz)
+            shift.hours_worked = _hours_between(shift.time_in, shift.time_out) if shift.time_in else Decimal('0')
+            shift.is_active = False
+            shift.is_auto_closed = True
+            shift.updated_at = now
+
+        # bulk_update идёт в обход WorkShift.save и сигналов — рейтинг и кэш дашборда обновляем сами
+        WorkShift.objects.bulk_update(shifts, CLOSED_SHIFT_FIELDS, batch_size=BULK_UPDATE_BATCH_SIZE)
+
+        for shift in shifts:
+            schedule_user_refresh(shift.employee_id, shift.date)
+
+        employee_ids = {shift.employee_id for shift in shifts}
+        for user_id in _mark_ineffective_employees(employee_ids, now):
+            schedule_user_refresh(user_id)
+
+        def _invalidate_dashboards():
+            for user_id in employee_ids:
+                invalidate_manager_metrics(user_id)
+
+        transaction.on_commit(_invalidate_dashboards)
+
+    return len(shifts)
@@ -1,3 +1,35 @@
+import datetime
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from students_life.dashboard_metrics import get_dashboard_metrics, manager_cache_key
+from users.models import User
+
+from .models import WorkShift
+from .services import close_overdue_shifts
+
+
+class CloseOverdueShiftsTests(TestCase):
+    def test_auto_close_invalidates_dashboard_cache(self):
+        cache.clear()
+        employee = User.objects.create_user(email='employee@example.com', password='x')
+        tz = timezone.get_current_timezone()
+        yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        WorkShift.objects.create(
+            employee=employee,
+            date=yesterday,
+            time_in=timezone.make_aware(datetime.datetime.combine(yesterday, datetime.time(9)), tz),
+        )
+
+        before = get_dashboard_metrics(employee, as_admin=False)['metrics']
+        self.assertEqual(before['forgotten_shift_count'], 0)
+        self.assertIsNotNone(cache.get(manager_cache_key(employee.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(close_overdue_shifts(), 1)
 
-# Create your tests here.
+        self.assertIsNone(cache.get(manager_cache_key(employee.pk)))
+        after = get_dashboard_metrics(employee, as_admin=False)['metrics']
+        self.assertEqual(after['forgotten_shift_count'], 1)
@@ -1,5 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+
+from reports.models import DailyReport
+from timetracking.models import WorkShift
+
 from .models import User, ManagerSalary
 
 @receiver(post_save, sender=User)
@@ -16,4 +21,35 @@ def save_user_salary_profile(sender, instance, **kwargs):
     Сохраняем кошелек при изменении юзера, если он есть.
     """
     if hasattr(instance, 'managersalary'):
-        instance.managersalary.save()
\ No newline at end of file
+        instance.managersalary.save()
+
+
+# Модель -> поле сотрудника, чей кэш KPI дашборда устаревает при изменении записи
+DASHBOARD_SOURCES = {
+    ManagerSalary: 'manager_id',
+    WorkShift: 'employee_id',
+    DailyReport: 'employee_id',
+}
+
+
+def _invalidate_dashboard_metrics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    from students_life.dashboard_metrics import invalidate_manager_metrics
+
+    user_id = getattr(instance, DASHBOARD_SOURCES[sender], None)
+    transaction.on_commit(lambda: invalidate_manager_metrics(user_id))
+
+
+for _model in DASHBOARD_SOURCES:
+    post_save.connect(
+        _invalidate_dashboard_metrics,
+        sender=_model,
+        dispatch_uid=f'dashboard_metrics_save_{_model._meta.label_lower}',
+    )
+    post_delete.connect(
+        _invalidate_dashboard_metrics,
+        sender=_model,
+        dispatch_uid=f'dashboard_metrics_delete_{_model._meta.label_lower}',
+    )